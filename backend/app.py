@@ -1,87 +1,923 @@
-from flask import Flask, render_template, request, Response
-from io import StringIO
-from Bio import SeqIO
+import os
+import time
+_import_started = time.perf_counter() # Startup timing (see STARTUP below)
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial
+import tracemalloc
+from flask import Flask, render_template, request, Response, jsonify, g, has_request_context, stream_with_context
+from io import StringIO, TextIOWrapper
+import itertools
+import sqlite3
+import tempfile
 
 # IMPORTS
-from modules.synthesis import check_gc_content, check_homopolymers, check_length, check_repeats, get_gc_plot_data, get_gc_histogram_data
-from modules.restriction import find_restriction_sites
-from modules.optimization import optimize_sequence
-from modules.prediction import predict_problems
-from modules.report import generate_report_text
+# Light modules are imported now; the analysis modules (NumPy, Biopython) load on
+# first use, or all at once in warm_up(), so that a worker starts in a fraction of the time
+from modules.cache import ResultCache, make_key, normalize_sequence, sequence_key
+from modules.store import ResultStore, source_version
+from modules.codon_tables import CODON_TABLES, HOSTS_DIR, DEFAULT_HOST, CodonTableError
+from modules.metrics import MetricsRegistry, capture_profile, server_timing, timed_call
+from modules.jobs import JobQueue, LocalBroker, QueueFull
+from modules.lazy import LOAD_TIMES, LazyModule
+synthesis = LazyModule("modules.synthesis")
+restriction = LazyModule("modules.restriction")
+digests = LazyModule("modules.digest")
+optimization = LazyModule("modules.optimization")
+prediction = LazyModule("modules.prediction")
+batch_runner = LazyModule("modules.batch")
+packed = LazyModule("modules.packed")
+incremental = LazyModule("modules.incremental")
+streaming = LazyModule("modules.streaming")
+report = LazyModule("modules.report")
+payloads = LazyModule("modules.payload")
 # Visualizations
-from modules.visualization import generate_dna_pdb, generate_plasmid_map, generate_codon_heatmap
+visualization = LazyModule("modules.visualization")
+SeqIO = LazyModule("Bio.SeqIO")
+LAZY_MODULES = [synthesis, restriction, digests, optimization, prediction, batch_runner, packed, incremental, streaming, report, payloads, visualization, SeqIO]
 
 app = Flask(__name__, 
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
 
-def run_analysis(sequence):
-    """Helper function to run all checks + Generate Visuals"""
-    
-    # 1. Synthesis Check
-    synthesis_res = {
-        "length": check_length(sequence),
-        "gc": check_gc_content(sequence),
-        "gc_plot": get_gc_plot_data(sequence),
-        "gc_hist": get_gc_histogram_data(sequence), # <--- NEW
-        "homopolymers": check_homopolymers(sequence),
-        "repeats": check_repeats(sequence)
-    }
-    
-    # 2. Restriction Check
-    restriction_res = find_restriction_sites(sequence)
-    restriction_res['map_svg'] = generate_plasmid_map(sequence, restriction_res['sites'])
-    
-    # 3. Optimization Check
-    opt_res = optimize_sequence(sequence)
-    opt_res['heatmap'] = generate_codon_heatmap(sequence, opt_res['optimized_dna'])
-    
-    # 4. Prediction Check
-    pred_res = predict_problems(sequence)
-    # Note: We removed pdb_structure since we switched to 2D Safety Map
-    
+# Worker processes for /batch (defaults to one per CPU core)
+app.config['BATCH_WORKERS'] = int(os.environ.get('BIOVALIDATOR_BATCH_WORKERS', os.cpu_count() or 1))
+
+# Content-addressed result cache shared by '/' and '/download'
+app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('BIOVALIDATOR_CACHE_ENTRIES', 256))
+app.config['RESULT_CACHE_MB'] = int(os.environ.get('BIOVALIDATOR_CACHE_MB', 256))
+app.config['RESULT_CACHE_GRANULARITY'] = os.environ.get('BIOVALIDATOR_CACHE_GRANULARITY', 'module') # or 'analysis'
+result_cache = ResultCache(max_entries=app.config['RESULT_CACHE_ENTRIES'],
+                           max_bytes=app.config['RESULT_CACHE_MB'] * 1024 * 1024)
+
+# Persistent result store behind the cache (SQLite), shared by all workers and kept across
+# restarts; STORE='' turns it off. Results of an older module version are purged on start.
+_backend_dir = os.path.dirname(os.path.abspath(__file__))
+app.config['RESULT_STORE'] = os.environ.get('BIOVALIDATOR_STORE', os.path.join(_backend_dir, 'data', 'store', 'results.sqlite3'))
+app.config['RESULT_STORE_MB'] = int(os.environ.get('BIOVALIDATOR_STORE_MB', 1024))
+
+# The four modules of one request run concurrently on a shared 'thread' or 'process' pool
+app.config['PARALLEL_MODULES'] = os.environ.get('BIOVALIDATOR_PARALLEL_MODULES', '1') == '1'
+app.config['MODULE_EXECUTOR'] = os.environ.get('BIOVALIDATOR_MODULE_EXECUTOR', 'thread')
+app.config['MODULE_POOL_REQUESTS'] = int(os.environ.get('BIOVALIDATOR_MODULE_POOL_REQUESTS', 4)) # concurrent requests served by the pool
+_default_timeout = float(os.environ.get('BIOVALIDATOR_MODULE_TIMEOUT', 120))
+app.config['MODULE_TIMEOUTS'] = {"synthesis": _default_timeout, "restriction": _default_timeout,
+                                 "optimization": _default_timeout, "prediction": _default_timeout}
+
+# Hot-path instrumentation: every analysis/module call is timed and aggregated at /metrics.
+# Peak allocation per call needs tracemalloc running for the whole process (costly, opt-in);
+# ?profile=1 captures cProfile + tracemalloc for one request when PROFILING is enabled.
+app.config['METRICS_MEMORY'] = os.environ.get('BIOVALIDATOR_METRICS_MEMORY', '0') == '1'
+app.config['PROFILING'] = os.environ.get('BIOVALIDATOR_PROFILING', '0') == '1'
+metrics = MetricsRegistry()
+if app.config['METRICS_MEMORY']:
+    tracemalloc.start()
+
+# Asynchronous jobs: a bounded in-process queue drained by JOB_WORKERS threads.
+# On '/', sequences longer than ASYNC_THRESHOLD are queued instead of blocking the request.
+app.config['JOB_WORKERS'] = int(os.environ.get('BIOVALIDATOR_JOB_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('BIOVALIDATOR_JOB_QUEUE_SIZE', 32))
+app.config['JOB_TTL'] = int(os.environ.get('BIOVALIDATOR_JOB_TTL', 3600)) # seconds a finished job is kept
+app.config['ASYNC_THRESHOLD'] = int(os.environ.get('BIOVALIDATOR_ASYNC_THRESHOLD', 200_000))
+
+# Codon usage tables, one <host>.json per expression host, compiled once and hot-reloaded
+# when a file changes; requests pick one with the optimization param "host"
+app.config['CODON_TABLE_DIR'] = os.environ.get('BIOVALIDATOR_CODON_TABLES', HOSTS_DIR)
+app.config['DEFAULT_HOST'] = os.environ.get('BIOVALIDATOR_DEFAULT_HOST', DEFAULT_HOST)
+CODON_TABLES.configure(app.config['CODON_TABLE_DIR'], app.config['DEFAULT_HOST'])
+
+# Virtual digests: lanes with more fragments than this are not worth reading
+app.config['DIGEST_MAX_FRAGMENTS'] = int(os.environ.get('BIOVALIDATOR_DIGEST_MAX_FRAGMENTS', 12))
+DIGEST_MAX_FRAGMENTS = app.config['DIGEST_MAX_FRAGMENTS']
+
+# Streaming scans (/api/scan) of genome-scale FASTA files: uploaded, or read in place
+# from FASTA_DIR; restriction sites are searched for the STREAM_ENZYMES panel by default
+app.config['FASTA_DIR'] = os.environ.get('BIOVALIDATOR_FASTA_DIR') # unset = uploads only
+_stream_enzymes = os.environ.get('BIOVALIDATOR_STREAM_ENZYMES')
+app.config['STREAM_ENZYMES'] = [name.strip() for name in _stream_enzymes.split(',') if name.strip()] if _stream_enzymes else None
+
+# Response payloads: detail lists longer than DETAIL_LIMIT are previewed and DNA fields
+# cut to SEQUENCE_LIMIT bases; the full values are paged from /api/results (?full=1 opts out)
+app.config['DETAIL_LIMIT'] = int(os.environ.get('BIOVALIDATOR_DETAIL_LIMIT', 500))
+app.config['SEQUENCE_LIMIT'] = int(os.environ.get('BIOVALIDATOR_SEQUENCE_LIMIT', 10_000))
+
+# Cold start: with WARMUP the analysis modules, restriction automaton and codon tables are
+# loaded when the app is imported, e.g. once in a pre-fork parent (gunicorn --preload)
+app.config['WARMUP'] = os.environ.get('BIOVALIDATOR_WARMUP', '0') == '1'
+
+# --- MODULE RUNNERS ---
+# Each runner returns one module's result together with its own visuals,
+# so a module can be cached (and reused) independently of the others.
+# Runners receive the request's PackedSequence (plain strings work too).
+def run_synthesis(sequence, gc_window=50, repeat_min_length=20):
+    return _synthesis_result(sequence, gc_window, repeat_min_length, synthesis.check_homopolymers(sequence))
+
+def _synthesis_result(sequence, gc_window, repeat_min_length, homopolymers):
+    gc_landscape = synthesis.gc_profile(sequence, gc_window) # Line plot + histogram in one pass
     return {
-        "synthesis": synthesis_res,
-        "restriction": restriction_res,
-        "optimization": opt_res,
-        "prediction": pred_res
+        "length": synthesis.check_length(sequence),
+        "gc": synthesis.check_gc_content(sequence),
+        "gc_plot": gc_landscape["plot"],
+        "gc_hist": gc_landscape["hist"],
+        "gc_extremes": {"min": gc_landscape["min"], "max": gc_landscape["max"]},
+        "homopolymers": homopolymers,
+        "repeats": synthesis.check_repeats(sequence, repeat_min_length),
+        "tandem_repeats": synthesis.check_tandem_repeats(sequence),
+        "low_complexity": synthesis.check_low_complexity(sequence)
     }
 
+def run_restriction(sequence, visuals=True):
+    restriction_res = restriction.find_restriction_sites(sequence)
+    if visuals:
+        add_restriction_visuals(sequence, restriction_res)
+    return restriction_res
+
+def add_restriction_visuals(sequence, restriction_res):
+    restriction_res['map_svg'] = visualization.generate_plasmid_map(sequence, restriction_res['sites'])
+    # Best-resolving single/double digests for the virtual gel
+    arrays = digests.cut_arrays_from_sites(restriction_res['sites'], max_cuts=DIGEST_MAX_FRAGMENTS - 1)
+    restriction_res['digests'] = digests.screen_digests(arrays, len(sequence), max_fragments=DIGEST_MAX_FRAGMENTS, top=5)['digests']
+
+def run_optimization(sequence, visuals=True, **design_options):
+    # design_options: host, constrained, gc_min, gc_max, gc_window, homopolymer_limit, avoid_sites, avoid_chi, beam_width
+    opt_res = optimization.optimize_sequence(sequence, **design_options)
+    if 'error' in opt_res:
+        raise ValueError(opt_res['error'])
+    if visuals:
+        opt_res['heatmap'] = visualization.generate_codon_heatmap(sequence, opt_res['optimized_dna'])
+    return opt_res
+
+def run_prediction(sequence, **hairpin_options):
+    # Note: We removed pdb_structure since we switched to 2D Safety Map
+    # hairpin_options: min_stem, max_stem, min_loop, max_loop, stability (and min_orf, the cryptic ORF length)
+    return prediction.predict_problems(sequence, **hairpin_options)
+
+ANALYSIS_MODULES = {
+    "synthesis": run_synthesis,
+    "restriction": run_restriction,
+    "optimization": run_optimization,
+    "prediction": run_prediction
+}
+
+# Source files behind each module's result: a stored result is only reused by the
+# same code (and Biopython release, for the enzyme database and translation)
+MODULE_SOURCES = {
+    "synthesis": ["synthesis", "complexity", "payload", "packed"],
+    "restriction": ["restriction", "digest", "visualization", "packed"],
+    "optimization": ["optimization", "codon_engine", "codon_tables", "restriction", "synthesis", "complexity", "visualization", "payload", "packed", "prediction"],
+    "prediction": ["prediction", "orfs", "codon_tables", "packed"]
+}
+
+def _module_versions():
+    from importlib.metadata import version, PackageNotFoundError # Reads package metadata, imports nothing
+    try:
+        biopython = version("biopython")
+    except PackageNotFoundError:
+        biopython = None
+    return {name: source_version([os.path.join(_backend_dir, "modules", f"{source}.py") for source in sources], biopython)
+            for name, sources in MODULE_SOURCES.items()}
+
+MODULE_VERSIONS = _module_versions()
+
+def open_result_store():
+    """The persistent store, or None when disabled or its location is not usable."""
+    if not app.config['RESULT_STORE']:
+        return None, None
+    try:
+        store = ResultStore(app.config['RESULT_STORE'], max_bytes=app.config['RESULT_STORE_MB'] * 1024 * 1024)
+        store.purge(MODULE_VERSIONS)
+        return store, None
+    except (OSError, sqlite3.Error) as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+result_store, RESULT_STORE_ERROR = open_result_store()
+
+# --- Incremental re-analysis ---
+# patcher(previous result, edited sequence, edit, **params) -> result of the edited sequence.
+# GC windows, repeats and complexity scans are single vectorized passes (a few ms per 50 kb), cheaper to
+# redo than to patch; optimization has no patcher and is always recomputed.
+def patch_synthesis(previous, sequence, edit, gc_window=50, repeat_min_length=20):
+    return _synthesis_result(sequence, gc_window, repeat_min_length,
+                             synthesis.patch_homopolymers(previous["homopolymers"], sequence, edit))
+
+def patch_restriction(previous, sequence, edit, visuals=True):
+    restriction_res = restriction.patch_restriction_sites(previous, sequence, edit)
+    if visuals:
+        add_restriction_visuals(sequence, restriction_res)
+    return restriction_res
+
+def patch_prediction(previous, sequence, edit, **hairpin_options):
+    return prediction.patch_problems(previous, sequence, edit, **hairpin_options)
+
+INCREMENTAL_MODULES = {
+    "synthesis": patch_synthesis,
+    "restriction": patch_restriction,
+    "prediction": patch_prediction
+}
+
+def module_error(name, exc, timed_out=False):
+    """Error marker returned in place of a module's result."""
+    message = f"{name} exceeded its {app.config['MODULE_TIMEOUTS'][name]}s time limit" if timed_out else f"{type(exc).__name__}: {exc}"
+    return {"status": "ERROR", "error": message, "timed_out": timed_out, "message": "Module failed."}
+
+_module_executor = None
+
+def get_module_executor():
+    """Shared pool that runs the modules of a request concurrently (created on first use)."""
+    global _module_executor
+    if _module_executor is None:
+        workers = len(ANALYSIS_MODULES) * app.config['MODULE_POOL_REQUESTS']
+        if app.config['MODULE_EXECUTOR'] == 'process':
+            _module_executor = ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1),
+                                                   mp_context=batch_runner.process_context())
+        else:
+            _module_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="module")
+    return _module_executor
+
+def record_timing(name, length, timing, error=False, desc=None):
+    """Aggregates one timed call and, inside a request, reports it in the Server-Timing header."""
+    if timing is not None:
+        metrics.record(name, length, timing, error)
+    if has_request_context() and 'timings' in g:
+        g.timings.append((name, timing, desc))
+
+def _no_progress(name, state):
+    pass
+
+def run_modules(sequence, params, names, parallel=True, progress=None):
+    """
+    Runs the given modules, concurrently when `parallel` is set, each with its own
+    timeout. A module that raises or times out yields an error marker instead of
+    failing the whole analysis. The sequence is packed (2 bits/base) once and
+    shared by every module. Every call is timed (wall, CPU, optional peak memory).
+    `progress(name, state)` is told when a module is 'running' and when it is 'done'/'error'.
+    """
+    results = {}
+    if not names:
+        return results
+    progress = progress or _no_progress
+    length = len(sequence)
+    sequence = packed.PackedSequence(sequence)
+    trace = app.config['METRICS_MEMORY']
+
+    if not parallel or len(names) <= 1:
+        for name in names:
+            progress(name, "running")
+            res, exc, timing = timed_call(ANALYSIS_MODULES[name], (sequence,), params.get(name, {}), trace)
+            results[name] = module_error(name, exc) if exc else res
+            record_timing(name, length, timing, exc is not None)
+            progress(name, "error" if exc else "done")
+        return results
+
+    executor = get_module_executor()
+    started = time.monotonic()
+    futures = {}
+    for name in names:
+        futures[name] = executor.submit(timed_call, ANALYSIS_MODULES[name], (sequence,), params.get(name, {}), trace)
+        progress(name, "running")
+    for name, future in futures.items():
+        remaining = started + app.config['MODULE_TIMEOUTS'][name] - time.monotonic()
+        try:
+            res, exc, timing = future.result(timeout=max(0, remaining))
+            results[name] = module_error(name, exc) if exc else res
+            record_timing(name, length, timing, exc is not None)
+        except FutureTimeout:
+            future.cancel() # Only helps if it has not started; a running module finishes in the background
+            results[name] = module_error(name, None, timed_out=True)
+            record_timing(name, length, {"wall": app.config['MODULE_TIMEOUTS'][name], "cpu": None, "peak": None}, True, "timeout")
+        except Exception as exc:
+            results[name] = module_error(name, exc)
+        progress(name, "error" if results[name].get('status') == 'ERROR' else "done")
+    return results
+
+def module_key(seq_hash, name, params):
+    """Cache key of one module's result; optimization results also depend on the codon table's contents."""
+    options = params.get(name, {})
+    if name == "optimization":
+        options = {**options, "codon_table": codon_table_version(options)}
+    return make_key(seq_hash, name, options)
+
+def analysis_key(seq_hash, names, params):
+    key = {"modules": names, "params": params}
+    if "optimization" in names:
+        key["codon_table"] = codon_table_version(params.get("optimization", {}))
+    return make_key(seq_hash, "analysis", key)
+
+def analysis_version(names):
+    return "-".join(MODULE_VERSIONS[name] for name in names)
+
+def lookup_result(key, version):
+    """
+    Cached result of a key: memory first, then the persistent store (a store hit is
+    kept in memory too). Returns (where it was found: 'cache', 'store' or None, value).
+    """
+    found, value = result_cache.get(key)
+    if found:
+        return "cache", value
+    if result_store is not None:
+        try:
+            found, value = result_store.get(key, version)
+        except sqlite3.Error:
+            found = False # A locked or damaged store only costs a recomputation
+        if found:
+            result_cache.put(key, value)
+            return "store", value
+    return None, None
+
+def store_result(key, module, version, value):
+    result_cache.put(key, value)
+    if result_store is not None:
+        try:
+            result_store.put(key, module, version, value)
+        except sqlite3.Error:
+            pass
+
+def codon_table_version(options):
+    """Version (content hash) of the requested host table, so an edited table invalidates cached results."""
+    try:
+        return CODON_TABLES.get(options.get("host")).version
+    except CodonTableError:
+        return None # The module itself reports the error, and errors are never cached
+
+def run_analysis(sequence, params=None, parallel=None, modules=None, use_cache=True, progress=None):
+    """
+    Helper function to run all checks + Generate Visuals.
+    `modules` restricts the analysis to a subset of ANALYSIS_MODULES (nothing else
+    is computed); `params` maps a module name to keyword arguments for its runner. Results are
+    looked up in the content-addressed cache first (per module, or for the whole
+    analysis when RESULT_CACHE_GRANULARITY is 'analysis'); only the missing modules
+    are computed, concurrently unless `parallel` is False. Failed modules are never cached.
+    The whole call is timed as 'analysis'; `progress(name, state)` follows each module
+    ('cached', 'running', 'done', 'error').
+    """
+    results, exc, timing = timed_call(_run_analysis, (sequence, params, parallel, modules, use_cache, progress or _no_progress))
+    record_timing("analysis", len(sequence), timing, exc is not None)
+    if exc:
+        raise exc
+    return results
+
+def _run_analysis(sequence, params, parallel, modules, use_cache, progress):
+    params = params or {}
+    names = [name for name in ANALYSIS_MODULES if modules is None or name in modules]
+    if parallel is None:
+        parallel = app.config['PARALLEL_MODULES']
+    seq_hash = sequence_key(sequence)
+
+    if not use_cache:
+        return run_modules(sequence, params, names, parallel, progress)
+
+    if app.config['RESULT_CACHE_GRANULARITY'] == 'analysis':
+        key = analysis_key(seq_hash, names, params)
+        where, results = lookup_result(key, analysis_version(names))
+        if where:
+            record_timing("cache", len(sequence), None, desc=f"analysis {where} hit")
+            for name in names:
+                progress(name, "cached")
+        else:
+            results = run_modules(sequence, params, names, parallel, progress)
+            if not any(res.get('status') == 'ERROR' for res in results.values()):
+                store_result(key, "analysis", analysis_version(names), results)
+        return results
+
+    cached, missing = {}, []
+    for name in names:
+        where, value = lookup_result(module_key(seq_hash, name, params), MODULE_VERSIONS[name])
+        if where:
+            cached[name] = value
+            record_timing(name, len(sequence), None, desc=f"{where} hit")
+            progress(name, "cached")
+        else:
+            missing.append(name)
+
+    computed = run_modules(sequence, params, missing, parallel, progress)
+    for name, value in computed.items():
+        if value.get('status') != 'ERROR':
+            store_result(module_key(seq_hash, name, params), name, MODULE_VERSIONS[name], value)
+
+    cached.update(computed)
+    return {name: cached[name] for name in names}
+
+def run_reanalysis(previous_sequence, sequence, params=None, modules=None):
+    """
+    Incremental analysis of an edited sequence. The cached results of
+    `previous_sequence` (same modules and params) are patched around the edit by
+    INCREMENTAL_MODULES; every other module, or everything when the previous
+    results are not cached or the edit covers most of the sequence, goes through
+    run_analysis(). The patched results are cached for the new sequence, so a
+    chain of edits stays incremental. Returns (results, edit or None, {module: how}).
+    """
+    params = params or {}
+    names = [name for name in ANALYSIS_MODULES if modules is None or name in modules]
+    edit = incremental.diff_sequences(previous_sequence, sequence)
+    previous = {}
+    if edit is not None and edit[2] - edit[0] <= len(sequence) // 2:
+        previous = _cached_results(sequence_key(previous_sequence), names, params)
+
+    results, how = {}, {}
+    patched_sequence = packed.PackedSequence(sequence)
+    for name in names:
+        if name not in INCREMENTAL_MODULES or name not in previous or previous[name].get('status') == 'ERROR':
+            continue
+        res, exc, timing = timed_call(INCREMENTAL_MODULES[name], (previous[name], patched_sequence, edit), params.get(name, {}),
+                                      app.config['METRICS_MEMORY'])
+        record_timing(f"{name}.patch", len(sequence), timing, exc is not None)
+        if exc is None:
+            results[name], how[name] = res, "patched"
+
+    rest = [name for name in names if name not in results]
+    if rest:
+        results.update(run_analysis(sequence, params=params, modules=rest))
+        how.update(dict.fromkeys(rest, "computed"))
+    results = {name: results[name] for name in names}
+    _cache_results(sequence, names, params, {name: results[name] for name in results if how[name] == "patched"}, results)
+    return results, edit, how
+
+def _cached_results(seq_hash, names, params):
+    """{module: cached result} for the modules of a sequence (by hash) found in the result cache or store."""
+    if app.config['RESULT_CACHE_GRANULARITY'] == 'analysis':
+        where, results = lookup_result(analysis_key(seq_hash, names, params), analysis_version(names))
+        return results if where else {}
+    cached = {}
+    for name in names:
+        where, value = lookup_result(module_key(seq_hash, name, params), MODULE_VERSIONS[name])
+        if where:
+            cached[name] = value
+    return cached
+
+def _cache_results(sequence, names, params, patched, results):
+    seq_hash = sequence_key(sequence)
+    if app.config['RESULT_CACHE_GRANULARITY'] == 'analysis':
+        if not any(res.get('status') == 'ERROR' for res in results.values()):
+            store_result(analysis_key(seq_hash, names, params), "analysis", analysis_version(names), results)
+        return
+    for name, value in patched.items():
+        store_result(module_key(seq_hash, name, params), name, MODULE_VERSIONS[name], value)
+
+def bounded_results(results, sequence, params=None, modules=None):
+    """
+    Response view of `results` (see modules/payload.py): oversized fields are cut
+    down and point to their /api/results pages; the request's ?full=1 returns them as they are.
+    """
+    if has_request_context() and request.values.get('full') == '1':
+        return results
+    names = [name for name in ANALYSIS_MODULES if modules is None or name in modules]
+    handle = {"sequence": sequence_key(sequence), "modules": names, "params": params or {}}
+
+    def page_url(module, field):
+        return f"/api/results/{payloads.encode_handle({**handle, 'module': module})}/{field}"
+    return payloads.bound_results(results, len(sequence), page_url,
+                                 app.config['DETAIL_LIMIT'], app.config['SEQUENCE_LIMIT'])
+
+job_queue = JobQueue(run_analysis,
+                     broker=LocalBroker(max_queued=app.config['JOB_QUEUE_SIZE'], ttl=app.config['JOB_TTL']),
+                     workers=app.config['JOB_WORKERS'])
+
+def profiled_analysis(sequence, **kwargs):
+    """
+    ?profile=1 (when PROFILING is enabled): runs one uncached, sequential analysis
+    under cProfile + tracemalloc so every module shows up in the same profile.
+    The report is kept for GET /metrics/profile.
+    """
+    results, report = capture_profile(run_analysis, (sequence,), {**kwargs, "parallel": False, "use_cache": False})
+    report["length"] = len(sequence)
+    metrics.last_profile = report
+    return results, report
+
+def profiling_requested():
+    return app.config['PROFILING'] and request.values.get('profile') == '1'
+
+@app.before_request
+def start_request_timer():
+    g.timings = []
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response):
+    if 'timings' in g:
+        total = {"wall": time.perf_counter() - g.request_started, "cpu": None, "peak": None}
+        response.headers['Server-Timing'] = server_timing(g.timings + [("total", total, None)])
+    return response
+
+def extract_sequence(raw_text):
+    """Pasted input: a bare sequence or FASTA text (headers are dropped)."""
+    if ">" in raw_text:
+        lines = raw_text.splitlines()
+        return "".join([line.strip() for line in lines if not line.startswith(">")]).upper()
+    return "".join(raw_text.split()).upper()
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     results = None
     sequence = ""
+    job = None
+    error = None
     
     if request.method == 'POST':
         uploaded_file = request.files.get('file')
         if uploaded_file and uploaded_file.filename != '':
             try:
-                file_content = uploaded_file.read().decode("utf-8")
-                fasta_io = StringIO(file_content)
-                record = next(SeqIO.parse(fasta_io, "fasta"))
+                # Parsed straight from the upload stream (no decoded copy of the whole file)
+                record = next(SeqIO.parse(TextIOWrapper(uploaded_file.stream, encoding="utf-8"), "fasta"))
                 sequence = str(record.seq).upper()
             except:
                 pass
         else:
-            raw_text = request.form.get('sequence', '')
-            if ">" in raw_text:
-                lines = raw_text.splitlines()
-                sequence = "".join([line.strip() for line in lines if not line.startswith(">")]).upper()
-            else:
-                sequence = "".join(raw_text.split()).upper()
+            sequence = extract_sequence(request.form.get('sequence', ''))
 
         if sequence:
-            results = run_analysis(sequence)
-            
-    return render_template('index.html', results=results, sequence=sequence)
+            if profiling_requested():
+                results, _ = profiled_analysis(sequence)
+            elif len(sequence) > app.config['ASYNC_THRESHOLD']:
+                # Too big to analyze inside the request: queue it and let the page poll
+                try:
+                    job = job_queue.status(job_queue.submit(sequence, module_names=list(ANALYSIS_MODULES)))
+                except QueueFull as exc:
+                    error = str(exc)
+            else:
+                results = bounded_results(run_analysis(sequence), sequence)
+    elif request.args.get('job'):
+        # A finished background job renders like a synchronous analysis
+        job, results = job_queue.result(request.args['job'])
+        if job is None:
+            error = "Job not found or expired."
+        elif results is not None:
+            sequence = job_queue.sequence(job['id'])
+            results = bounded_results(results, sequence, *job_queue.options(job['id']))
+            job = None
+
+    return render_template('index.html', results=results, sequence=sequence, job=job, error=error)
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Analyzes every record of a multi-FASTA upload (or pasted text) in parallel."""
+    uploaded_file = request.files.get('file')
+    if uploaded_file and uploaded_file.filename != '':
+        fasta_text = uploaded_file.read().decode("utf-8")
+    else:
+        fasta_text = request.form.get('sequence', '')
+
+    records = batch_runner.parse_records(fasta_text)
+    if not records:
+        return jsonify({"error": "No FASTA records found"}), 400
+
+    workers = request.form.get('workers', type=int) or app.config['BATCH_WORKERS']
+    workers = max(1, min(workers, app.config['BATCH_WORKERS']))
+    # Records already run in parallel; their modules run one after another inside each worker
+    return jsonify(batch_runner.run_batch(records, partial(run_analysis, parallel=False), workers=workers))
+
+def report_records():
+    """
+    (record id, sequence, results) of every record of the /download input, analyzed
+    one at a time as the report is written: an uploaded (multi-)FASTA file, pasted
+    FASTA text or a bare sequence (record id None).
+    """
+    uploaded_file = request.files.get('file')
+    upload = None
+    if uploaded_file and uploaded_file.filename != '':
+        # Spooled to disk: the request stream is closed before the response is done
+        handle, upload = tempfile.mkstemp(suffix=".fasta")
+        os.close(handle)
+        uploaded_file.save(upload)
+        source = open(upload, encoding="utf-8")
+    else:
+        text = request.form.get('sequence', '')
+        source = StringIO(text if text.lstrip().startswith(">") else f">\n{text}")
+    try:
+        with source:
+            for record in SeqIO.parse(source, "fasta"):
+                sequence = normalize_sequence(str(record.seq))
+                if sequence:
+                    yield record.id or None, sequence, run_analysis(sequence)
+    finally:
+        if upload:
+            os.unlink(upload)
+
+def streamed_report(records, fmt):
+    """Chunked download of a report: the records are analyzed and written while the response streams."""
+    mimetype, extension = report.REPORT_FORMATS[fmt]
+    chunks = report.chunked(report.iter_report(records, fmt))
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-disposition": f"attachment; filename=biovalidator_report.{extension}"})
 
 @app.route('/download', methods=['POST'])
 def download():
-    sequence = request.form.get('sequence', '')
-    if not sequence: return "No sequence", 400
-    results = run_analysis(sequence)
-    report_content = generate_report_text(sequence, results)
-    return Response(report_content, mimetype="text/plain", headers={"Content-disposition": "attachment; filename=biovalidator_report.txt"})
+    """
+    Analysis report of one sequence or of every record of a multi-FASTA (form field
+    "sequence" or uploaded "file"), streamed as format=text (default), tsv or jsonl.
+    """
+    fmt = request.values.get('format', 'text')
+    if fmt not in report.REPORT_FORMATS:
+        return f"Unknown format (available: {', '.join(report.REPORT_FORMATS)})", 400
+    records = report_records()
+    first = next(records, None) # The first record is analyzed before the response starts
+    if first is None: return "No sequence", 400
+    return streamed_report(itertools.chain([first], records), fmt)
+
+def parse_analysis_request(sequence=None):
+    """
+    Shared by /api/analyze, /api/reanalyze and /jobs: JSON body {"sequence", "modules",
+    "params", "visuals"} or form/query values. Returns (sequence, modules, params, error response or None).
+    """
+    body = request.get_json(silent=True) or {}
+    if sequence is None:
+        raw_text = body.get('sequence') or request.values.get('sequence', '')
+        sequence = extract_sequence(raw_text)
+    if not sequence:
+        return None, None, None, (jsonify({"error": "No sequence"}), 400)
+
+    modules = body.get('modules') or request.args.get('modules') or request.form.get('modules')
+    if isinstance(modules, str):
+        modules = [name.strip() for name in modules.split(',') if name.strip()]
+    modules = modules or list(ANALYSIS_MODULES)
+    unknown = [name for name in modules if name not in ANALYSIS_MODULES]
+    if unknown:
+        return None, None, None, (jsonify({"error": f"Unknown modules: {', '.join(unknown)}", "available": list(ANALYSIS_MODULES)}), 400)
+
+    params = body.get('params') or {}
+    if request.values.get('visuals', '1') == '0' or body.get('visuals') is False:
+        for name in ("restriction", "optimization"):
+            params.setdefault(name, {})['visuals'] = False
+    return sequence, modules, params, None
+
+@app.route('/api/analyze', methods=['GET', 'POST'])
+def api_analyze():
+    """
+    JSON API: /api/analyze?modules=synthesis,restriction
+    Only the requested modules (and their visuals, unless visuals=0) are computed.
+    POST a JSON body {"sequence": ..., "modules": [...], "params": {...}} or form data.
+    """
+    sequence, modules, params, error = parse_analysis_request()
+    if error:
+        return error
+
+    payload = {"sequence_hash": sequence_key(sequence), "length": len(sequence)}
+    if profiling_requested():
+        results, payload["profile"] = profiled_analysis(sequence, params=params, modules=modules)
+    else:
+        results = run_analysis(sequence, params=params, modules=modules)
+    payload.update({"modules": list(results), "results": bounded_results(results, sequence, params, modules)})
+    return jsonify(payload)
+
+@app.route('/api/reanalyze', methods=['POST'])
+def api_reanalyze():
+    """
+    Incremental analysis after an edit. JSON body: {"previous_sequence": ..., and either
+    "sequence": the edited sequence, or "edits": [{"position": 1-based, "delete": n,
+    "insert": "ACG"}, ...]} plus the /api/analyze fields. Results of the previous
+    sequence (analyzed with the same modules/params) are patched around the edit.
+    """
+    body = request.get_json(silent=True) or {}
+    previous_sequence = extract_sequence(body.get('previous_sequence') or '')
+    if not previous_sequence:
+        return jsonify({"error": "No previous_sequence"}), 400
+    sequence = None
+    if body.get('edits') is not None:
+        try:
+            sequence = incremental.apply_edits(previous_sequence, body['edits'])
+        except (TypeError, ValueError, AttributeError) as exc:
+            return jsonify({"error": f"Invalid edits: {exc}"}), 400
+    sequence, modules, params, error = parse_analysis_request(sequence)
+    if error:
+        return error
+
+    results, edit, how = run_reanalysis(previous_sequence, sequence, params=params, modules=modules)
+    return jsonify({"sequence_hash": sequence_key(sequence), "length": len(sequence),
+                    "edit": incremental.edit_view(edit) if edit else None, "incremental": how,
+                    "modules": list(results), "results": bounded_results(results, sequence, params, modules)})
+
+@app.route('/api/results/<handle>/<path:field>')
+def result_page(handle, field):
+    """
+    One page of a field that a response cut down (its "paged" entry links here):
+    ?cursor= (offset, default 0) and ?limit= items, or bases for DNA fields.
+    Served from the result cache or store; 410 once the result is no longer there.
+    """
+    try:
+        request_key = payloads.decode_handle(handle)
+        name, names, params = request_key['module'], list(request_key['modules']), request_key['params']
+        cursor = int(request.args.get('cursor', 0))
+        limit = int(request.args.get('limit', payloads.PAGE_LIMIT))
+    except (ValueError, KeyError, TypeError):
+        return jsonify({"error": "Invalid handle, cursor or limit"}), 400
+    if name not in ANALYSIS_MODULES or field not in payloads.paged_fields(name) or not set(names) <= set(ANALYSIS_MODULES):
+        return jsonify({"error": f"No paged field '{field}'"}), 404
+    if cursor < 0 or not 1 <= limit <= payloads.PAGE_MAX:
+        return jsonify({"error": f"cursor must be >= 0 and limit between 1 and {payloads.PAGE_MAX}"}), 400
+    result = _cached_results(request_key['sequence'], names, params).get(name)
+    value = payloads.field_value(result, field) if result else None
+    if value is None:
+        return jsonify({"error": "Result expired; run the analysis again"}), 410
+    return jsonify({"module": name, "field": field, **payloads.page(value, cursor, limit)})
+
+def digest_cut_arrays(sequence, circular=False):
+    """{enzyme: sorted cut array} of a sequence, computed once per sequence and topology (cached)."""
+    key = make_key(sequence_key(sequence), "cut_arrays", {"circular": circular})
+    return result_cache.get_or_compute(key, lambda: digests.cut_arrays(restriction.get_engine().search(sequence, linear=not circular)))
+
+@app.route('/api/digest', methods=['POST'])
+def api_digest():
+    """
+    Virtual digests. JSON body: {"sequence", "topology": "linear" | "circular",
+    "digests": [["EcoRI", "BamHI"], ["NotI"]]} returns the fragments and gel bands of
+    those digests; without "digests", every single and double digest is screened
+    and the best-resolving ones ("top", "max_fragments") are returned.
+    """
+    body = request.get_json(silent=True) or {}
+    sequence = extract_sequence(body.get('sequence') or '')
+    if not sequence:
+        return jsonify({"error": "No sequence"}), 400
+    topology = body.get('topology', 'linear')
+    if topology not in ('linear', 'circular'):
+        return jsonify({"error": "topology must be 'linear' or 'circular'"}), 400
+    circular = topology == 'circular'
+    requested = body.get('digests')
+    if requested is not None:
+        if not isinstance(requested, list) or not all(isinstance(combo, list) and combo for combo in requested):
+            return jsonify({"error": "digests must be a list of enzyme lists"}), 400
+        unknown = sorted({str(name) for combo in requested for name in combo if name not in restriction.get_engine().order})
+        if unknown:
+            return jsonify({"error": f"Unknown enzymes: {', '.join(unknown)}"}), 400
+
+    arrays, exc, timing = timed_call(digest_cut_arrays, (sequence, circular))
+    record_timing("digest.cuts", len(sequence), timing, exc is not None)
+    if exc:
+        raise exc
+    payload = {"sequence_hash": sequence_key(sequence), "length": len(sequence), "topology": topology,
+               "uncut": digests.digest(arrays, [], len(sequence), circular)}
+    if requested is not None:
+        payload["digests"] = [digests.digest(arrays, combo, len(sequence), circular) for combo in requested]
+        return jsonify(payload)
+
+    max_fragments = max(2, int(body.get('max_fragments', DIGEST_MAX_FRAGMENTS)))
+    top = max(1, int(body.get('top', 20)))
+    screen, exc, timing = timed_call(digests.screen_digests, (arrays, len(sequence), circular, max_fragments, top))
+    record_timing("digest.screen", len(sequence), timing, exc is not None)
+    if exc:
+        raise exc
+    payload.update(screen)
+    return jsonify(payload)
+
+def fasta_path(name):
+    """A file under FASTA_DIR, or None if it is outside of it (or no directory is configured)."""
+    root = app.config['FASTA_DIR']
+    if not root or not name:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    return path if os.path.commonpath([root, path]) == root and os.path.isfile(path) else None
+
+@app.route('/api/scan', methods=['POST'])
+def api_scan():
+    """
+    Streaming scan of a (multi-)FASTA file of any size, e.g. a genome: upload it as
+    "file", or give the "path" of a file under BIOVALIDATOR_FASTA_DIR. Options (JSON
+    body or form): gc_window, homopolymer, enzymes, topology, max_details. The file is
+    memory-mapped and scanned chunk by chunk, see modules/streaming.py.
+    """
+    body = request.get_json(silent=True) or {}
+    option = lambda name, default=None: body.get(name, request.values.get(name, default))
+    topology = option('topology', 'linear')
+    if topology not in ('linear', 'circular'):
+        return jsonify({"error": "topology must be 'linear' or 'circular'"}), 400
+    enzymes = option('enzymes') or app.config['STREAM_ENZYMES'] or list(streaming.DEFAULT_ENZYMES)
+    if isinstance(enzymes, str):
+        enzymes = [name.strip() for name in enzymes.split(',') if name.strip()]
+    unknown = sorted({str(name) for name in enzymes if name not in restriction.get_engine().order})
+    if unknown:
+        return jsonify({"error": f"Unknown enzymes: {', '.join(unknown)}"}), 400
+    try:
+        options = {"gc_window": max(1, int(option('gc_window', 50))),
+                   "homopolymer_threshold": max(1, int(option('homopolymer', 6))),
+                   "max_details": max(0, int(option('max_details', streaming.MAX_DETAILS))),
+                   "enzymes": enzymes, "circular": topology == 'circular'}
+    except (TypeError, ValueError):
+        return jsonify({"error": "gc_window, homopolymer and max_details must be integers"}), 400
+
+    uploaded_file = request.files.get('file')
+    upload = None
+    if uploaded_file and uploaded_file.filename != '':
+        # Spooled to disk in blocks, then memory-mapped like any other file
+        handle, upload = tempfile.mkstemp(suffix=".fasta")
+        os.close(handle)
+        uploaded_file.save(upload)
+        path, name = upload, uploaded_file.filename
+    else:
+        name = option('path')
+        path = fasta_path(name)
+        if path is None:
+            return jsonify({"error": "Upload a FASTA file or give the path of a file in BIOVALIDATOR_FASTA_DIR"}), 400
+    try:
+        records, exc, timing = timed_call(list, (streaming.scan_fasta(path, **options),))
+        size = os.path.getsize(path)
+    finally:
+        if upload:
+            os.unlink(upload)
+    record_timing("scan", sum(record["length"] for record in records or ()), timing, exc is not None)
+    if exc:
+        raise exc
+    return jsonify({"file": name, "size": size, "topology": topology, "records": records})
+
+@app.route('/jobs', methods=['GET', 'POST'])
+def jobs():
+    """
+    POST: submit an analysis (same body as /api/analyze, plus optional "priority":
+    high/normal/low) and get a job id back immediately. GET: queue statistics.
+    """
+    if request.method == 'GET':
+        return jsonify(job_queue.stats())
+    sequence, modules, params, error = parse_analysis_request()
+    if error:
+        return error
+    priority = (request.get_json(silent=True) or {}).get('priority') or request.values.get('priority')
+    try:
+        job_id = job_queue.submit(sequence, params=params, modules=modules, module_names=modules, priority=priority)
+    except QueueFull as exc:
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": "30"}
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({**job_queue.status(job_id), "status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result"}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Status and per-module progress; DELETE cancels a job that has not started."""
+    if request.method == 'DELETE':
+        if not job_queue.cancel(job_id):
+            return jsonify({"error": "Job not found or already started"}), 409
+    view = job_queue.status(job_id)
+    if view is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify(view)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    view, results = job_queue.result(job_id)
+    if view is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    if view['status'] == 'failed':
+        return jsonify(view), 500
+    if results is None:
+        return jsonify(view), 202 # Not finished yet (or cancelled)
+    bounded = bounded_results(results, job_queue.sequence(job_id), *job_queue.options(job_id))
+    return jsonify({"job": view, "length": view['length'], "modules": list(results), "results": bounded})
+
+@app.route('/jobs/<job_id>/report')
+def job_report(job_id):
+    """Streamed report (format=text, tsv or jsonl) of a finished job."""
+    fmt = request.args.get('format', 'text')
+    if fmt not in report.REPORT_FORMATS:
+        return jsonify({"error": f"Unknown format (available: {', '.join(report.REPORT_FORMATS)})"}), 400
+    view, results = job_queue.result(job_id)
+    if view is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    if view['status'] == 'failed':
+        return jsonify(view), 500
+    if results is None:
+        return jsonify(view), 202 # Not finished yet (or cancelled)
+    return streamed_report([(None, job_queue.sequence(job_id), results)], fmt)
+
+@app.route('/api/hosts')
+def api_hosts():
+    """Expression hosts available to the optimization param "host" (and table files that failed validation)."""
+    return jsonify({"default": CODON_TABLES.default, "hosts": CODON_TABLES.hosts(), "errors": CODON_TABLES.errors()})
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Memory cache counters, and those of the persistent store (this process's hits and misses)."""
+    store = {"enabled": False, "error": RESULT_STORE_ERROR} if result_store is None else {"enabled": True, **result_store.stats()}
+    return jsonify({**result_cache.stats(), "store": store})
+
+@app.route('/metrics')
+def metrics_view():
+    """Latency histograms by module and sequence-length bucket (this process only)."""
+    return jsonify({**metrics.snapshot(), "memory_tracking": app.config['METRICS_MEMORY'],
+                    "startup": {**STARTUP, "lazy_imports": dict(LOAD_TIMES)}})
+
+@app.route('/metrics/profile')
+def last_profile():
+    if metrics.last_profile is None:
+        return jsonify({"error": "No profile captured (enable BIOVALIDATOR_PROFILING and add ?profile=1)"}), 404
+    return jsonify(metrics.last_profile)
+
+# --- STARTUP ---
+def warm_up():
+    """
+    Loads what the first request would otherwise pay for: the analysis modules
+    (NumPy, Biopython), the restriction automaton and the host codon tables.
+    In a pre-fork parent the forked workers then share these pages; gc.freeze()
+    keeps the collector from touching (and so copying) them in every worker.
+    """
+    import gc
+    started = time.perf_counter()
+    for module in LAZY_MODULES:
+        module.load()
+    restriction.get_engine()
+    CODON_TABLES.hosts()
+    gc.freeze()
+    STARTUP["warmup_sec"] = round(time.perf_counter() - started, 4)
+
+# Seconds spent importing this module (app ready to serve) and in warm_up()
+STARTUP = {"import_sec": round(time.perf_counter() - _import_started, 4), "warmup_sec": None}
+if app.config['WARMUP']:
+    warm_up()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import numpy as np
+
+from modules.codon_tables import CODON_TABLES
+
+# Reproducible synthetic inputs. Every generator takes (length, seed) and
+# returns an upper-case DNA string of exactly `length` bases.
+_LETTERS = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+def _decode(codes):
+    return _LETTERS[codes].tobytes().decode("ascii")
+
+def _random_codes(rng, length, gc=0.5):
+    at, cg = (1 - gc) / 2, gc / 2
+    return rng.choice(4, size=length, p=[at, cg, cg, at]).astype(np.uint8)
+
+def uniform(length, seed=0):
+    """Uniform random bases (50% GC)."""
+    return _decode(_random_codes(np.random.default_rng(seed), length))
+
+def gc_skewed(length, seed=0, gc=0.72):
+    """Random bases with a skewed GC content (default 72%)."""
+    return _decode(_random_codes(np.random.default_rng(seed), length, gc))
+
+def repeat_rich(length, seed=0, unit=300, mutation_rate=0.01):
+    """Copies (direct and reverse-complement) of a few repeat units with point mutations."""
+    rng = np.random.default_rng(seed)
+    units = [_random_codes(rng, unit) for _ in range(8)]
+    chunks, filled = [], 0
+    while filled < length:
+        chunk = units[rng.integers(len(units))].copy()
+        if rng.random() < 0.3:
+            chunk = 3 - chunk[::-1]
+        mutated = rng.random(unit) < mutation_rate
+        chunk[mutated] = rng.integers(0, 4, int(mutated.sum()))
+        spacer = _random_codes(rng, int(rng.integers(0, 50)))
+        chunks += [chunk, spacer]
+        filled += len(chunk) + len(spacer)
+    return _decode(np.concatenate(chunks)[:length])
+
+def homopolymer_rich(length, seed=0, every=200):
+    """Random background with a 6-20 bp homopolymer run about every `every` bases."""
+    rng = np.random.default_rng(seed)
+    codes = _random_codes(rng, length)
+    for start in range(0, length, every):
+        run = int(rng.integers(6, 21))
+        codes[start:start + run] = rng.integers(4)
+    return _decode(codes)
+
+def codon_biased(length, seed=0):
+    """ORF (ATG ... stop) whose codons follow the E. coli usage weights; no internal stops."""
+    rng = np.random.default_rng(seed)
+    codon_weights = CODON_TABLES.get("ecoli").weights
+    sense = [c for c in codon_weights if c not in ("TAA", "TAG", "TGA")]
+    weights = np.array([codon_weights[c] for c in sense]) + 0.01
+    count = max(0, length // 3 - 2)
+    body = "".join(np.array(sense)[rng.choice(len(sense), size=count, p=weights / weights.sum())])
+    orf = "ATG" + body + "TAA"
+    return (orf + uniform(length, seed)[len(orf):])[:length]
+
+GENERATORS = {
+    "uniform": uniform,
+    "gc_skewed": gc_skewed,
+    "repeat_rich": repeat_rich,
+    "homopolymer_rich": homopolymer_rich,
+    "codon_biased": codon_biased
+}
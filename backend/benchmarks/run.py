@@ -0,0 +1,225 @@
+"""
+Benchmark suite: times and memory-profiles the public analysis functions on
+reproducible synthetic sequences (see benchmarks/generators.py).
+
+Run from the backend directory:
+    python -m benchmarks.run                                  # 1 kb - 100 kb, every profile
+    python -m benchmarks.run --sizes 1k,100k,10M --only check_repeats,predict_problems
+    python -m benchmarks.run --compare baseline.json          # flags slowdowns, exit code 1
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import Bio
+import numpy as np
+
+from benchmarks.generators import GENERATORS
+from modules.synthesis import check_repeats, get_gc_plot_data
+from modules.restriction import find_restriction_sites
+from modules.optimization import optimize_sequence
+from modules.prediction import predict_problems
+from modules.visualization import generate_plasmid_map
+
+SIZE_UNITS = {"k": 1_000, "m": 1_000_000}
+DEFAULT_SIZES = "1k,10k,100k"
+
+def _full_analysis(sequence):
+    import app # Flask app; imported lazily so the module benchmarks don't need it
+    return app.run_analysis(sequence, use_cache=False) # Measure the computation, not the cache or the store
+
+# name -> (setup(sequence) -> args, function). Setup time is not measured.
+BENCHMARKS = {
+    "check_repeats": (lambda seq: (seq,), check_repeats),
+    "get_gc_plot_data": (lambda seq: (seq,), get_gc_plot_data),
+    "find_restriction_sites": (lambda seq: (seq,), find_restriction_sites),
+    "optimize_sequence": (lambda seq: (seq,), optimize_sequence),
+    "predict_problems": (lambda seq: (seq,), predict_problems),
+    "generate_plasmid_map": (lambda seq: (seq, find_restriction_sites(seq)["sites"]), generate_plasmid_map),
+    "run_analysis": (lambda seq: (seq,), _full_analysis)
+}
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+def format_size(size):
+    for unit, factor in (("M", 1_000_000), ("k", 1_000)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+def measure(fn, args, repeats=3, long_run=2.0):
+    """Best/mean wall time over `repeats` runs (fewer for slow calls) + peak traced memory of one run."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+        if timings[-1] > long_run:
+            break
+
+    tracemalloc.start()
+    try:
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(timings), sum(timings) / len(timings), len(timings), peak
+
+def run_suite(sizes, profiles, names, repeats=3, budget=60.0, seed=0, log=print):
+    """
+    Runs every benchmark on every (profile, size). Once a function takes more than
+    `budget` seconds on a profile, its larger sizes are skipped for that profile.
+    """
+    results = []
+    over_budget = set()
+    for profile in profiles:
+        for size in sorted(sizes):
+            sequence = GENERATORS[profile](size, seed)
+            for name in names:
+                entry = {"function": name, "profile": profile, "size": size}
+                if (name, profile) in over_budget:
+                    entry["skipped"] = "budget"
+                    results.append(entry)
+                    continue
+                setup, fn = BENCHMARKS[name]
+                try:
+                    best, mean, runs, peak = measure(fn, setup(sequence), repeats)
+                except Exception as exc:
+                    entry["error"] = f"{type(exc).__name__}: {exc}"
+                    results.append(entry)
+                    log(f"{name:<24}{profile:<18}{format_size(size):>6}  ERROR {entry['error']}")
+                    continue
+                entry.update({
+                    "best_sec": round(best, 6),
+                    "mean_sec": round(mean, 6),
+                    "runs": runs,
+                    "peak_bytes": peak,
+                    "bytes_per_base": round(peak / size, 2),
+                    "bases_per_sec": round(size / best) if best > 0 else None
+                })
+                results.append(entry)
+                log(f"{name:<24}{profile:<18}{format_size(size):>6}  {best:>10.4f}s  {peak / 1e6:>10.1f} MB")
+                if best > budget:
+                    over_budget.add((name, profile))
+    return results
+
+def scaling_exponents(results):
+    """Empirical exponent b of time ~ size^b per function/profile (log-log fit over sizes >= 10 kb)."""
+    points = {}
+    for entry in results:
+        if "best_sec" in entry and entry["size"] >= 10_000 and entry["best_sec"] > 0:
+            points.setdefault(f"{entry['function']}/{entry['profile']}", []).append((entry["size"], entry["best_sec"]))
+    exponents = {}
+    for key, pts in points.items():
+        if len(pts) >= 2:
+            x = np.log([p[0] for p in pts])
+            y = np.log([p[1] for p in pts])
+            exponents[key] = round(float(np.polyfit(x, y, 1)[0]), 2)
+    return exponents
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "biopython": Bio.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def compare(current, baseline, time_tolerance=0.25, memory_tolerance=0.25, noise_floor=0.001):
+    """
+    Matches entries by (function, profile, size). A slowdown is flagged when the best
+    time grows by more than `time_tolerance` (and by more than `noise_floor` seconds);
+    a memory regression when the peak grows by more than `memory_tolerance` (and 1 MB).
+    """
+    reference = {(e["function"], e["profile"], e["size"]): e for e in baseline["results"] if "best_sec" in e}
+    regressions = []
+    for entry in current["results"]:
+        base = reference.get((entry["function"], entry["profile"], entry["size"]))
+        if base is None or "best_sec" not in entry:
+            continue
+        time_ratio = entry["best_sec"] / base["best_sec"] if base["best_sec"] > 0 else math.inf
+        if time_ratio > 1 + time_tolerance and entry["best_sec"] - base["best_sec"] > noise_floor:
+            regressions.append({**_key(entry), "metric": "time", "baseline": base["best_sec"], "current": entry["best_sec"], "ratio": round(time_ratio, 2)})
+        memory_ratio = entry["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] > 0 else math.inf
+        if memory_ratio > 1 + memory_tolerance and entry["peak_bytes"] - base["peak_bytes"] > 1_000_000:
+            regressions.append({**_key(entry), "metric": "memory", "baseline": base["peak_bytes"], "current": entry["peak_bytes"], "ratio": round(memory_ratio, 2)})
+    return regressions
+
+def _key(entry):
+    return {"function": entry["function"], "profile": entry["profile"], "size": entry["size"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BioValidator benchmark suite")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated lengths, e.g. 1k,10k,10M (default {DEFAULT_SIZES})")
+    parser.add_argument("--profiles", default=",".join(GENERATORS), help="sequence generators to use")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="functions to benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=60.0, help="skip larger sizes once a call exceeds this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--current", help="compare an existing results file instead of running the suite")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag slowdowns against a stored results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.current:
+        with open(args.current) as fh:
+            current = json.load(fh)
+    else:
+        names = [n.strip() for n in args.only.split(",") if n.strip()]
+        profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+        unknown = [n for n in names if n not in BENCHMARKS] + [p for p in profiles if p not in GENERATORS]
+        if unknown:
+            parser.error(f"unknown benchmark or profile: {', '.join(unknown)}")
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+        warnings.simplefilter("ignore") # Biopython partial-codon warnings on odd lengths
+        results = run_suite(sizes, profiles, names, args.repeats, args.budget, args.seed)
+        current = {
+            "environment": environment(),
+            "config": {"sizes": sizes, "profiles": profiles, "functions": names, "repeats": args.repeats, "seed": args.seed},
+            "results": results,
+            "scaling": scaling_exponents(results)
+        }
+        with open(args.output, "w") as fh:
+            json.dump(current, fh, indent=2)
+        print(f"\nResults written to {args.output}")
+        for key, exponent in sorted(current["scaling"].items()):
+            print(f"  scaling {key:<42} ~ n^{exponent}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.tolerance, args.memory_tolerance)
+        if not regressions:
+            print(f"No regressions against {args.compare}.")
+            return 0
+        print(f"{len(regressions)} regression(s) against {args.compare}:")
+        for reg in regressions:
+            print(f"  {reg['metric']:<7}{reg['function']:<24}{reg['profile']:<18}{format_size(reg['size']):>6}  "
+                  f"{reg['baseline']} -> {reg['current']} (x{reg['ratio']})")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Cold-start benchmark: each run starts a fresh interpreter that imports the app,
+optionally warms it up, and serves one first request.
+
+Run from the backend directory:
+    python -m benchmarks.startup                              # 5 cold + 5 warmed-up runs
+    python -m benchmarks.startup --output startup.json --compare startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.run import environment
+
+# Child process; every timestamp is taken inside it except the spawn time
+PROBE = r"""
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+if {warm}:
+    app.warm_up()
+ready = time.perf_counter()
+ready_at = time.time()
+response = app.app.test_client().post("/api/analyze?visuals=0", json={{"sequence": "ATG" + "GCTAAAGAAGTT" * 100}})
+done = time.perf_counter()
+print(json.dumps({{"import_sec": imported - started, "warmup_sec": ready - imported, "ready_at": ready_at,
+                  "first_request_sec": done - ready, "status": response.status_code}}))
+"""
+METRICS = ("spawn_to_ready_sec", "import_sec", "warmup_sec", "first_request_sec", "ready_to_first_response_sec")
+
+def probe(warm):
+    spawned = time.time()
+    env = {**os.environ, "BIOVALIDATOR_STORE": ""} # The first request computes, whatever earlier runs stored
+    out = subprocess.run([sys.executable, "-c", PROBE.format(warm=warm)], capture_output=True, text=True, check=True, env=env).stdout
+    run = json.loads(out.strip().splitlines()[-1])
+    run["spawn_to_ready_sec"] = run.pop("ready_at") - spawned # Includes interpreter start-up
+    run["ready_to_first_response_sec"] = run["warmup_sec"] + run["first_request_sec"]
+    return run
+
+def run_startup(runs=5, log=print):
+    results = []
+    for mode, warm in (("cold", False), ("warm_up", True)):
+        samples = [probe(warm) for _ in range(runs)]
+        if any(sample["status"] != 200 for sample in samples):
+            raise RuntimeError(f"First request failed in {mode} mode")
+        entry = {"mode": mode, "runs": runs}
+        for metric in METRICS:
+            entry[metric] = round(statistics.median(sample[metric] for sample in samples), 4)
+        results.append(entry)
+        log(f"{mode:<8}" + "  ".join(f"{metric} {entry[metric]:.3f}s" for metric in METRICS))
+    return results
+
+def compare(current, baseline, tolerance=0.25, noise_floor=0.01):
+    """Flags a median that grew by more than `tolerance` (and by more than `noise_floor` seconds)."""
+    reference = {entry["mode"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        base = reference.get(entry["mode"])
+        if base is None:
+            continue
+        for metric in METRICS:
+            if metric in base and entry[metric] - base[metric] > max(noise_floor, tolerance * base[metric]):
+                regressions.append({"mode": entry["mode"], "metric": metric, "baseline": base[metric], "current": entry[metric]})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BioValidator cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode (medians are reported)")
+    parser.add_argument("--output", default="startup_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag slower start-up against a stored results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    current = {"environment": environment(), "results": run_startup(args.runs)}
+    with open(args.output, "w") as fh:
+        json.dump(current, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.tolerance)
+        if not regressions:
+            print(f"No regressions against {args.compare}.")
+            return 0
+        print(f"{len(regressions)} regression(s) against {args.compare}:")
+        for reg in regressions:
+            print(f"  {reg['mode']:<8}{reg['metric']:<30}{reg['baseline']} -> {reg['current']}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
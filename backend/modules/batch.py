@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import time
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+
+from Bio import SeqIO
+
+# Columns of the merged batch table (one row per record)
+BATCH_COLUMNS = [
+    "id", "length", "gc", "gc_status", "homopolymers", "repeats", "tandem_repeats", "low_complexity",
+    "single_cutters", "cai_before", "cai_after", "safety_score", "safety_status", "error"
+]
+
+def process_context():
+    """
+    Start method for worker pools. The server is multithreaded (job workers, the
+    module pool, cache locks), and a forked child can inherit a lock held by another
+    thread; forkserver (spawn where unavailable) starts workers from a clean process.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def parse_records(fasta_text):
+    """Parses every record of a (multi-)FASTA string into (id, sequence) pairs."""
+    records = []
+    for record in SeqIO.parse(StringIO(fasta_text), "fasta"):
+        sequence = str(record.seq).upper()
+        if sequence:
+            records.append((record.id, sequence))
+    return records
+
+def summarize_record(record_id, sequence, results):
+    """Condenses a full run_analysis() result into one flat table row."""
+    s = results['synthesis']
+    r = results['restriction']
+    o = results['optimization']
+    p = results['prediction']
+    return {
+        "id": record_id,
+        "length": len(sequence),
+        "gc": s['gc']['value'],
+        "gc_status": s['gc']['status'],
+        "homopolymers": s['homopolymers']['count'],
+        "repeats": s['repeats']['count'],
+        "tandem_repeats": s['tandem_repeats']['count'],
+        "low_complexity": s['low_complexity']['count'],
+        "single_cutters": len(r.get('single_cutters', [])),
+        "cai_before": o.get('cai_before'),
+        "cai_after": o.get('cai_after'),
+        "safety_score": p['score'],
+        "safety_status": p['status'],
+        "error": None
+    }
+
+def _analyze_record(job):
+    """Worker entry point. Only the summary row travels back to the parent."""
+    analyze_fn, record_id, sequence = job
+    try:
+        return summarize_record(record_id, sequence, analyze_fn(sequence))
+    except Exception as exc:
+        row = dict.fromkeys(BATCH_COLUMNS)
+        row.update({"id": record_id, "length": len(sequence), "error": str(exc)})
+        return row
+
+def run_batch(records, analyze_fn, workers=None):
+    """
+    Batch Mode: Runs analyze_fn on every (id, sequence) record across a pool of
+    worker processes. Returns per-record summaries, the merged table and throughput.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(records) or 1))
+    jobs = [(analyze_fn, record_id, sequence) for record_id, sequence in records]
+
+    started = time.perf_counter()
+    if workers == 1:
+        summaries = [_analyze_record(job) for job in jobs]
+    else:
+        # Small chunks keep all workers busy when record lengths are uneven
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as pool:
+            summaries = list(pool.map(_analyze_record, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "records": summaries,
+        "table": {
+            "columns": BATCH_COLUMNS,
+            "rows": [[row[col] for col in BATCH_COLUMNS] for row in summaries]
+        },
+        "count": len(summaries),
+        "failed": sum(1 for row in summaries if row['error']),
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+        "records_per_sec": round(len(summaries) / elapsed, 2) if elapsed > 0 else None
+    }
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import pickle
+import threading
+from collections import OrderedDict
+
+def normalize_sequence(sequence):
+    """Canonical form used for analysis and cache keys (no whitespace, upper case)."""
+    return "".join(sequence.split()).upper()
+
+def sequence_key(sequence):
+    """Content address of a (normalized) sequence."""
+    return hashlib.sha256(sequence.encode("utf-8")).hexdigest()
+
+def make_key(seq_hash, module, params=None):
+    """Cache key = sequence hash + module name + canonical JSON of the parameters."""
+    return f"{seq_hash}:{module}:{json.dumps(params or {}, sort_keys=True)}"
+
+class ResultCache:
+    """
+    Thread-safe LRU cache for analysis results.
+    Bounded both by entry count and by the (pickled) size of the stored results;
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, size)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns (found, value) and refreshes the entry's LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return # Would evict everything else; don't cache it
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,249 @@
+import math
+import re
+
+import numpy as np
+from Bio.Seq import Seq
+
+from modules.prediction import CHI_SITE, CHI_SITE_REVERSE
+from modules.restriction import enzyme_site
+
+# Cost of one constraint violation, in log-weight units (a codon weight of 0.001 costs ~7)
+VIOLATION_PENALTY = 1000.0
+
+_IUPAC = {
+    "A": "A", "C": "C", "G": "G", "T": "T", "R": "[AG]", "Y": "[CT]", "S": "[CG]", "W": "[AT]",
+    "K": "[GT]", "M": "[AC]", "B": "[CGT]", "D": "[AGT]", "H": "[ACT]", "V": "[ACG]", "N": "[ACGT]"
+}
+
+def make_rules(gc_min=30, gc_max=70, gc_window=50, homopolymer_limit=6, avoid_sites=(), avoid_chi=True):
+    """
+    Normalizes the design constraints:
+    - every full `gc_window` bp window keeps its GC % within [gc_min, gc_max]
+    - no run of `homopolymer_limit` or more identical bases (0 disables)
+    - none of `avoid_sites` (enzyme names or IUPAC sites, both strands) nor, with
+      avoid_chi, the Chi site GCTGGTGG on either strand (as predict_problems() flags it)
+    Raises ValueError for unknown enzymes or malformed values.
+    """
+    gc_min, gc_max, gc_window, homopolymer_limit = float(gc_min), float(gc_max), int(gc_window), int(homopolymer_limit)
+    if not 0 <= gc_min <= gc_max <= 100 or gc_window < 1 or homopolymer_limit < 0:
+        raise ValueError("Invalid GC range, window or homopolymer limit")
+
+    motifs = {}
+    for name in avoid_sites or ():
+        site = _site_of(str(name).strip())
+        motifs[site] = name
+        motifs.setdefault(str(Seq(site).reverse_complement()), name)
+    if avoid_chi:
+        motifs.setdefault(CHI_SITE, "Chi")
+        motifs.setdefault(CHI_SITE_REVERSE, "Chi")
+
+    by_length = {}
+    for site in motifs:
+        by_length.setdefault(len(site), []).append("".join(_IUPAC[base] for base in site))
+    reach = max([gc_window, homopolymer_limit] + list(by_length))
+    return {
+        "gc_min": gc_min,
+        "gc_max": gc_max,
+        "gc_window": gc_window,
+        "gc_lo": math.ceil(gc_min * gc_window / 100 - 1e-9), # Allowed GC base counts per window
+        "gc_hi": math.floor(gc_max * gc_window / 100 + 1e-9),
+        "homopolymer_limit": homopolymer_limit,
+        "avoid_sites": sorted(set(motifs.values()), key=str),
+        "motifs": [(length, re.compile("|".join(patterns))) for length, patterns in sorted(by_length.items())],
+        "reach": reach # Bases of context that decide whether a new codon breaks a rule
+    }
+
+def _site_of(name):
+    try:
+        return enzyme_site(name)
+    except ValueError:
+        site = name.upper()
+        if site and all(base in _IUPAC for base in site):
+            return site
+        raise ValueError(f"Unknown enzyme or site '{name}'")
+
+def find_violations(dna, rules, fixable=None):
+    """
+    Every rule violation of a finished sequence: [{"type", "start", "end", "detail"}]
+    (1-based, inclusive). Consecutive failing GC windows are reported as one region;
+    `fixable` (bool per window start) drops the windows no codon choice can fix.
+    """
+    violations = []
+    window = rules["gc_window"]
+    if len(dna) >= window:
+        gc = np.frombuffer(dna.encode("ascii", "replace"), dtype=np.uint8)
+        gc_cum = np.concatenate(([0], np.cumsum((gc == ord("G")) | (gc == ord("C")))))
+        counts = gc_cum[window:] - gc_cum[:-window]
+        bad = (counts < rules["gc_lo"]) | (counts > rules["gc_hi"])
+        if fixable is not None:
+            bad &= fixable
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], bad.astype(np.int8), [0]))))
+        for first, last in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            worst = counts[first:last]
+            extreme = int(worst.max()) if worst.max() > rules["gc_hi"] else int(worst.min())
+            violations.append({"type": "GC window", "start": first + 1, "end": last - 1 + window,
+                               "detail": f"{round(extreme / window * 100, 1)}% GC"})
+
+    limit = rules["homopolymer_limit"]
+    if limit:
+        for match in re.finditer(r"([ACGT])\1{%d,}" % (limit - 1), dna):
+            violations.append({"type": "Homopolymer", "start": match.start() + 1, "end": match.end(),
+                               "detail": f"{len(match.group())}x {match.group(1)}"})
+
+    for length, pattern in rules["motifs"]:
+        for match in re.finditer(f"(?=({pattern.pattern}))", dna):
+            violations.append({"type": "Forbidden site", "start": match.start() + 1, "end": match.start() + length,
+                               "detail": match.group(1)})
+    violations.sort(key=lambda v: (v["start"], v["end"]))
+    return violations
+
+def codon_choices(protein, candidates):
+    """
+    Candidate (codon, log weight) lists per residue, best first, from a host
+    table's per amino acid candidates (CodonTable.candidates). Unknown residues get NNN.
+    """
+    unknown = [("NNN", 0.0)]
+    return [candidates.get(aa, unknown) for aa in protein]
+
+def design_codons(choices, rules, beam_width=16, padding=4, retry_factor=4):
+    """
+    Constraint-aware codon choice maximizing CAI (the sum of log weights).
+    Starts from the best codon per residue; only the regions that break a rule
+    (plus `padding` codons each side) are redesigned, left to right, by a beam
+    search over synonymous codons whose state is the last `reach` bases. The
+    regions still failing afterwards get one more pass with a `retry_factor`
+    times wider beam. Work is linear in protein length: beam width x candidates
+    per redesigned codon. Returns (codons, number of redesigned codons).
+    """
+    codons = [options[0][0] for options in choices]
+    context = -(-rules["reach"] // 3) # Codons of context that can interact with a redesigned codon
+    fixable = _gc_fixable(choices, rules)
+    redesigned = set()
+    for width in (beam_width, beam_width * retry_factor):
+        violations = find_violations("".join(codons), rules, fixable)
+        if not violations or width < 1:
+            break
+        for first, last in _segments(violations, len(codons), padding, context):
+            codons[first:last] = _beam(codons, first, last, choices, rules, width, context)
+            redesigned.update(range(first, last))
+    return codons, len(redesigned)
+
+def _gc_fixable(choices, rules):
+    """
+    Windows whose GC count can reach the allowed range with some codon choice:
+    exact bounds for the codons inside the window, per codon part for the two
+    codons cut by its edges. Windows outside the bounds are not worth a search.
+    """
+    window = rules["gc_window"]
+    count = len(choices)
+    if 3 * count < window:
+        return None
+    # Per codon: GC range of the whole codon, of its last 2 / last base, of its first / first 2 bases
+    parts = (slice(0, 3), slice(1, 3), slice(2, 3), slice(0, 1), slice(0, 2))
+    ranges = {}
+    low, high = np.zeros((len(parts), count + 1), dtype=np.int64), np.zeros((len(parts), count + 1), dtype=np.int64)
+    for index, options in enumerate(choices):
+        if id(options) not in ranges:
+            gc = [[sum(base in "GC" for base in codon[part]) for part in parts] for codon, _ in options]
+            ranges[id(options)] = ([min(col) for col in zip(*gc)], [max(col) for col in zip(*gc)])
+        low[:, index], high[:, index] = ranges[id(options)]
+
+    starts = np.arange(3 * count - window + 1)
+    first, offset = starts // 3, starts % 3
+    stop, remainder = (starts + window) // 3, (starts + window) % 3
+    inner = first + (offset > 0) # First codon fully inside the window
+    bounds = []
+    for table in (low, high):
+        full_cum = np.concatenate(([0], np.cumsum(table[0, :count])))
+        total = full_cum[stop] - full_cum[inner]
+        total += np.where(offset == 1, table[1, first], 0) + np.where(offset == 2, table[2, first], 0)
+        total += np.where(remainder == 1, table[3, stop], 0) + np.where(remainder == 2, table[4, stop], 0)
+        bounds.append(total)
+    return (bounds[1] >= rules["gc_lo"]) & (bounds[0] <= rules["gc_hi"])
+
+def _segments(violations, count, padding, context):
+    """Codon ranges to redesign: each violation plus padding, merged when their contexts overlap."""
+    segments = []
+    for violation in violations:
+        first = max(0, (violation["start"] - 1) // 3 - padding)
+        last = min(count, -(-violation["end"] // 3) + padding)
+        if segments and first <= segments[-1][1] + context:
+            segments[-1][1] = max(segments[-1][1], last)
+        else:
+            segments.append([first, last])
+    return segments
+
+def _beam(codons, first, last, choices, rules, beam_width, context):
+    """Best codons for positions [first, last) given the codons around them."""
+    reach = rules["reach"]
+    window, gc_lo, gc_hi = rules["gc_window"], rules["gc_lo"], rules["gc_hi"]
+    window_mask = (1 << window) - 1
+    limit = rules["homopolymer_limit"] or math.inf
+    motifs = rules["motifs"]
+
+    tail = "".join(codons[max(0, first - context):first])[-reach:]
+    mask = 0
+    for base in tail[-window:]:
+        mask = (mask << 1) | (base in "GC")
+    run_base, run = (tail[-1], len(tail) - len(tail.rstrip(tail[-1]))) if tail else ("", 0)
+    position = 3 * first # Sequence index of the next base
+    stop = min(len(codons), last + context) # Fixed codons after the segment still score the junction
+
+    # Lookahead: fewest / most GC bases still reachable ahead, so that a window
+    # already bound to fail ranks low before it is complete
+    low, high = [0], [0]
+    for index in range(first, min(len(codons), stop + context)):
+        options = choices[index] if index < last else [(codons[index], 0.0)]
+        for offset in range(3):
+            gc = [codon[offset] in "GC" for codon, _ in options]
+            low.append(low[-1] + min(gc))
+            high.append(high[-1] + max(gc))
+    ahead = [(future, (1 << (window - future)) - 1) for future in range(3, window, 3)]
+
+    # Hypothesis: (rank, score, tail, GC bit mask of the last `window` bases, run base, run length, path)
+    beam = [(0.0, 0.0, tail, mask, run_base, run, None)]
+    for index in range(first, stop):
+        options = choices[index] if index < last else [(codons[index], 0.0)]
+        done = position + 3 - 3 * first # Bases placed after this codon
+        checks = [(placed, low[done + future] - low[done], high[done + future] - high[done])
+                  for future, placed in ahead if done + future < len(low) and position + 3 + future >= window]
+        best = {}
+        for _, score, tail, mask, run_base, run, path in beam:
+            for codon, log_weight in options:
+                penalty = 0
+                bits, last_base, length_run = mask, run_base, run
+                for offset, base in enumerate(codon):
+                    if base == last_base:
+                        length_run += 1
+                        if length_run == limit:
+                            penalty += 1
+                    else:
+                        last_base, length_run = base, 1
+                    bits = ((bits << 1) | (base in "GC")) & window_mask
+                    if position + offset >= window - 1 and not gc_lo <= bits.bit_count() <= gc_hi:
+                        penalty += 1
+                text = tail + codon
+                for length, pattern in motifs:
+                    for end in range(len(text) - 2, len(text) + 1):
+                        if end >= length and pattern.fullmatch(text, end - length, end):
+                            penalty += 1
+                key = text[-reach:]
+                total = score + log_weight - VIOLATION_PENALTY * penalty
+                # Identical recent bases = identical future: keep the better hypothesis (DP merge)
+                if key not in best or total > best[key][1]:
+                    doomed = 0
+                    for placed, fewest, most in checks:
+                        count = (bits & placed).bit_count()
+                        if count + fewest > gc_hi or count + most < gc_lo:
+                            doomed += 1
+                    best[key] = (total - VIOLATION_PENALTY * doomed, total, key, bits, last_base, length_run, (path, codon))
+        beam = sorted(best.values(), key=lambda h: -h[0])[:beam_width]
+        position += 3
+
+    beam.sort(key=lambda h: -h[1])
+    path, picked = beam[0][6], []
+    while path is not None:
+        path, codon = path
+        picked.append(codon)
+    picked.reverse()
+    return picked[:last - first]
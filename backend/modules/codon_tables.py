@@ -0,0 +1,231 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+# --- CODON INDEX ---
+# Codons are encoded as integer indices 0-63 (A=0, C=1, G=2, T=3; first base
+# most significant). Index 64 stands for any codon with a non-ACGT character.
+CODONS = [a + b + c for a in "ACGT" for b in "ACGT" for c in "ACGT"]
+CODON_INDEX = {codon: i for i, codon in enumerate(CODONS)}
+INVALID_CODON = 64
+# Standard genetic code (NCBI table 1) in CODONS order, precomputed from
+# Bio.Data.CodonTable.standard_dna_table so that this module imports neither Biopython nor NumPy
+STANDARD_CODE = "KNKNTTTTRSRSIIMIQHQHPPPPRRRRLLLLEDEDAAAAGGGGVVVV*Y*YSSSS*CWCLFLF"
+AMINO_ACIDS = list(STANDARD_CODE)
+SYNONYMS = {}
+for _codon, _aa in zip(CODONS, AMINO_ACIDS):
+    SYNONYMS.setdefault(_aa, []).append(_codon)
+
+HOSTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "hosts")
+DEFAULT_HOST = "ecoli"
+INVALID_WEIGHT = 0.1 # Weight of a codon with ambiguous bases
+# Tables without an "alternatives" list let the designer use every synonymous codon at least this good
+MIN_ALTERNATIVE_WEIGHT = 0.2
+
+class CodonTableError(ValueError):
+    """Unknown host or malformed codon table file."""
+
+class CodonTable:
+    """
+    One host's codon usage, compiled once into dense lookup arrays indexed by
+    codon index (65 entries, the last one for invalid codons).
+    """
+
+    def __init__(self, host, data, path=None, version=None):
+        usage = _validate_usage(data.get("usage"))
+        self.host = host
+        self.organism = str(data.get("organism", host))
+        self.source = str(data.get("source", ""))
+        self.aliases = [str(alias).lower() for alias in data.get("aliases", [])]
+        self.path = path
+        self.version = version
+
+        # Weight (w) = Frequency / Max Frequency for that AA (in file order)
+        top, self.optimal = {}, {}
+        for aa, codons in SYNONYMS.items():
+            top[aa] = max(usage[codon] for codon in codons)
+            if top[aa] <= 0:
+                raise CodonTableError(f"{host}: no usable codon for '{aa}'")
+            self.optimal[aa] = max(codons, key=lambda codon: usage[codon]) # First of equals in CODONS order
+        self.weights = {codon: usage[codon] / top[AMINO_ACIDS[CODON_INDEX[codon]]] for codon in usage}
+
+        alternatives = data.get("alternatives")
+        if alternatives is None:
+            self.alternatives = {aa: [codon for codon in sorted(codons, key=lambda c: -self.weights[c])
+                                      if self.weights[codon] >= MIN_ALTERNATIVE_WEIGHT]
+                                 for aa, codons in SYNONYMS.items()}
+        else:
+            self.alternatives = _validate_alternatives(host, alternatives)
+
+        import numpy as np # Loaded on the first compile, not when the app starts
+        self.weight_table = np.array([self.weights[codon] for codon in CODONS] + [INVALID_WEIGHT])
+        self.log_weight_table = np.array([_log_weight(w) for w in self.weight_table])
+        self.optimal_index_table = np.array([CODON_INDEX[self.optimal[aa]] for aa in AMINO_ACIDS] + [INVALID_CODON])
+        # Design candidates per amino acid, (codon, log weight) best first: the optimal codon plus the alternatives
+        self.candidates = {}
+        for aa in SYNONYMS:
+            codons = list(dict.fromkeys([self.optimal[aa]] + self.alternatives.get(aa, [])))
+            scored = [(codon, _log_weight(self.weights[codon])) for codon in codons]
+            scored.sort(key=lambda c: -c[1]) # Stable: ties keep the optimal codon first
+            self.candidates[aa] = scored
+
+    def weight(self, codon):
+        return self.weights.get(codon, INVALID_WEIGHT)
+
+    def describe(self):
+        return {"host": self.host, "organism": self.organism, "aliases": self.aliases,
+                "source": self.source, "version": self.version}
+
+def _log_weight(weight):
+    return math.log(weight) if weight > 0 else -9.0
+
+def _validate_usage(usage):
+    if not isinstance(usage, dict):
+        raise CodonTableError("'usage' must map each of the 64 codons to a frequency or weight")
+    usage = {str(codon).upper().replace("U", "T"): value for codon, value in usage.items()}
+    missing = sorted(set(CODONS) - set(usage))
+    unknown = sorted(set(usage) - set(CODONS))
+    if missing or unknown:
+        raise CodonTableError(f"Codon table must list the 64 codons (missing: {_some(missing)}; unknown: {_some(unknown)})")
+    bad = [codon for codon, value in usage.items()
+           if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0]
+    if bad:
+        raise CodonTableError(f"Codon usage must be non-negative numbers (bad: {', '.join(sorted(bad))})")
+    return {codon: float(value) for codon, value in usage.items()}
+
+def _some(codons, shown=8):
+    return (", ".join(codons[:shown]) + (f" (+{len(codons) - shown})" if len(codons) > shown else "")) or "-"
+
+def _validate_alternatives(host, alternatives):
+    """{amino acid: [codons]} with '_' accepted for the stop codons; every codon must encode its amino acid."""
+    if not isinstance(alternatives, dict):
+        raise CodonTableError(f"{host}: 'alternatives' must map amino acids to codon lists")
+    table = {}
+    for aa, codons in alternatives.items():
+        aa = "*" if aa == "_" else str(aa).upper()
+        if aa not in SYNONYMS or not isinstance(codons, list):
+            raise CodonTableError(f"{host}: bad alternatives entry '{aa}'")
+        codons = [str(codon).upper() for codon in codons]
+        wrong = [codon for codon in codons if codon not in SYNONYMS[aa]]
+        if wrong:
+            raise CodonTableError(f"{host}: {', '.join(wrong)} do not encode '{aa}'")
+        table[aa] = codons
+    return table
+
+def load_table(path, host=None):
+    """Reads and compiles one host table file; raises CodonTableError if it is malformed."""
+    host = host or os.path.splitext(os.path.basename(path))[0].lower()
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    try:
+        data = json.loads(raw)
+    except ValueError as exc:
+        raise CodonTableError(f"{host}: invalid JSON ({exc})")
+    if not isinstance(data, dict):
+        raise CodonTableError(f"{host}: a codon table file holds one JSON object")
+    try:
+        return CodonTable(host, data, path, hashlib.sha256(raw).hexdigest()[:12])
+    except CodonTableError as exc:
+        message = str(exc)
+        raise CodonTableError(message if message.startswith(f"{host}:") else f"{host}: {message}")
+
+class CodonTableRegistry:
+    """
+    Host codon tables loaded from <directory>/<host>.json, compiled once and kept
+    in memory. Lookups stat the directory and the table file, so an added, edited
+    or removed file is picked up on the next request (hot reload). A file that
+    fails validation is reported in errors() and the last good table stays in use.
+    """
+
+    def __init__(self, directory=HOSTS_DIR, default=DEFAULT_HOST):
+        self.directory = directory
+        self.default = default
+        self._tables = {}   # host -> CodonTable
+        self._stamps = {}   # host -> (mtime_ns, size) of the compiled (or rejected) file
+        self._errors = {}   # host -> validation error of its current file
+        self._listing = None
+        self._lock = threading.Lock()
+
+    def configure(self, directory=None, default=None):
+        with self._lock:
+            self.directory = directory or self.directory
+            self.default = default or self.default
+            self._tables, self._stamps, self._errors, self._listing = {}, {}, {}, None
+
+    def _scan(self):
+        # Caller holds the lock
+        try:
+            listing = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            listing = None
+        if listing == self._listing and listing is not None:
+            return
+        self._listing = listing
+        names = set()
+        if listing is not None:
+            names = {os.path.splitext(f)[0].lower() for f in os.listdir(self.directory) if f.endswith(".json")}
+        for host in set(self._stamps) - names:
+            self._tables.pop(host, None)
+            self._stamps.pop(host, None)
+            self._errors.pop(host, None)
+        for host in names:
+            self._refresh(host)
+
+    def _refresh(self, host):
+        # Caller holds the lock; recompiles the table if its file changed
+        path = os.path.join(self.directory, f"{host}.json")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._tables.pop(host, None)
+            self._stamps.pop(host, None)
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._stamps.get(host) == stamp:
+            return
+        self._stamps[host] = stamp
+        try:
+            self._tables[host] = load_table(path, host)
+            self._errors.pop(host, None)
+        except (OSError, CodonTableError) as exc:
+            self._errors[host] = str(exc)
+
+    def _resolve(self, name):
+        name = name.strip().lower()
+        if name in self._tables:
+            return name
+        for host, table in self._tables.items():
+            if name in table.aliases:
+                return host
+        return None
+
+    def get(self, host=None):
+        """Compiled table of a host (name or alias; None = default host)."""
+        with self._lock:
+            self._scan()
+            name = self._resolve(host or self.default)
+            if name is not None:
+                self._refresh(name)
+            if name is None or name not in self._tables:
+                key = (host or self.default).strip().lower()
+                if key in self._errors:
+                    raise CodonTableError(self._errors[key])
+                available = ", ".join(sorted(self._tables)) or "none"
+                raise CodonTableError(f"Unknown host '{host or self.default}' (available: {available})")
+            return self._tables[name]
+
+    def hosts(self):
+        with self._lock:
+            self._scan()
+            for host in list(self._stamps):
+                self._refresh(host)
+            return [self._tables[host].describe() for host in sorted(self._tables)]
+
+    def errors(self):
+        with self._lock:
+            self._scan()
+            return dict(self._errors)
+
+CODON_TABLES = CodonTableRegistry()
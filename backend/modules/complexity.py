@@ -0,0 +1,95 @@
+import numpy as np
+
+from modules.packed import AMBIGUOUS
+
+# --- SEQUENCE COMPLEXITY ---
+# Vendor rejections beyond GC and long repeats: homopolymers, short tandem repeats
+# (microsatellites) and low-complexity stretches. Every scan is a fixed number of
+# vectorized passes over the base codes (A=0, C=1, G=2, T=3, other=4 as in
+# modules/packed.py), so it stays linear and cheap on megabase inputs.
+STR_PERIODS = range(2, 7)
+STR_MIN_LENGTH = 12 # bp
+STR_MIN_UNITS = 4 # Copies of the unit
+COMPLEXITY_WINDOW = 64 # Bases per window; windows start every COMPLEXITY_WINDOW // 2
+MIN_ENTROPY = 1.5 # Shannon entropy of the base composition, bits (2.0 = uniform)
+MAX_DUST = 20 # DUST score: sum over triplets of c * (c - 1) / 2, divided by (triplets - 1)
+
+def runs(mask):
+    """(starts, ends) of the runs of True in a boolean array, end exclusive."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], mask, [False])).astype(np.int8)))
+    return edges[::2], edges[1::2]
+
+def merge_intervals(starts, ends):
+    """Merges overlapping or touching [start, end) intervals sorted by start: (starts, ends, group of each input)."""
+    starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+    if not len(starts):
+        return starts, ends, np.zeros(0, dtype=np.int64)
+    reach = np.maximum.accumulate(ends)
+    new = np.concatenate(([True], starts[1:] > reach[:-1]))
+    group = np.cumsum(new) - 1
+    firsts = np.flatnonzero(new)
+    return starts[firsts], np.maximum.reduceat(ends, firsts), group
+
+def homopolymer_runs(letters, threshold=6):
+    """Run-length encoding of the characters: (starts, ends, characters) of the runs of `threshold` or more."""
+    if not len(letters):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), letters[:0]
+    change = np.flatnonzero(letters[1:] != letters[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(letters)]))
+    long_runs = ends - starts >= threshold
+    return starts[long_runs], ends[long_runs], letters[starts[long_runs]]
+
+def tandem_repeats(codes, periods=STR_PERIODS, min_length=STR_MIN_LENGTH, min_units=STR_MIN_UNITS):
+    """
+    Short tandem repeats as (start, end, period) sorted by start. One pass per
+    period p compares every base with the base p further on; a run of matches of
+    length m is a tandem repeat of m + p bases. Repeats whose unit is itself
+    periodic (ATAT at p = 4) belong to the shorter period and are left to it
+    (homopolymers to homopolymer_runs()).
+    """
+    found = []
+    for period in periods:
+        if len(codes) <= period:
+            continue
+        match = (codes[:-period] == codes[period:]) & (codes[:-period] != AMBIGUOUS)
+        starts, ends = runs(match)
+        ends = ends + period
+        keep = ends - starts >= max(min_length, period * min_units)
+        for start, end in zip(starts[keep].tolist(), ends[keep].tolist()):
+            unit = codes[start:start + period]
+            if not any(period % d == 0 and (unit == np.tile(unit[:d], period // d)).all() for d in range(1, period)):
+                found.append((start, end, period))
+    found.sort()
+    return found
+
+def window_complexity(codes, window=COMPLEXITY_WINDOW):
+    """
+    Shannon entropy and DUST score of windows of `window` bases, one every
+    window // 2 bases. Counts come from one bincount per half-window (bases, and
+    the triplets starting there without ambiguous bases); a window sums two halves.
+    Returns (window starts, entropy, dust, bases counted per window).
+    """
+    half = max(1, window // 2)
+    n = len(codes)
+    blocks = -(-n // half)
+    if not blocks:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty, empty, empty.astype(np.int64)
+    block = np.arange(n) // half
+    valid = codes != AMBIGUOUS
+    bases = np.bincount(block[valid] * 4 + codes[valid], minlength=blocks * 4).reshape(blocks, 4)
+    triplet_ok = valid[:-2] & valid[1:-1] & valid[2:] if n >= 3 else np.zeros(0, dtype=bool)
+    triplet = (codes[:-2].astype(np.int64) * 16 + codes[1:-1] * 4 + codes[2:])[triplet_ok] if n >= 3 else np.zeros(0, dtype=np.int64)
+    triplets = np.bincount(block[:max(0, n - 2)][triplet_ok] * 64 + triplet, minlength=blocks * 64).reshape(blocks, 64)
+    if blocks > 1: # Window k = half-blocks k and k + 1
+        bases, triplets = bases[:-1] + bases[1:], triplets[:-1] + triplets[1:]
+
+    counted = bases.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = bases / counted[:, None]
+        entropy = -np.where(share > 0, share * np.log2(share), 0.0).sum(axis=1)
+        total = triplets.sum(axis=1)
+        dust = (triplets * (triplets - 1) // 2).sum(axis=1) / np.maximum(total - 1, 1)
+    entropy[counted == 0] = 2.0
+    return np.arange(len(counted)) * half, entropy, dust, counted
@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+
+# --- VIRTUAL GEL MODEL ---
+# 1% agarose: migration is linear in log(size) between 15 kb (top of the lane)
+# and 500 bp (bottom). Positions are % of the lane height, clamped inside the lane.
+GEL_MIN_LOG = math.log(500)
+GEL_MAX_LOG = math.log(15000)
+GEL_TOP, GEL_BOTTOM = 5, 95
+# Bands closer than this (% of the lane, ~10% size difference) co-migrate
+MIN_BAND_GAP = 2.5
+
+def gel_position(size, clamp=True):
+    """Where a band of `size` bp ends up, in % of the lane height (0 = top)."""
+    y = (1 - (math.log(max(size, 1)) - GEL_MIN_LOG) / (GEL_MAX_LOG - GEL_MIN_LOG)) * 100
+    return max(GEL_TOP, min(GEL_BOTTOM, y)) if clamp else y
+
+def _gel_positions(sizes):
+    """Vectorized gel_position(clamp=False); NaN for sizes <= 0 (no fragment)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = (1 - (np.log(sizes) - GEL_MIN_LOG) / (GEL_MAX_LOG - GEL_MIN_LOG)) * 100
+    return np.where(sizes > 0, y, np.nan)
+
+# --- CUT ARRAYS ---
+def cut_arrays(cuts_by_enzyme):
+    """{enzyme: sorted int64 array of distinct cut positions} from {enzyme: [cuts]} (e.g. RestrictionEngine.search)."""
+    return {name: np.unique(np.asarray(cuts, dtype=np.int64)) for name, cuts in cuts_by_enzyme.items() if len(cuts)}
+
+def cut_arrays_from_sites(sites, max_cuts=None):
+    """Same from a find_restriction_sites() site list, optionally only for enzymes cutting at most `max_cuts` times."""
+    grouped = {}
+    for site in sites:
+        if max_cuts is None or site["frequency"] <= max_cuts:
+            grouped.setdefault(site["enzyme"], []).append(site["position"])
+    return cut_arrays(grouped)
+
+def fragment_sizes(cuts, length, circular=False):
+    """
+    Fragment lengths of a digest. `cuts` are sorted 1-based positions (a cut at c
+    separates base c-1 from base c, like Bio.Restriction), on a linear or circular molecule.
+    """
+    cuts = np.asarray(cuts, dtype=np.int64)
+    if not len(cuts):
+        return np.array([length], dtype=np.int64)
+    if circular:
+        sizes = np.append(np.diff(cuts), length - cuts[-1] + cuts[0]) # The last fragment spans the origin
+    else:
+        sizes = np.diff(np.concatenate(([1], cuts, [length + 1])))
+    return sizes[sizes > 0]
+
+def digest(arrays, enzymes, length, circular=False):
+    """Fragments and gel bands of one digest with any number of enzymes (unknown or non-cutting names add no cuts)."""
+    present = [arrays[name] for name in enzymes if name in arrays]
+    cuts = np.unique(np.concatenate(present)) if present else np.array([], dtype=np.int64) # Sorted merge
+    sizes = np.sort(fragment_sizes(cuts, length, circular))[::-1]
+    record = _score(sizes[np.newaxis, :])
+    return _digest_view(list(enzymes), sizes, record, 0, cuts=len(cuts))
+
+def screen_digests(arrays, length, circular=False, max_fragments=12, top=20, chunk=20_000):
+    """
+    Ranks every single and double digest giving 2..max_fragments fragments by how
+    well its bands resolve on the gel model: digests whose fragments are all on the
+    gel and apart first, then by the smallest gap between neighbouring bands.
+    Enzymes with identical cut arrays (isoschizomers) are screened once. Pairs are
+    merged `chunk` at a time: padded cut rows are concatenated and sorted per row.
+    """
+    max_cuts = max_fragments if circular else max_fragments - 1
+    patterns, names = {}, []
+    for name, cuts in arrays.items():
+        if 0 < len(cuts) <= max_cuts:
+            key = cuts.tobytes()
+            if key not in patterns:
+                patterns[key] = len(names)
+                names.append([name, cuts])
+            else:
+                names[patterns[key]].append(name)
+    count = len(names)
+    if not count:
+        return {"screened": 0, "digests": []}
+
+    pad = length + 1 # Linear sentinel: the far end of the molecule
+    rows = np.full((count, max_cuts), pad, dtype=np.int64)
+    for index, (_, cuts, *_) in enumerate(names):
+        rows[index, :len(cuts)] = cuts
+    first, second = np.triu_indices(count, k=1)
+    combos = np.concatenate((np.column_stack((np.arange(count), np.arange(count))), np.column_stack((first, second))))
+
+    best, screened = [], 0
+    for start in range(0, len(combos), chunk):
+        part = combos[start:start + chunk]
+        merged = np.sort(np.concatenate((rows[part[:, 0]], rows[part[:, 1]], np.full((len(part), 1), pad)), axis=1), axis=1)
+        if circular:
+            # The fragment across the origin ends at the first cut of the next turn
+            merged = np.where(merged == pad, merged[:, :1] + length, merged)
+        else:
+            merged = np.concatenate((np.ones((len(part), 1), dtype=np.int64), merged), axis=1)
+        sizes = np.diff(merged, axis=1) # Sentinel-to-sentinel and duplicate cuts give 0 (no fragment)
+        fragments = (sizes > 0).sum(axis=1)
+        keep = (fragments >= 2) & (fragments <= max_fragments)
+        screened += int(keep.sum())
+        part, sizes = part[keep], sizes[keep]
+        record = _score(sizes)
+        order = np.lexsort((record["fragments"], -record["min_gap"], record["unresolved"]))[:top]
+        best.extend((int(record["unresolved"][row]), -float(record["min_gap"][row]), int(record["fragments"][row]),
+                     start, part[row], sizes[row]) for row in order.tolist())
+    best.sort(key=lambda entry: entry[:4])
+
+    digests = []
+    for _, _, _, _, pair, row_sizes in best[:top]:
+        enzymes = [names[pair[0]][0]] + ([names[pair[1]][0]] if pair[0] != pair[1] else [])
+        isoschizomers = [alt for index in sorted(set(pair.tolist())) for alt in names[index][2:]]
+        row_sizes = np.sort(row_sizes[row_sizes > 0])[::-1]
+        view = _digest_view(enzymes, row_sizes, _score(row_sizes[np.newaxis, :]), 0)
+        view["isoschizomers"] = isoschizomers
+        digests.append(view)
+    return {"screened": screened, "digests": digests}
+
+def _score(sizes):
+    """Per digest (row of fragment sizes, 0 = none): fragments, unresolved bands and smallest band gap."""
+    y = np.sort(_gel_positions(sizes), axis=1) # NaN (no fragment) sorts last
+    gaps = np.diff(y, axis=1)
+    edge = np.full((len(y), 1), np.inf)
+    before = np.concatenate((edge, gaps), axis=1)
+    after = np.concatenate((gaps, edge), axis=1)
+    after = np.where(np.isnan(after), np.inf, after) # The last real band has no neighbour below
+    valid = ~np.isnan(y)
+    with np.errstate(invalid="ignore"):
+        resolved = valid & (y >= GEL_TOP) & (y <= GEL_BOTTOM) & (before >= MIN_BAND_GAP) & (after >= MIN_BAND_GAP)
+    fragments = valid.sum(axis=1)
+    min_gap = np.where(fragments > 1, np.nanmin(np.where(np.isnan(gaps), np.inf, gaps), axis=1, initial=np.inf), np.inf)
+    return {"fragments": fragments, "unresolved": fragments - resolved.sum(axis=1), "min_gap": min_gap}
+
+def _digest_view(enzymes, sizes, record, row, cuts=None):
+    min_gap = float(record["min_gap"][row])
+    view = {
+        "enzymes": enzymes,
+        "fragments": sizes.tolist(),
+        "bands": [{"size": int(size), "position": round(gel_position(size), 1)} for size in sizes.tolist()],
+        "unresolved": int(record["unresolved"][row]),
+        "min_gap": round(min_gap, 2) if math.isfinite(min_gap) else None,
+        "resolved": int(record["unresolved"][row]) == 0
+    }
+    if cuts is not None:
+        view["cuts"] = cuts
+    return view
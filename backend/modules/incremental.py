@@ -0,0 +1,41 @@
+import numpy as np
+
+# An edit is (start, old_end, new_end), 0-based and half-open: old[start:old_end]
+# was replaced by new[start:new_end]. The patch_* functions of the analysis
+# modules take it to update a previous result instead of recomputing it.
+
+def diff_sequences(old, new):
+    """Smallest single edit turning `old` into `new` (common prefix/suffix trimmed); None if equal."""
+    if old == new:
+        return None
+    a = np.frombuffer(old.encode("utf-32-le"), dtype=np.uint32) # One element per character
+    b = np.frombuffer(new.encode("utf-32-le"), dtype=np.uint32)
+    common = min(len(a), len(b))
+    mismatch = np.flatnonzero(a[:common] != b[:common])
+    prefix = int(mismatch[0]) if len(mismatch) else common
+
+    # The suffix may not overlap the prefix (e.g. "AAA" -> "AAAA")
+    room = common - prefix
+    tail_a, tail_b = a[len(a) - room:][::-1], b[len(b) - room:][::-1]
+    mismatch = np.flatnonzero(tail_a != tail_b)
+    suffix = int(mismatch[0]) if len(mismatch) else room
+    return prefix, len(a) - suffix, len(b) - suffix
+
+def apply_edits(sequence, edits):
+    """
+    Applies [{"position": 1-based, "delete": n, "insert": "ACG"}, ...] in order
+    (each position refers to the sequence left by the previous edits).
+    """
+    for edit in edits:
+        position = int(edit.get("position", 0))
+        delete = int(edit.get("delete", 0))
+        insert = "".join(str(edit.get("insert", "")).split()).upper()
+        if position < 1 or position > len(sequence) + 1 or delete < 0 or position - 1 + delete > len(sequence):
+            raise ValueError(f"Edit out of range: {edit}")
+        sequence = sequence[:position - 1] + insert + sequence[position - 1 + delete:]
+    return sequence
+
+def edit_view(edit):
+    """1-based description of an edit for API responses."""
+    start, old_end, new_end = edit
+    return {"position": start + 1, "deleted": old_end - start, "inserted": new_end - start}
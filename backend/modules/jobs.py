@@ -0,0 +1,219 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+# Lower value = served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity (backpressure)."""
+
+class LocalBroker:
+    """
+    In-process stand-in for a message broker: a bounded priority queue plus the
+    job records. Anything with the same methods (enqueue/dequeue/get/update/
+    cancel/remove/purge_expired/stats) can replace it; no outside service is needed.
+    """
+
+    def __init__(self, max_queued=32, ttl=3600):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._heap = []                 # (priority, sequence number, job id)
+        self._jobs = {}                 # job id -> record
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def enqueue(self, job):
+        with self._cond:
+            queued = sum(1 for j in self._jobs.values() if j["status"] == "queued")
+            if queued >= self.max_queued:
+                raise QueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+            self._jobs[job["id"]] = job
+            heapq.heappush(self._heap, (job["priority"], next(self._counter), job["id"]))
+            self._cond.notify()
+
+    def dequeue(self, timeout=None):
+        """Next queued job (highest priority, then FIFO), marked running; None on timeout."""
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job["status"] == "queued": # Skips cancelled jobs
+                        job["status"] = "running"
+                        job["started_at"] = time.time()
+                        return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job, modules=dict(job["modules"])) if job else None
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                modules = fields.pop("modules", None)
+                job.update(fields)
+                if modules:
+                    job["modules"].update(modules)
+
+    def position(self, job_id):
+        """1-based place in the queue of a queued job."""
+        with self._cond:
+            entries = sorted(e for e in self._heap if self._jobs.get(e[2], {}).get("status") == "queued")
+            for place, entry in enumerate(entries, 1):
+                if entry[2] == job_id:
+                    return place
+            return None
+
+    def cancel(self, job_id):
+        """Marks a queued job cancelled; running or finished jobs are left alone."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return False
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+            return True
+
+    def remove(self, job_id):
+        with self._cond:
+            return self._jobs.pop(job_id, None)
+
+    def purge_expired(self):
+        """Drops finished jobs (and their results) older than the TTL."""
+        cutoff = time.time() - self.ttl
+        with self._cond:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] is not None and job["finished_at"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"jobs": counts, "max_queued": self.max_queued, "ttl_sec": self.ttl}
+
+class JobQueue:
+    """
+    Asynchronous analyses: submit() returns a job id immediately and a bounded pool
+    of worker threads drains the broker by priority. Small (interactive) sequences
+    default to high priority so they overtake large jobs waiting in the queue.
+    """
+
+    def __init__(self, run_fn, broker=None, workers=2, interactive_max=10_000):
+        self.run_fn = run_fn # run_fn(sequence, params=..., modules=..., progress=callback) -> results
+        self.broker = broker or LocalBroker()
+        self.workers = workers
+        self.interactive_max = interactive_max
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self):
+        # Started on first use, so importing the app (e.g. in pool processes) spawns no threads
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, sequence, params=None, modules=None, module_names=(), priority=None):
+        self.broker.purge_expired()
+        if priority is None:
+            priority = "high" if len(sequence) <= self.interactive_max else "normal"
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (use {', '.join(PRIORITIES)})")
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "priority": PRIORITIES[priority],
+            "priority_name": priority,
+            "length": len(sequence),
+            "sequence": sequence,
+            "params": params,
+            "requested": modules,
+            "modules": dict.fromkeys(module_names, "pending"),
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "result": None
+        }
+        self.broker.enqueue(job)
+        self._ensure_workers()
+        return job["id"]
+
+    def _work(self):
+        while True:
+            job = self.broker.dequeue()
+            job_id = job["id"]
+
+            def progress(name, state):
+                self.broker.update(job_id, modules={name: state})
+
+            try:
+                result = self.run_fn(job["sequence"], params=job["params"], modules=job["requested"], progress=progress)
+                self.broker.update(job_id, status="done", result=result, finished_at=time.time())
+            except Exception as exc:
+                self.broker.update(job_id, status="failed", error=f"{type(exc).__name__}: {exc}", finished_at=time.time())
+
+    def status(self, job_id):
+        """Public view of a job (no sequence/result), or None if unknown or expired."""
+        self.broker.purge_expired()
+        job = self.broker.get(job_id)
+        if job is None:
+            return None
+        finished = sum(1 for state in job["modules"].values() if state in ("done", "cached", "error"))
+        view = {
+            "id": job["id"],
+            "status": job["status"],
+            "priority": job["priority_name"],
+            "length": job["length"],
+            "modules": job["modules"],
+            "progress": round(finished / len(job["modules"]), 2) if job["modules"] else None,
+            "submitted_at": job["submitted_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"]
+        }
+        if job["status"] == "queued":
+            view["queue_position"] = self.broker.position(job_id)
+        if job["finished_at"] is not None:
+            view["expires_at"] = job["finished_at"] + self.broker.ttl
+        return view
+
+    def result(self, job_id):
+        """(status view, results or None)."""
+        view = self.status(job_id)
+        if view is None or view["status"] != "done":
+            return view, None
+        job = self.broker.get(job_id)
+        return view, (job or {}).get("result")
+
+    def sequence(self, job_id):
+        job = self.broker.get(job_id)
+        return job["sequence"] if job else None
+
+    def options(self, job_id):
+        """(params, requested modules) the job was submitted with."""
+        job = self.broker.get(job_id)
+        return (job["params"], job["requested"]) if job else (None, None)
+
+    def cancel(self, job_id):
+        """Cancels a job that has not started yet."""
+        return self.broker.cancel(job_id)
+
+    def stats(self):
+        return {**self.broker.stats(), "workers": self.workers}
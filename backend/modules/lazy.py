@@ -0,0 +1,31 @@
+import importlib
+import time
+
+# Module name -> seconds its first import took (through a LazyModule)
+LOAD_TIMES = {}
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so that
+    starting the app does not pay for NumPy and Biopython until a request (or
+    the warm-up) needs them. importlib's per-module lock makes concurrent first
+    uses safe: one thread imports, the others wait for it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            LOAD_TIMES.setdefault(self._name, round(time.perf_counter() - started, 4))
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self._module is not None else ''}>"
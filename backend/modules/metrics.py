@@ -0,0 +1,166 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Histogram upper bounds (ms); the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Sequence length buckets: (exclusive upper bound, label)
+LENGTH_BUCKETS = ((1_000, "<1k"), (10_000, "1k-10k"), (100_000, "10k-100k"), (1_000_000, "100k-1M"), (None, ">=1M"))
+
+def length_bucket(length):
+    for bound, label in LENGTH_BUCKETS:
+        if bound is None or length < bound:
+            return label
+
+def timed_call(fn, args=(), kwargs=None, trace_memory=False):
+    """
+    Runs fn(*args, **kwargs) and returns (result, error, timing) without raising.
+    timing = {"wall": s, "cpu": s, "peak": bytes or None}. CPU time is the calling
+    thread's; with trace_memory the peak is the traced allocation high-water mark
+    above the starting level (process-wide, so concurrent calls can disturb each
+    other's reading).
+    """
+    tracing = trace_memory
+    if tracing and not tracemalloc.is_tracing():
+        tracemalloc.start() # e.g. inside a fresh pool worker process
+    if tracing:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    result, error = None, None
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        result = fn(*args, **(kwargs or {}))
+    except Exception as exc:
+        error = exc
+    timing = {
+        "wall": time.perf_counter() - wall_start,
+        "cpu": time.thread_time() - cpu_start,
+        "peak": max(0, tracemalloc.get_traced_memory()[1] - baseline) if tracing else None
+    }
+    return result, error, timing
+
+class _Series:
+    """Counters + latency histogram for one (name[, length bucket]) series."""
+
+    __slots__ = ("count", "errors", "wall_sum", "wall_max", "cpu_sum", "peak_max", "buckets")
+
+    def __init__(self):
+        self.count = self.errors = 0
+        self.wall_sum = self.wall_max = self.cpu_sum = 0.0
+        self.peak_max = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, timing, error):
+        wall_ms = timing["wall"] * 1000
+        self.count += 1
+        self.errors += bool(error)
+        self.wall_sum += timing["wall"]
+        self.wall_max = max(self.wall_max, timing["wall"])
+        self.cpu_sum += timing.get("cpu") or 0.0
+        if timing.get("peak") is not None:
+            self.peak_max = max(self.peak_max or 0, timing["peak"])
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if wall_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "wall_ms_mean": round(self.wall_sum / self.count * 1000, 2) if self.count else 0.0,
+            "wall_ms_max": round(self.wall_max * 1000, 2),
+            "cpu_ms_mean": round(self.cpu_sum / self.count * 1000, 2) if self.count else 0.0,
+            "cpu_wall_ratio": round(self.cpu_sum / self.wall_sum, 2) if self.wall_sum else None,
+            "peak_bytes_max": self.peak_max,
+            "histogram": list(self.buckets) # counts per LATENCY_BUCKETS_MS bound, then overflow
+        }
+
+class MetricsRegistry:
+    """Thread-safe per-process aggregation of timed calls by name and sequence-length bucket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._series = {} # name -> (_Series, {length bucket: _Series})
+            self.last_profile = None
+
+    def record(self, name, length, timing, error=False):
+        with self._lock:
+            total, by_length = self._series.setdefault(name, (_Series(), {}))
+            total.add(timing, error)
+            by_length.setdefault(length_bucket(length), _Series()).add(timing, error)
+
+    def snapshot(self):
+        with self._lock:
+            order = [label for _, label in LENGTH_BUCKETS]
+            return {
+                "uptime_sec": round(time.time() - self.started, 1),
+                "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+                "series": {
+                    name: {**total.to_dict(),
+                           "by_length": {label: by_length[label].to_dict() for label in order if label in by_length}}
+                    for name, (total, by_length) in self._series.items()
+                }
+            }
+
+def server_timing(entries):
+    """Server-Timing header value from (name, timing or None, description) entries."""
+    parts = []
+    for name, timing, desc in entries:
+        part = f"{name};dur={timing['wall'] * 1000:.1f}" if timing else name
+        details = [desc] if desc else []
+        if timing and timing.get("cpu") is not None:
+            details.append(f"cpu={timing['cpu'] * 1000:.1f}ms")
+        if timing and timing.get("peak") is not None:
+            details.append(f"peak={timing['peak'] / 1e6:.1f}MB")
+        if details:
+            part += f';desc="{" ".join(details)}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+def capture_profile(fn, args=(), kwargs=None, top=25):
+    """
+    Opt-in capture for one call: cProfile (calling thread only) + tracemalloc.
+    Returns (result, report) with the hottest functions and allocation sites.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    try:
+        result = profiler.runcall(fn, *args, **(kwargs or {}))
+    finally:
+        wall = time.perf_counter() - wall_start
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    functions = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        functions.append({"function": f"{filename}:{line}({func})", "calls": calls,
+                          "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    functions.sort(key=lambda x: x["cumtime"], reverse=True)
+
+    allocations = [{"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                   for stat in snapshot.statistics("lineno")[:top]]
+    return result, {
+        "wall_sec": round(wall, 4),
+        "peak_bytes": peak,
+        "functions": functions[:top],
+        "allocations": allocations
+    }
@@ -1,110 +1,144 @@
 from Bio.Seq import Seq
 import math
+import numpy as np
 
-# E. coli Class II (Highly Expressed Genes) Codon Usage Table (Approximate weights)
-# Weight (w) = Frequency / Max Frequency for that AA
-CODON_WEIGHTS = {
-    'GCA': 0.586, 'GCC': 0.122, 'GCG': 1.000, 'GCT': 0.407, # Ala
-    'TGC': 1.000, 'TGT': 0.444, # Cys
-    'GAC': 1.000, 'GAT': 0.434, # Asp
-    'GAA': 1.000, 'GAG': 0.259, # Glu
-    'TTC': 1.000, 'TTT': 0.296, # Phe
-    'GGA': 0.060, 'GGC': 0.603, 'GGG': 0.207, 'GGT': 1.000, # Gly
-    'CAC': 1.000, 'CAT': 0.291, # His
-    'ATA': 0.003, 'ATC': 1.000, 'ATT': 0.185, # Ile
-    'AAA': 1.000, 'AAG': 0.253, # Lys
-    'CTA': 0.007, 'CTC': 0.037, 'CTG': 1.000, 'CTT': 0.042, 'TTA': 0.020, 'TTG': 0.020, # Leu
-    'ATG': 1.000, # Met (Start)
-    'AAC': 1.000, 'AAT': 0.051, # Asn
-    'CCA': 0.135, 'CCC': 0.012, 'CCG': 1.000, 'CCT': 0.070, # Pro
-    'CAA': 0.163, 'CAG': 1.000, # Gln
-    'AGA': 0.004, 'AGG': 0.002, 'CGA': 0.006, 'CGC': 0.356, 'CGG': 0.008, 'CGT': 1.000, # Arg
-    'AGC': 0.410, 'AGT': 0.085, 'TCA': 0.077, 'TCC': 0.179, 'TCG': 0.068, 'TCT': 1.000, # Ser
-    'ACA': 0.076, 'ACC': 1.000, 'ACG': 0.297, 'ACT': 0.347, # Thr
-    'GTA': 0.495, 'GTC': 0.066, 'GTG': 0.221, 'GTT': 1.000, # Val
-    'TGG': 1.000, # Trp
-    'TAC': 1.000, 'TAT': 0.239, # Tyr
-    'TAA': 1.000, 'TAG': 0.000, 'TGA': 0.290 # Stop
-}
-
-# Optimal Codon Map (The "Best" codon for each AA)
-OPTIMAL_CODONS = {
-    'A': 'GCG', 'C': 'TGC', 'D': 'GAC', 'E': 'GAA', 'F': 'TTC',
-    'G': 'GGT', 'H': 'CAC', 'I': 'ATC', 'K': 'AAA', 'L': 'CTG',
-    'M': 'ATG', 'N': 'AAC', 'P': 'CCG', 'Q': 'CAG', 'R': 'CGT',
-    'S': 'TCT', 'T': 'ACC', 'V': 'GTT', 'W': 'TGG', 'Y': 'TAC', '*': 'TAA'
-}
-
-def get_codon_weight(codon):
-    return CODON_WEIGHTS.get(codon, 0.1)
-
-def calculate_cai(sequence):
+from modules.codon_engine import codon_choices, design_codons, find_violations, make_rules
+from modules.codon_tables import AMINO_ACIDS, CODON_TABLES, CODONS, INVALID_CODON, CodonTableError
+from modules.packed import as_packed, as_text
+from modules.payload import extreme_indices
+from modules.synthesis import gc_fraction
+
+# --- VECTORIZED CODON ENGINE ---
+# Codons are encoded once as integer indices (see modules/codon_tables.py); every
+# per-codon quantity is a lookup in the selected host's compiled 65-entry arrays.
+CODON_BYTES = np.frombuffer("".join(CODONS).encode() + b"NNN", dtype=np.uint8).reshape(65, 3)
+
+def encode_codons(sequence):
+    """Integer codon indices (0-64) of every complete codon in frame 1."""
+    return as_packed(sequence).codon_indices()
+
+def decode_codons(codons):
+    return CODON_BYTES[codons].tobytes().decode("ascii")
+
+def cai_from_codons(codons, table=None):
+    """Geometric mean of the codon weights (sequential sum, like the scalar version)."""
+    if len(codons) == 0:
+        return 0.0
+    table = table or CODON_TABLES.get()
+    log_sum = float(np.cumsum(table.log_weight_table[codons])[-1])
+    return round(math.exp(log_sum / len(codons)), 2)
+
+def codon_diff(original_seq, optimized_seq, limit=100):
+    """1 where the first `limit` codons are unchanged, 0.2 where optimization changed them."""
+    original = np.frombuffer(as_text(original_seq[:limit * 3]).encode("ascii", "replace"), dtype=np.uint8)
+    optimized = np.frombuffer(as_text(optimized_seq[:limit * 3]).encode("ascii", "replace"), dtype=np.uint8)
+    chunks = -(-len(original) // 3)
+    same = np.zeros(chunks, dtype=bool)
+    full = min(len(original), len(optimized)) // 3
+    same[:full] = (original[:full * 3].reshape(full, 3) == optimized[:full * 3].reshape(full, 3)).all(axis=1)
+    # A trailing partial codon only matches an identical partial chunk
+    if full < chunks and original[full * 3:].tobytes() == optimized[full * 3:full * 3 + 3].tobytes():
+        same[full] = True
+    return np.where(same, 1, 0.2).tolist()
+
+def get_codon_weight(codon, host=None):
+    return CODON_TABLES.get(host).weight(codon)
+
+def calculate_cai(sequence, host=None):
     """Calculates Codon Adaptation Index (Geometric Mean of Weights)"""
     if len(sequence) < 3: return 0.0
-    
-    weights = []
-    # Process in chunks of 3
-    for i in range(0, len(sequence)-2, 3):
-        codon = sequence[i:i+3]
-        w = get_codon_weight(codon)
-        weights.append(w)
-        
-    if not weights: return 0.0
-    
-    # Geometric Mean = exp( (1/N) * sum(ln(w)) )
-    log_sum = sum(math.log(w) if w > 0 else -9.0 for w in weights)
-    cai = math.exp(log_sum / len(weights))
-    return round(cai, 2)
-
-def generate_velocity_profile(sequence):
+    return cai_from_codons(encode_codons(sequence), CODON_TABLES.get(host))
+
+def generate_velocity_profile(sequence, host=None):
     """Generates a list of weights representing ribosome speed/efficiency"""
-    return [get_codon_weight(sequence[i:i+3]) for i in range(0, len(sequence)-2, 3)]
+    return CODON_TABLES.get(host).weight_table[encode_codons(sequence)].tolist()
 
-def optimize_sequence(sequence):
+def optimize_sequence(sequence, host=None, constrained=True, gc_min=30, gc_max=70, gc_window=50, homopolymer_limit=6,
+                      avoid_sites=(), avoid_chi=True, beam_width=16):
     """
     Module 3: Optimization
     Returns Optimized DNA, Comparison Metrics, and Velocity Data.
+    The sequence is encoded into codon indices once; translation, optimization,
+    CAI and velocity are all lookups in the compiled codon table of `host`
+    (see modules/codon_tables.py; None = default host). With `constrained`,
+    the codons are chosen by modules/codon_engine.py to maximize CAI while keeping
+    windowed GC, homopolymers and forbidden sites (see make_rules) in check.
     """
-    # 1. Translate
     try:
-        protein = Seq(sequence).translate()
-    except:
-        return {"error": "Invalid Sequence"}
+        table = CODON_TABLES.get(host)
+    except CodonTableError as exc:
+        return {"error": str(exc)}
+    seq = as_packed(sequence)
+    codons = seq.codon_indices()
+
+    # 1. Translate + 2. Optimize (Simple: Replace with Optimal Codon)
+    if (codons == INVALID_CODON).any():
+        # Ambiguous bases: let Biopython resolve (or reject) them
+        try:
+            protein = str(Seq(seq.text()).translate())
+        except:
+            return {"error": "Invalid Sequence"}
+        optimized_dna = "".join(table.optimal.get(aa, 'NNN') for aa in protein)
+        optimized_codons = encode_codons(optimized_dna)
+    else:
+        protein = None
+        optimized_codons = table.optimal_index_table[codons]
+        optimized_dna = decode_codons(optimized_codons)
 
-    # 2. Optimize (Simple: Replace with Optimal Codon)
-    optimized_dna = ""
-    for aa in protein:
-        optimized_dna += OPTIMAL_CODONS.get(aa, 'NNN')
+    # 2b. Constraint-aware redesign of the regions the optimal codons break
+    design = None
+    if constrained:
+        try:
+            rules = make_rules(gc_min, gc_max, gc_window, homopolymer_limit, avoid_sites, avoid_chi)
+        except ValueError as exc:
+            return {"error": str(exc)}
+        if protein is None:
+            protein = "".join(AMINO_ACIDS[i] for i in codons.tolist())
+        violations_before = len(find_violations(optimized_dna, rules))
+        picked, redesigned = design_codons(codon_choices(protein, table.candidates), rules, beam_width)
+        if redesigned:
+            optimized_dna = "".join(picked)
+            optimized_codons = encode_codons(optimized_dna)
+        violations = find_violations(optimized_dna, rules)
+        design = {
+            "rules": {key: rules[key] for key in ("gc_min", "gc_max", "gc_window", "homopolymer_limit", "avoid_sites")},
+            "violations_before": violations_before,
+            "violation_count": len(violations),
+            "violations": violations[:100],
+            "redesigned_codons": redesigned,
+            "satisfied": not violations
+        }
 
     # 3. Calculate Metrics (Before vs After)
-    cai_original = calculate_cai(sequence)
-    cai_optimized = calculate_cai(optimized_dna)
-    
+    cai_original = cai_from_codons(codons, table) if len(seq) >= 3 else 0.0
+    cai_optimized = cai_from_codons(optimized_codons, table) if len(optimized_dna) >= 3 else 0.0
+
     # 4. Generate Velocity Data (For Graph)
-    # We limit data points to 100 max for chart performance
-    vel_orig = generate_velocity_profile(sequence)
-    vel_opt = generate_velocity_profile(optimized_dna)
-    
-    # Downsample if too long (simple skip)
+    # About 100 buckets for chart performance; each keeps the slowest and fastest
+    # codon of both sequences, so slow stretches are never skipped
+    vel_orig = table.weight_table[codons]
+    vel_opt = table.weight_table[optimized_codons]
     step = max(1, len(vel_orig) // 100)
-    
+    points = extreme_indices([vel_orig, vel_opt], step)
+
     graph_data = {
-        "labels": [i for i in range(1, len(vel_orig), step)],
-        "original": vel_orig[::step],
-        "optimized": vel_opt[::step]
+        "labels": (points + 1).tolist(),
+        "original": vel_orig[points].tolist(),
+        "optimized": vel_opt[points].tolist()
     }
-    
+
     # 5. GC Balance Check
-    from Bio.SeqUtils import gc_fraction
-    gc_orig = round(gc_fraction(sequence) * 100, 1)
+    gc_orig = round(gc_fraction(seq) * 100, 1)
     gc_opt = round(gc_fraction(optimized_dna) * 100, 1)
 
     return {
-        "original_dna": sequence,
+        "original_dna": as_text(sequence),
         "optimized_dna": optimized_dna,
         "cai_before": cai_original,
         "cai_after": cai_optimized,
         "gc_before": gc_orig,
         "gc_after": gc_opt,
-        "velocity_graph": graph_data
-    }
\ No newline at end of file
+        "velocity_graph": graph_data,
+        "codon_table": table.describe(),
+        "constraints": design
+    }
@@ -0,0 +1,85 @@
+import numpy as np
+
+from modules.codon_tables import CODONS, STANDARD_CODE
+from modules.packed import as_packed
+
+# --- SIX-FRAME CODON SCAN ---
+# Every base is encoded once as a 4-bit IUPAC mask (A=1, C=2, G=4, T/U=8) and every
+# position once as the 12-bit mask triple of the codon starting there. Stops and
+# starts are then table lookups for both strands: a reverse-strand codon is the
+# complement of the forward triple read backwards (_RC_TRIPLE). Like
+# Bio.Seq.translate, an ambiguous codon is a stop (or start) only if all of its
+# expansions are; other characters never match.
+STOP_CODONS = [codon for codon, aa in zip(CODONS, STANDARD_CODE) if aa == "*"]
+START_CODONS = ["ATG"]
+FRAMES = ["+1", "+2", "+3", "-1", "-2", "-3"]
+MIN_ORF = 100 # Codons, stop excluded
+
+_IUPAC_MASK = np.zeros(256, dtype=np.uint16)
+for _letters, _mask in (("A", 1), ("C", 2), ("G", 4), ("TU", 8), ("R", 5), ("Y", 10), ("S", 6), ("W", 9),
+                        ("K", 12), ("M", 3), ("B", 14), ("D", 13), ("H", 11), ("V", 7), ("N", 15)):
+    _IUPAC_MASK[list((_letters + _letters.lower()).encode())] = _mask
+_MASK_BASES = (np.arange(16)[:, None] >> np.arange(4)) & 1 # mask -> which of A, C, G, T it allows
+_COMPLEMENT_MASK = np.array([int(f"{mask:04b}"[::-1], 2) for mask in range(16)], dtype=np.uint16) # A<->T, C<->G
+_triples = np.arange(4096, dtype=np.uint16)
+_RC_TRIPLE = (_COMPLEMENT_MASK[_triples & 15] << 8) | (_COMPLEMENT_MASK[(_triples >> 4) & 15] << 4) | _COMPLEMENT_MASK[_triples >> 8]
+
+def _codon_lookup(codons):
+    """Per mask triple: it allows at least one codon and every codon it allows is in `codons`."""
+    member = np.zeros((4, 4, 4), dtype=bool)
+    for codon in codons:
+        member["ACGT".index(codon[0]), "ACGT".index(codon[1]), "ACGT".index(codon[2])] = True
+    outside = np.einsum("ax,by,cz,xyz->abc", _MASK_BASES, _MASK_BASES, _MASK_BASES, (~member).astype(np.int64))
+    allowed = _MASK_BASES.any(axis=1)
+    return ((outside == 0) & allowed[:, None, None] & allowed[None, :, None] & allowed[None, None, :]).reshape(4096)
+
+_STOP_LOOKUP = _codon_lookup(STOP_CODONS)
+_START_LOOKUP = _codon_lookup(START_CODONS)
+
+def codon_triples(sequence):
+    """Mask triple of the codon starting at every position (length - 2 entries), forward strand."""
+    masks = as_packed(sequence).map_bytes(_IUPAC_MASK)
+    if len(masks) < 3:
+        return np.zeros(0, dtype=np.uint16)
+    return (masks[:-2] << 8) | (masks[1:-1] << 4) | masks[2:]
+
+def scan_frames(sequence, min_orf=MIN_ORF, triples=None):
+    """
+    Stop and start codons and ORFs of the six reading frames. Frames +1..+3 read
+    the forward strand from base 1..3, frames -1..-3 the reverse complement from
+    the last base, last - 1, last - 2. Returns {frame: {"stops", "starts"}} as
+    arrays of 0-based codon indices within the frame, and the ORFs: the first start
+    codon after a stop up to the next in-frame stop (or the sequence end,
+    "complete": False), at least `min_orf` codons long. Coordinates are 1-based
+    forward-strand positions whatever the strand.
+    """
+    length = len(sequence)
+    forward = codon_triples(sequence) if triples is None else triples
+    frames, orfs = {}, []
+    for strand, codons in (("+", forward), ("-", _RC_TRIPLE[forward][::-1])):
+        stops, starts = _STOP_LOOKUP[codons], _START_LOOKUP[codons]
+        for offset in range(3):
+            name = f"{strand}{offset + 1}"
+            frame = {"stops": np.flatnonzero(stops[offset::3]), "starts": np.flatnonzero(starts[offset::3])}
+            frames[name] = frame
+            count = max(0, (length - offset) // 3)
+            for first, end, complete in _frame_orfs(frame["starts"], frame["stops"], count, min_orf):
+                lo, hi = offset + 3 * first, offset + 3 * end # [lo, hi) on this strand
+                if strand == "-":
+                    lo, hi = length - hi, length - lo
+                orfs.append({"frame": name, "strand": strand, "start": lo + 1, "end": hi,
+                             "codons": end - first - complete, "complete": complete})
+    orfs.sort(key=lambda orf: (orf["start"], FRAMES.index(orf["frame"])))
+    return frames, orfs
+
+def _frame_orfs(starts, stops, count, min_orf):
+    """(first codon, end codon exclusive, has a stop) of every ORF of one frame, from sorted codon indices."""
+    if not len(starts):
+        return []
+    following = np.searchsorted(stops, starts) # Index of the next stop after each start
+    first = np.flatnonzero(np.concatenate(([True], following[1:] != following[:-1])))
+    begin, which = starts[first], following[first]
+    complete = which < len(stops)
+    end = np.where(complete, stops[np.minimum(which, len(stops) - 1)] + 1, count) if len(stops) else np.full(len(begin), count)
+    keep = end - begin - complete >= min_orf
+    return list(zip(begin[keep].tolist(), end[keep].tolist(), complete[keep].tolist()))
@@ -0,0 +1,191 @@
+import numpy as np
+
+# 2-bit base codes (A=0, C=1, G=2, T=3). Anything else (N, IUPAC codes, lower case,
+# stray characters) is stored verbatim in a sparse side-mask and reads back as code 4.
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+BASE_CODES[list(b"ACGT")] = np.arange(4, dtype=np.uint8)
+AMBIGUOUS = 4
+
+_CODE_LETTERS = np.frombuffer(b"ACGTN", dtype=np.uint8)
+_COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in zip(b"ACGTRYKMBDHVUacgtrykmbdhvu", b"TGCAYRMKVHDBAtgcayrmkvhdba"):
+    _COMPLEMENT[_a] = _b
+
+# Byte -> the four 2-bit codes it holds (first base in the high bits)
+_UNPACK = np.array([[(b >> 6) & 3, (b >> 4) & 3, (b >> 2) & 3, b & 3] for b in range(256)], dtype=np.uint8)
+
+class PackedSequence:
+    """
+    Compact DNA sequence shared by all modules of one request.
+    Bases are packed 4 per byte; non-ACGT characters live in a sparse side-mask
+    (sorted positions + original bytes) so the text round-trips exactly.
+    Slicing returns a zero-copy window over the same buffers.
+    """
+
+    __slots__ = ("_packed", "_exc_pos", "_exc_chars", "_offset", "_length")
+
+    def __init__(self, sequence=""):
+        raw = np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)
+        codes = BASE_CODES[raw]
+        exceptions = np.flatnonzero(codes == AMBIGUOUS)
+        self._init_from_codes(codes, exceptions, raw[exceptions])
+
+    def _init_from_codes(self, codes, exc_pos, exc_chars):
+        length = len(codes)
+        padded = np.zeros(-(-length // 4) * 4, dtype=np.uint8)
+        padded[:length] = codes & 3
+        quads = padded.reshape(-1, 4)
+        self._packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+        self._exc_pos = exc_pos.astype(np.int64)
+        self._exc_chars = np.ascontiguousarray(exc_chars, dtype=np.uint8)
+        self._offset = 0
+        self._length = length
+
+    @classmethod
+    def _from_codes(cls, codes, exc_pos, exc_chars):
+        packed = cls.__new__(cls)
+        packed._init_from_codes(codes, exc_pos, exc_chars)
+        return packed
+
+    # --- Basic protocol ---
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        return self.text()
+
+    def __repr__(self):
+        preview = self.text(0, min(self._length, 20))
+        return f"PackedSequence('{preview}{'...' if self._length > 20 else ''}', length={self._length})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, stride = index.indices(self._length)
+            if stride != 1:
+                raise ValueError("PackedSequence windows must be contiguous")
+            return self.window(start, stop)
+        if index < 0:
+            index += self._length
+        return self.text(index, index + 1)
+
+    @property
+    def nbytes(self):
+        """Memory held by this sequence's buffers."""
+        return self._packed.nbytes + self._exc_pos.nbytes + self._exc_chars.nbytes
+
+    @property
+    def is_unambiguous(self):
+        lo, hi = self._exception_range(0, self._length)
+        return lo == hi
+
+    # --- Windows ---
+    def window(self, start, stop):
+        """Zero-copy view of [start, stop): shares the packed buffer and the side-mask."""
+        start = max(0, min(start, self._length))
+        stop = max(start, min(stop, self._length))
+        view = PackedSequence.__new__(PackedSequence)
+        view._packed = self._packed
+        view._exc_pos = self._exc_pos
+        view._exc_chars = self._exc_chars
+        view._offset = self._offset + start
+        view._length = stop - start
+        return view
+
+    def _bounds(self, start, stop):
+        stop = self._length if stop is None else min(stop, self._length)
+        start = max(0, min(start, stop))
+        return start, stop
+
+    def _exception_range(self, start, stop):
+        """Index range in the side-mask covering absolute window [start, stop)."""
+        return (int(np.searchsorted(self._exc_pos, self._offset + start)),
+                int(np.searchsorted(self._exc_pos, self._offset + stop)))
+
+    # --- Decoding ---
+    def codes(self, start=0, stop=None):
+        """2-bit codes of [start, stop) as a uint8 array; non-ACGT positions read as 4."""
+        start, stop = self._bounds(start, stop)
+        first, last = self._offset + start, self._offset + stop
+        chunk = _UNPACK[self._packed[first // 4:-(-last // 4)]].reshape(-1)
+        codes = chunk[first % 4:first % 4 + (last - first)]
+        lo, hi = self._exception_range(start, stop)
+        if hi > lo:
+            codes[self._exc_pos[lo:hi] - first] = AMBIGUOUS
+        return codes
+
+    def ascii(self, start=0, stop=None):
+        """The original characters of [start, stop) as a uint8 array."""
+        start, stop = self._bounds(start, stop)
+        letters = _CODE_LETTERS[self.codes(start, stop)]
+        lo, hi = self._exception_range(start, stop)
+        if hi > lo:
+            letters[self._exc_pos[lo:hi] - (self._offset + start)] = self._exc_chars[lo:hi]
+        return letters
+
+    def text(self, start=0, stop=None):
+        return self.ascii(start, stop).tobytes().decode("ascii")
+
+    def map_bytes(self, table, start=0, stop=None):
+        """table[character] for every base, without materializing the text."""
+        start, stop = self._bounds(start, stop)
+        values = table[_CODE_LETTERS[self.codes(start, stop)]]
+        lo, hi = self._exception_range(start, stop)
+        if hi > lo:
+            values[self._exc_pos[lo:hi] - (self._offset + start)] = table[self._exc_chars[lo:hi]]
+        return values
+
+    # --- Derived sequences and encodings ---
+    def reverse_complement(self):
+        codes = self.codes()[::-1]
+        lo, hi = self._exception_range(0, self._length)
+        exc_pos = (self._length - 1) - (self._exc_pos[lo:hi][::-1] - self._offset)
+        exc_chars = _COMPLEMENT[self._exc_chars[lo:hi][::-1]]
+        complement = np.where(codes < AMBIGUOUS, 3 - codes, AMBIGUOUS).astype(np.uint8)
+        return PackedSequence._from_codes(complement, exc_pos, exc_chars)
+
+    def kmer_codes(self, k, with_reverse=False):
+        """
+        Exact 2k-bit codes (k <= 32) of every k-mer, the codes of their reverse
+        complements (optional) and a mask of k-mers made of ACGT only.
+        """
+        bases = self.codes()
+        count = max(0, len(bases) - k + 1)
+        forward = np.zeros(count, dtype=np.uint64)
+        reverse = np.zeros(count, dtype=np.uint64) if with_reverse else None
+        valid = np.ones(count, dtype=bool)
+        for j in range(k):
+            window = bases[j:j + count]
+            valid &= window < AMBIGUOUS
+            code = (window & 3).astype(np.uint64)
+            forward |= code << np.uint64(2 * (k - 1 - j))
+            if with_reverse:
+                reverse |= (np.uint64(3) - code) << np.uint64(2 * j)
+        return forward, reverse, valid
+
+    def find(self, motif):
+        """0-based start positions of an exact ACGT motif (<= 32 bp), overlaps included."""
+        k = len(motif)
+        if k == 0 or k > self._length:
+            return np.zeros(0, dtype=np.int64)
+        target = 0
+        for base in motif.encode("ascii"):
+            target = (target << 2) | int(BASE_CODES[base])
+        forward, _, valid = self.kmer_codes(k)
+        return np.flatnonzero(valid & (forward == np.uint64(target)))
+
+    def codon_indices(self, frame=0):
+        """Codon indices 0-63 (first base most significant) of every complete codon; 64 = ambiguous."""
+        bases = self.codes(frame)
+        count = len(bases) // 3
+        triplets = bases[:count * 3].reshape(count, 3)
+        codons = (triplets[:, 0].astype(np.int64) << 4) | (triplets[:, 1] << 2) | triplets[:, 2]
+        codons[(triplets > 3).any(axis=1)] = 64
+        return codons
+
+def as_packed(sequence):
+    """Accepts a str or a PackedSequence; modules call this once at entry."""
+    return sequence if isinstance(sequence, PackedSequence) else PackedSequence(sequence)
+
+def as_text(sequence):
+    """Plain string for the few places that need one (Biopython, JSON output)."""
+    return sequence.text() if isinstance(sequence, PackedSequence) else sequence
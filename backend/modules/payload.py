@@ -0,0 +1,135 @@
+import base64
+import json
+import zlib
+from operator import itemgetter
+
+import numpy as np
+
+# --- RESPONSE PAYLOADS ---
+# Analysis results grow with the sequence (a 1 Mb construct has millions of cut
+# sites); responses don't. Long detail lists are replaced by a preview: the most
+# significant item of each of DETAIL_LIMIT equal stretches of the sequence, so the
+# maps still cover the whole construct, and long DNA fields by their first bases.
+# The complete values are read page by page through a handle (see page()).
+DETAIL_LIMIT = 500 # Items of a detail list inlined in a response
+SEQUENCE_LIMIT = 10_000 # Bases of a DNA field inlined in a response
+PAGE_LIMIT = 1000 # Default page size (items, or bases for DNA fields)
+PAGE_MAX = 100_000
+
+# module -> {list field: (position key, significance of an item)}
+DETAIL_FIELDS = {
+    "synthesis": {"homopolymers.details": ("start", itemgetter("length")),
+                  "repeats.details": ("start", itemgetter("length")),
+                  "tandem_repeats.details": ("start", itemgetter("length")),
+                  "low_complexity.details": ("start", itemgetter("length"))},
+    "restriction": {"sites": ("position", lambda site: -site["frequency"])}, # Rare cutters first
+    "prediction": {"issues": ("start", lambda issue: issue.get("val", 1)),
+                   "orfs": ("start", itemgetter("codons")),
+                   "cryptic_orfs": ("start", itemgetter("codons"))}
+}
+SEQUENCE_FIELDS = {"optimization": ["original_dna", "optimized_dna"]}
+
+def paged_fields(module):
+    return list(DETAIL_FIELDS.get(module, {})) + SEQUENCE_FIELDS.get(module, [])
+
+# --- DOWNSAMPLING ---
+def extreme_indices(series, step):
+    """
+    Min/max downsampling: indices (sorted, unique) of the minimum and the maximum
+    of every `step`-long bucket of each series, so peaks and dips survive whatever
+    the length. Ties go to the earliest position.
+    """
+    picks = []
+    for values in series:
+        values = np.asarray(values)
+        full = len(values) // step * step
+        if full:
+            blocks = values[:full].reshape(-1, step)
+            offsets = np.arange(0, full, step)
+            picks += [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+        if full < len(values):
+            tail = values[full:]
+            picks.append(np.array([full + int(tail.argmin()), full + int(tail.argmax())]))
+    return np.unique(np.concatenate(picks)) if picks else np.zeros(0, dtype=np.int64)
+
+def preview(items, position, significance, length, buckets=DETAIL_LIMIT):
+    """The most significant item of each of `buckets` equal stretches of the sequence, in list order."""
+    if len(items) <= buckets:
+        return items
+    where = np.fromiter(map(itemgetter(position), items), dtype=np.int64, count=len(items))
+    weight = np.fromiter(map(significance, items), dtype=np.float64, count=len(items))
+    bucket = np.clip((where - 1) * buckets // max(1, length), 0, buckets - 1)
+    best = np.full(buckets, -np.inf)
+    np.maximum.at(best, bucket, weight)
+    hits = np.flatnonzero(weight == best[bucket])
+    _, first = np.unique(bucket[hits], return_index=True) # First best item of each bucket
+    return [items[i] for i in np.sort(hits[first]).tolist()]
+
+# --- BOUNDED RESULTS ---
+def bound_results(results, length, page_url, limit=DETAIL_LIMIT, sequence_limit=SEQUENCE_LIMIT):
+    """
+    Copy of `results` (never modified: it may be cached) with every oversized field
+    cut down, and a "paged" entry per cut module: {field: {"total", "returned",
+    "preview": "buckets" or "head", "next": page_url(module, field)}}.
+    """
+    bounded = {}
+    for module, result in results.items():
+        paged = {}
+        if result.get("status") != "ERROR":
+            for field, (position, significance) in DETAIL_FIELDS.get(module, {}).items():
+                items = field_value(result, field)
+                if items is not None and len(items) > limit:
+                    kept = preview(items, position, significance, length, limit)
+                    result = _replace(result, field, kept)
+                    paged[field] = {"total": len(items), "returned": len(kept), "preview": "buckets"}
+            for field in SEQUENCE_FIELDS.get(module, []):
+                text = field_value(result, field)
+                if text is not None and len(text) > sequence_limit:
+                    result = _replace(result, field, text[:sequence_limit])
+                    paged[field] = {"total": len(text), "returned": sequence_limit, "preview": "head"}
+        if paged:
+            for field, info in paged.items():
+                info["next"] = page_url(module, field)
+            result = {**result, "paged": paged}
+        bounded[module] = result
+    return bounded
+
+def field_value(result, path):
+    """Value at a dotted path such as "repeats.details" (None if missing)."""
+    for part in path.split("."):
+        if not isinstance(result, dict) or part not in result:
+            return None
+        result = result[part]
+    return result
+
+def _replace(result, path, value):
+    # Copies the dicts along the path only
+    head, _, rest = path.partition(".")
+    return {**result, head: _replace(result[head], rest, value) if rest else value}
+
+# --- PAGES ---
+def encode_handle(request):
+    """URL-safe token of what identifies a cached result (sequence hash, module, modules, params)."""
+    raw = zlib.compress(json.dumps(request, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_handle(token):
+    """Inverse of encode_handle(); raises ValueError for a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        request = json.loads(zlib.decompress(raw))
+    except (ValueError, zlib.error) as exc:
+        raise ValueError(f"Invalid result handle ({exc})")
+    if not isinstance(request, dict):
+        raise ValueError("Invalid result handle")
+    return request
+
+def page(value, cursor=0, limit=PAGE_LIMIT):
+    """One page of a list (items) or of a DNA field (bases) from the `cursor` offset."""
+    end = min(len(value), cursor + limit)
+    view = {"total": len(value), "cursor": cursor, "next_cursor": end if end < len(value) else None}
+    if isinstance(value, str):
+        view["sequence"] = value[cursor:end]
+    else:
+        view["items"] = value[cursor:end]
+    return view
@@ -1,54 +1,234 @@
-from Bio.Seq import Seq
+import numpy as np
 
-def predict_problems(sequence):
+from modules.packed import as_packed
+from modules.orfs import MIN_ORF, scan_frames
+
+CHI_SITE = "GCTGGTGG" # E. coli recombination hotspot
+CHI_SITE_REVERSE = "CCACCAGC" # The same site on the antisense strand
+
+# --- HAIRPIN STABILITY (approximate, 37 C) ---
+# Nearest-neighbor stacking free energies in kcal/mol (SantaLucia 1998),
+# indexed by dinucleotide code 4*first + second (A=0, C=1, G=2, T=3).
+_STACK_DG = np.array([
+    -1.00, -1.44, -1.28, -0.88,  # AA AC AG AT
+    -1.45, -1.84, -2.17, -1.28,  # CA CC CG CT
+    -1.30, -2.24, -1.84, -1.44,  # GA GC GG GT
+    -0.58, -1.30, -1.45, -1.00,  # TA TC TG TT
+])
+# Hairpin loop initiation penalties by loop length (SantaLucia & Hicks 2004)
+_LOOP_SIZES = np.array([3, 4, 5, 6, 7, 8, 9, 10, 12, 14, 16, 18, 20, 25, 30])
+_LOOP_DG = np.array([3.5, 3.5, 3.3, 4.0, 4.2, 4.3, 4.5, 4.6, 5.0, 5.1, 5.3, 5.5, 5.7, 6.1, 6.3])
+
+# Seed k-mer code and position share one unsigned 64-bit sort key
+_KEY_BITS = 64
+
+def _loop_penalty(loops):
+    """Loop initiation dG; loops beyond the table are extrapolated (Jacobson-Stockmayer)."""
+    loops = np.maximum(loops, 3)
+    penalty = np.interp(loops, _LOOP_SIZES, _LOOP_DG)
+    longer = loops > _LOOP_SIZES[-1]
+    penalty[longer] = _LOOP_DG[-1] + 1.51 * np.log(loops[longer] / _LOOP_SIZES[-1])
+    return penalty
+
+def find_hairpins(sequence, min_stem=10, max_stem=None, min_loop=5, max_loop=30, stability=True):
+    """
+    Inverted-repeat (hairpin) scanner.
+    Every k-mer is indexed once as a sorted (code, position) key; the reverse
+    complement of each k-mer is then looked up in that index restricted to the
+    allowed loop range, so all stems are found in O(n log n). Stacked k-mer pairs
+    are merged and extended outward base by base into maximal stems; stems longer
+    than max_stem keep their innermost max_stem bp. Optionally estimates the stem's free energy (nearest-neighbor
+    stacks + loop penalty).
+    """
+    seq = as_packed(sequence)
+    min_loop = max(0, min_loop)
+    if min_stem < 1 or max_loop < min_loop or len(seq) < 2 * min_stem + min_loop:
+        return []
+    span = len(seq) + 1
+    # Seed k-mers must fit next to the position in one 64-bit key. Only the
+    # innermost seed pair of a stem has to be in the loop range (step 3 extends it).
+    k = min(min_stem, 32, (_KEY_BITS - span.bit_length()) // 2)
+
+    forward, reverse, valid = seq.kmer_codes(k, with_reverse=True)
+    positions = np.flatnonzero(valid).astype(np.uint64)
+    if len(positions) == 0:
+        return []
+
+    # 1. Index: code * span + position, sorted (keys are unique, so no stable sort needed)
+    index = np.sort(forward[valid] * np.uint64(span) + positions)
+    # 2. Queries: each left arm's reverse complement, sorted the same way so the lookups are sequential
+    queries = np.sort(reverse[valid] * np.uint64(span) + positions)
+    del forward, reverse, valid, positions
+
+    left = (queries % np.uint64(span)).astype(np.int64)
+    block = queries - left.astype(np.uint64)
+    ceiling = span - 1 # Keeps both bounds inside the k-mer's own code block
+    lo = np.searchsorted(index, block + np.minimum(left + k + min_loop, ceiling).astype(np.uint64), side="left")
+    hi = np.searchsorted(index, block + np.minimum(left + k + max_loop, ceiling).astype(np.uint64), side="right")
+    counts = np.maximum(hi - lo, 0)
+    del queries, block, hi
+
+    total = int(counts.sum())
+    if total == 0:
+        return []
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    right = (index[np.repeat(lo, counts) + offsets] % np.uint64(span)).astype(np.int64)
+    left = np.repeat(left, counts)
+    del index, lo, counts, offsets
+
+    # 3. Stacked pairs (i, j), (i+1, j-1), ... share i + j: merge them into maximal stems
+    pairs = np.sort((left + right) * span + left)
+    diagonal, left = pairs // span, pairs % span
+    right = diagonal - left
+    breaks = np.flatnonzero((np.diff(left) != 1) | (np.diff(diagonal) != 0)) + 1
+    firsts = np.concatenate(([0], breaks))
+    lasts = np.concatenate((breaks - 1, [len(left) - 1]))
+    del pairs, diagonal, breaks
+
+    starts = left[firsts]
+    stems = left[lasts] - starts + k
+    ends = right[firsts] + k            # exclusive end of the right arm
+    loops = right[lasts] - left[lasts] - k
+    # The outer seed pairs of a long stem lie beyond the loop range: extend the arms
+    # while their next bases pair (a few rounds; each only visits the growing stems)
+    bases = seq.codes()
+    growing = np.arange(len(starts))
+    while len(growing):
+        growing = growing[(starts[growing] > 0) & (ends[growing] < len(seq))]
+        growing = growing[bases[starts[growing] - 1].astype(np.int16) + bases[ends[growing]] == 3] # A-T, C-G
+        starts[growing] -= 1
+        ends[growing] += 1
+        stems[growing] += 1
+    if max_stem:
+        trim = np.maximum(stems - max_stem, 0)
+        starts, ends, stems = starts + trim, ends - trim, stems - trim
+    keep = (stems >= min_stem) & (loops <= max_loop)
+    starts, ends, stems, loops = starts[keep], ends[keep], stems[keep], loops[keep]
+
+    # 4. Stability: stacks along the left arm + loop initiation
+    if stability and len(starts):
+        steps = stems - 1
+        owner = np.repeat(np.arange(len(starts)), steps)
+        at = np.repeat(starts, steps) + np.arange(int(steps.sum())) - np.repeat(np.cumsum(steps) - steps, steps)
+        stacks = _STACK_DG[bases[at].astype(np.int64) * 4 + bases[at + 1]]
+        dgs = np.bincount(owner, weights=stacks, minlength=len(starts)) + _loop_penalty(loops)
+    else:
+        dgs = None
+
+    hairpins = []
+    for idx in np.argsort(starts, kind="stable").tolist():
+        hairpin = {"start": int(starts[idx]) + 1, "end": int(ends[idx]), "stem": int(stems[idx]), "loop": int(loops[idx])}
+        if dgs is not None:
+            hairpin["dg"] = round(float(dgs[idx]), 2)
+        hairpins.append(hairpin)
+    return hairpins
+
+def predict_problems(sequence, min_stem=10, max_stem=None, min_loop=5, max_loop=30, stability=True, min_orf=MIN_ORF):
     """
     Module 4: Safety & Stability Scanner (Pro Console Edition)
+    Hairpin options are passed through to find_hairpins(); ORFs of at least
+    `min_orf` codons outside frame +1 are listed as cryptic ORFs (not scored).
+    """
+    seq = as_packed(sequence)
+
+    # 1. Chi Sites (both strands)
+    chi = _chi_issues(seq)
+
+    # 2. Hairpins (every stem in the configured stem/loop ranges)
+    hairpins = [_hairpin_issue(hp) for hp in find_hairpins(seq, min_stem, max_stem, min_loop, max_loop, stability)]
+
+    # 3. Six-frame scan: stops in frame +1 (the final codon is the expected stop), ORFs in all frames
+    frames, orfs = scan_frames(seq, min_orf)
+    return _problem_report(chi, hairpins, _stop_issues(frames, len(seq)), frames, orfs, len(seq))
+
+def patch_problems(previous, sequence, edit, min_stem=10, max_stem=None, min_loop=5, max_loop=30, stability=True, min_orf=MIN_ORF):
     """
-    issues = []
+    predict_problems() of an edited sequence from the result before the edit.
+    Chi sites and hairpins are only searched around the edit; the other hits are
+    kept, shifted when downstream. The six-frame scan (stops, ORFs) is a few
+    vectorized passes and simply redone. edit = (start, old_end, new_end),
+    0-based, see modules/incremental.py.
+    """
+    seq = as_packed(sequence)
+    options = (min_stem, max_stem, min_loop, max_loop, stability)
+    if "frames" not in previous:
+        return predict_problems(seq, *options, min_orf)
+    start, old_end, new_end = edit
+    shift = new_end - old_end
+    length = len(seq)
+    old = {"Chi Site": [], "Hairpin": []}
+    for issue in previous["issues"]:
+        old.setdefault(issue["type"], []).append(issue)
+
+    def moved(issue):
+        return dict(issue, start=issue["start"] + shift, end=issue["end"] + shift)
+
+    # 1. Chi sites (either strand) overlapping the edit
+    lo, hi = max(0, start - len(CHI_SITE) + 1), min(length, new_end + len(CHI_SITE) - 1)
+    chi = [issue for issue in old["Chi Site"] if issue["start"] - 1 < lo]
+    chi += [dict(issue, start=issue["start"] + lo, end=issue["end"] + lo) for issue in _chi_issues(seq.window(lo, hi))]
+    chi += [moved(issue) for issue in old["Chi Site"] if issue["start"] - 1 >= old_end]
+
+    # 2. Stops and ORFs
+    frames, orfs = scan_frames(seq, min_orf)
+    stops = _stop_issues(frames, length)
+
+    # 3. Hairpins touching the edit. Any such stem is at most `reach` long: max_stem,
+    # or (unbounded stems) no longer than the longest stem before the edit.
+    longest = max_stem or max([min_stem] + [issue["stem"] for issue in old["Hairpin"]])
+    reach = 2 * longest + max_loop + 1
+    lo, hi = max(0, start - reach), min(length, new_end + reach)
+    found = [hp for hp in find_hairpins(seq.window(lo, hi), *options)
+             if hp["end"] + lo >= start and hp["start"] + lo - 2 < new_end]
+    if any((hp["start"] == 1 and lo > 0) or (hp["end"] == hi - lo and hi < length) for hp in found):
+        # A stem reaches the edge of the window: it may extend beyond it
+        hairpins = [_hairpin_issue(hp) for hp in find_hairpins(seq, *options)]
+    else:
+        hairpins = [issue for issue in old["Hairpin"] if issue["end"] < start]
+        hairpins += [_hairpin_issue(dict(hp, start=hp["start"] + lo, end=hp["end"] + lo)) for hp in found]
+        hairpins += [moved(issue) for issue in old["Hairpin"] if issue["start"] - 2 >= old_end]
+        hairpins.sort(key=lambda x: (x["start"], x["end"]))
+
+    return _problem_report(chi, hairpins, stops, frames, orfs, length)
+
+def _chi_issues(seq):
+    chi = [_chi_issue(pos, "+") for pos in seq.find(CHI_SITE).tolist()]
+    chi += [_chi_issue(pos, "-") for pos in seq.find(CHI_SITE_REVERSE).tolist()]
+    return sorted(chi, key=lambda x: x["start"])
+
+def _chi_issue(pos, strand):
+    return { "type": "Chi Site", "risk": "High", "start": pos+1, "end": pos+len(CHI_SITE), "color": "orange", "val": 3,
+             "strand": strand }
+
+def _stop_issues(frames, length):
+    last_codon = length // 3 - 1
+    return [_stop_issue(i) for i in frames["+1"]["stops"].tolist() if i < last_codon]
+
+def _hairpin_issue(hp):
+    return { "type": "Hairpin", "risk": "Medium", "start": hp["start"], "end": hp["end"], "color": "blue", "val": 2,
+             "stem": hp["stem"], "loop": hp["loop"], "dg": hp.get("dg") }
+
+def _stop_issue(codon):
+    pos = codon * 3
+    return { "type": "Premature Stop", "risk": "Critical", "start": pos+1, "end": pos+3, "color": "red", "val": 5 }
+
+def _orf_issue(orf):
+    return { "type": "Cryptic ORF", "risk": "Low", "start": orf["start"], "end": orf["end"], "color": "purple", "val": 1,
+             "frame": orf["frame"], "codons": orf["codons"] }
+
+def _problem_report(chi, hairpins, stops, frames, orfs, length):
+    """Checks, risk density and score from the Chi / hairpin / stop issues; cryptic ORFs are listed apart."""
+    cryptic = [_orf_issue(orf) for orf in orfs if orf["frame"] != "+1"] # Frame +1 holds the coding sequence
+    issues = chi + hairpins + stops
     checks = {
-        "stops": {"status": "PASS", "count": 0, "label": "Premature Stops", "risk_val": 5},
-        "hairpins": {"status": "PASS", "count": 0, "label": "Strong Hairpins", "risk_val": 2},
-        "chi": {"status": "PASS", "count": 0, "label": "Chi Sites", "risk_val": 3}
+        "stops": {"status": "PASS", "count": len(stops), "label": "Premature Stops", "risk_val": 5},
+        "hairpins": {"status": "PASS", "count": len(hairpins), "label": "Strong Hairpins", "risk_val": 2},
+        "chi": {"status": "PASS", "count": len(chi), "label": "Chi Sites", "risk_val": 3}
     }
-    
-    # Helper
-    def find_all(sub, seq):
-        start = 0
-        while True:
-            start = seq.find(sub, start)
-            if start == -1: return
-            yield start
-            start += 1
-
-    # 1. Chi Sites
-    for pos in find_all("GCTGGTGG", sequence):
-        issues.append({ "type": "Chi Site", "risk": "High", "start": pos+1, "end": pos+8, "color": "orange", "val": 3 })
-        checks["chi"]["count"] += 1
-
-    # 2. Hairpins
-    window = 10
-    for i in range(0, len(sequence) - window - 10, 50): 
-        chunk = sequence[i:i+window]
-        rev_comp = str(Seq(chunk).reverse_complement())
-        search_area = sequence[i+window+5 : i+window+40]
-        if rev_comp in search_area:
-            issues.append({ "type": "Hairpin", "risk": "Medium", "start": i+1, "end": i+40, "color": "blue", "val": 2 })
-            checks["hairpins"]["count"] += 1
-            if checks["hairpins"]["count"] >= 5: break 
-
-    # 3. Stops
-    try:
-        protein = Seq(sequence).translate(to_stop=False)
-        for i, aa in enumerate(protein[:-1]): 
-            if aa == "*":
-                pos = i * 3
-                issues.append({ "type": "Premature Stop", "risk": "Critical", "start": pos+1, "end": pos+3, "color": "red", "val": 5 })
-                checks["stops"]["count"] += 1
-    except: pass
 
     # --- RISK DENSITY CALCULATION (THIS IS THE MISSING PART CAUSING THE ERROR) ---
     bin_count = 20
-    bin_size = max(1, len(sequence) // bin_count)
+    bin_size = max(1, length // bin_count)
     risk_density = [0] * bin_count
     
     for issue in issues:
@@ -61,7 +241,7 @@ def predict_problems(sequence):
     score = 100
     score -= (checks["stops"]["count"] * 50)
     score -= (checks["chi"]["count"] * 20)
-    score -= (checks["hairpins"]["count"] * 5)
+    score -= (min(checks["hairpins"]["count"], 5) * 5) # Same cap as the former 5-hit scan
     score = max(0, score)
     
     for key in checks:
@@ -76,5 +256,8 @@ def predict_problems(sequence):
         "checks": checks,
         "risk_density": risk_density, 
         "bin_labels": [f"{i*bin_size}-{(i+1)*bin_size}" for i in range(bin_count)],
+        "frames": {name: {"stops": len(frame["stops"]), "starts": len(frame["starts"])} for name, frame in frames.items()},
+        "orfs": orfs,
+        "cryptic_orfs": cryptic,
         "message": f"{len(issues)} anomalies detected."
-    }
\ No newline at end of file
+    }
@@ -1,66 +1,209 @@
 import datetime
+import json
+
+import numpy as np
+
+# --- REPORT FORMATS ---
+# Reports are generated lazily, section by section and row by row, so that they
+# can be streamed to the client (see /download) for huge sequences and batches
+# without ever being held in memory as a whole.
+REPORT_FORMATS = {
+    "text": ("text/plain", "txt"),
+    "tsv": ("text/tab-separated-values", "tsv"),
+    "jsonl": ("application/x-ndjson", "jsonl")
+}
+FEATURE_COLUMNS = ["record", "module", "feature", "start", "end", "name", "value"]
+SEQUENCE_LINE = 80 # Bases per line of the optimized sequence
+CHUNK_SIZE = 64 * 1024 # Characters per streamed chunk
 
 def generate_report_text(sequence, results):
     """
     Generates a formatted text file content for the analysis.
     """
+    return "".join(iter_report([(None, sequence, results)])).rstrip("\n")
+
+def iter_report(records, fmt="text"):
+    """
+    Yields the report of every (record id, sequence, results) of `records` (any
+    iterable, consumed one record at a time) line by line, as text, TSV or JSON lines.
+    """
+    if fmt == "text":
+        yield from _text_header()
+        count = 0
+        for record_id, sequence, results in records:
+            count += 1
+            yield from _text_record(record_id, sequence, results)
+        yield from _text_footer(count)
+    elif fmt == "tsv":
+        yield "\t".join(FEATURE_COLUMNS) + "\n"
+        for record in records:
+            for row in iter_features(*record):
+                yield "\t".join(_tsv_cell(row[col]) for col in FEATURE_COLUMNS) + "\n"
+    elif fmt == "jsonl":
+        for record in records:
+            for row in iter_features(*record):
+                yield json.dumps(row) + "\n"
+    else:
+        raise ValueError(f"Unknown report format '{fmt}' (available: {', '.join(REPORT_FORMATS)})")
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Groups report lines into chunks of about `size` characters for a streamed response."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+# --- TEXT REPORT ---
+def _text_header():
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    report = []
-    report.append("==================================================")
-    report.append("              BIOVALIDATOR LAB REPORT             ")
-    report.append("==================================================")
-    report.append(f"Date: {timestamp}")
-    report.append(f"Sequence Length: {len(sequence)} bp")
-    report.append("-" * 50)
-    report.append("")
-    
+    yield "==================================================\n"
+    yield "              BIOVALIDATOR LAB REPORT             \n"
+    yield "==================================================\n"
+    yield f"Date: {timestamp}\n"
+
+def _text_footer(count):
+    if count > 1:
+        yield f"Records: {count}\n"
+    yield "==================================================\n"
+    yield "             END OF REPORT - BIOVALIDATOR         \n"
+    yield "==================================================\n"
+
+def _failed(result):
+    return result is None or result.get("status") == "ERROR"
+
+def _text_record(record_id, sequence, results):
+    if record_id is not None:
+        yield f"Record: {record_id}\n"
+    yield f"Sequence Length: {len(sequence)} bp\n"
+    yield "-" * 50 + "\n\n"
+
     # --- MODULE 1: SYNTHESIS ---
-    report.append("[MODULE 1: SYNTHESIS FEASIBILITY]")
-    s = results['synthesis']
-    report.append(f"Status: {s['length']['status']} | GC Content: {s['gc']['value']}% ({s['gc']['status']})")
-    if s['homopolymers']['count'] > 0:
-        report.append(f"WARNING: {s['homopolymers']['count']} Homopolymer runs detected.")
+    yield "[MODULE 1: SYNTHESIS FEASIBILITY]\n"
+    s = results.get('synthesis')
+    if _failed(s):
+        yield _not_available(s)
     else:
-        report.append("Homopolymers: Clean")
-    report.append("-" * 50)
-    report.append("")
+        yield f"Status: {s['length']['status']} | GC Content: {s['gc']['value']}% ({s['gc']['status']})\n"
+        if s['homopolymers']['count'] > 0:
+            yield f"WARNING: {s['homopolymers']['count']} Homopolymer runs detected.\n"
+        else:
+            yield "Homopolymers: Clean\n"
+        if s['repeats']['count'] > 0:
+            yield f"WARNING: {s['repeats']['count']} Repeats covering {s['repeats']['coverage']}% of the sequence.\n"
+        if s['tandem_repeats']['count'] > 0:
+            yield f"WARNING: {s['tandem_repeats']['count']} Tandem repeats covering {s['tandem_repeats']['coverage']}% of the sequence.\n"
+        if s['low_complexity']['count'] > 0:
+            yield f"WARNING: {s['low_complexity']['count']} Low-complexity regions covering {s['low_complexity']['coverage']}% of the sequence.\n"
+    yield "-" * 50 + "\n\n"
 
     # --- MODULE 2: RESTRICTION ---
-    report.append("[MODULE 2: RESTRICTION MAP]")
-    r = results['restriction']
-    report.append(f"Status: {r['message']}")
-    if r['count'] > 0:
-        report.append(f"{'Enzyme':<15} | {'Position':<10} | {'Pattern'}")
-        report.append("-" * 45)
-        for site in r['sites']:
-            report.append(f"{site['enzyme']:<15} | {site['position']:<10} | {site['pattern']}")
-    report.append("-" * 50)
-    report.append("")
+    yield "[MODULE 2: RESTRICTION MAP]\n"
+    r = results.get('restriction')
+    if _failed(r):
+        yield _not_available(r)
+    else:
+        yield f"Status: {r['message']}\n"
+        if r['count'] > 0:
+            yield f"{'Enzyme':<15} | {'Position':<10} | {'Cuts'}\n"
+            yield "-" * 45 + "\n"
+            for site in r['sites']:
+                yield f"{site['enzyme']:<15} | {site['position']:<10} | {site['frequency']}\n"
+    yield "-" * 50 + "\n\n"
 
     # --- MODULE 3: OPTIMIZATION ---
-    report.append("[MODULE 3: CODON OPTIMIZATION]")
-    o = results['optimization']
-    report.append(f"Original CAI Score: Poor (Estimated)")
-    report.append(f"Optimized Score: {o['percent_improved']}% Improved")
-    report.append(f"Codons Changed: {o['changes']}")
-    report.append("\nOPTIMIZED SEQUENCE (E. COLI K12):")
-    report.append(o['optimized_dna'])
-    report.append("-" * 50)
-    report.append("")
+    yield "[MODULE 3: CODON OPTIMIZATION]\n"
+    o = results.get('optimization')
+    if _failed(o):
+        yield _not_available(o)
+    else:
+        host = o.get('codon_table', {}).get('organism', 'E. coli K12')
+        yield f"Original CAI: {o['cai_before']}\n"
+        yield f"Optimized CAI: {o['cai_after']} ({_percent_change(o['cai_before'], o['cai_after'])} change)\n"
+        yield f"Codons Changed: {changed_codons(o['original_dna'], o['optimized_dna'])}\n"
+        yield f"\nOPTIMIZED SEQUENCE ({host.upper()}):\n"
+        dna = o['optimized_dna']
+        for start in range(0, len(dna), SEQUENCE_LINE):
+            yield dna[start:start + SEQUENCE_LINE] + "\n"
+    yield "-" * 50 + "\n\n"
 
     # --- MODULE 4: SAFETY ---
-    report.append("[MODULE 4: BIOLOGICAL SAFETY]")
-    p = results['prediction']
-    if p['count'] == 0:
-        report.append("Status: SAFE (No issues detected)")
+    yield "[MODULE 4: BIOLOGICAL SAFETY]\n"
+    p = results.get('prediction')
+    if _failed(p):
+        yield _not_available(p)
+    elif not p['issues']:
+        yield "Status: SAFE (No issues detected)\n"
     else:
-        report.append(f"Status: CRITICAL ({p['count']} Issues)")
+        yield f"Status: {p['status']} ({len(p['issues'])} Issues, score {p['score']})\n"
         for issue in p['issues']:
-            report.append(f"CRITICAL: {issue['type']} - {issue['message']}")
-            
-    report.append("==================================================")
-    report.append("             END OF REPORT - BIOVALIDATOR         ")
-    report.append("==================================================")
+            yield f"{issue['risk'].upper()}: {issue['type']} at {issue['start']}-{issue['end']}\n"
+    if not _failed(p) and p.get('cryptic_orfs'):
+        yield f"Cryptic ORFs (other frames, not scored): {len(p['cryptic_orfs'])}\n"
+    yield "\n"
+
+def _not_available(result):
+    return f"ERROR: {result['error']}\n" if result else "Not run.\n"
+
+def _percent_change(before, after):
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+def changed_codons(original, optimized, block=3 << 18):
+    """Codons that differ between two sequences, compared block by block (no full-length copies)."""
+    changed, common = 0, min(len(original), len(optimized))
+    for start in range(0, common, block):
+        stop = min(common, start + block)
+        a = np.frombuffer(original[start:stop].encode("ascii", "replace"), dtype=np.uint8)
+        b = np.frombuffer(optimized[start:stop].encode("ascii", "replace"), dtype=np.uint8)
+        full = len(a) // 3
+        changed += int((a[:full * 3].reshape(full, 3) != b[:full * 3].reshape(full, 3)).any(axis=1).sum())
+        changed += int(a[full * 3:].tobytes() != b[full * 3:].tobytes()) # Trailing partial codon
+    return changed + -(-abs(len(original) - len(optimized)) // 3)
+
+# --- FEATURE ROWS (TSV / JSON LINES) ---
+def iter_features(record_id, sequence, results):
+    """One row per finding ({column: value}, see FEATURE_COLUMNS), module by module."""
+    def row(module, feature, start=None, end=None, name=None, value=None):
+        return {"record": record_id, "module": module, "feature": feature, "start": start, "end": end,
+                "name": name, "value": value}
+
+    yield row("sequence", "length", value=len(sequence))
+    for module, result in results.items():
+        if _failed(result):
+            yield row(module, "error", name=result["error"] if result else "not run")
+            continue
+        if module == "synthesis":
+            yield row(module, "gc", name=result['gc']['status'], value=result['gc']['value'])
+            for run in result['homopolymers']['details']:
+                yield row(module, "homopolymer", run['start'], run['end'], run['base'], run['length'])
+            for rep in result['repeats']['details']:
+                yield row(module, f"{rep['type']}_repeat", rep['start'], rep['end'], rep['sequence'], rep['length'])
+            for rep in result['tandem_repeats']['details']:
+                yield row(module, "tandem_repeat", rep['start'], rep['end'], rep['unit'], rep['copies'])
+            for region in result['low_complexity']['details']:
+                yield row(module, "low_complexity", region['start'], region['end'], None, region['entropy'])
+        elif module == "restriction":
+            for site in result['sites']:
+                yield row(module, "cut", site['position'], site['position'], site['enzyme'], site['frequency'])
+        elif module == "optimization":
+            yield row(module, "cai_before", value=result['cai_before'])
+            yield row(module, "cai_after", value=result['cai_after'])
+            yield row(module, "codons_changed", value=changed_codons(result['original_dna'], result['optimized_dna']))
+            for violation in (result.get('constraints') or {}).get('violations', []):
+                yield row(module, "violation", violation['start'], violation['end'], violation['type'], violation.get('detail'))
+        elif module == "prediction":
+            yield row(module, "score", name=result['status'], value=result['score'])
+            for issue in result['issues']:
+                yield row(module, issue['type'].lower().replace(" ", "_"), issue['start'], issue['end'], issue['risk'],
+                          issue.get('frame', issue.get('strand')))
+            for orf in result.get('cryptic_orfs', []):
+                yield row(module, "cryptic_orf", orf['start'], orf['end'], orf['frame'], orf['codons'])
 
-    return "\n".join(report)
\ No newline at end of file
+def _tsv_cell(value):
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\n", " ")
@@ -1,6 +1,272 @@
-from Bio.Seq import Seq
-from Bio.Restriction import AllEnzymes, Analysis
-import math
+import bisect
+import json
+import operator
+import os
+import re
+import string
+import threading
+
+from modules.digest import gel_position
+from modules.packed import as_text
+
+# Tokens of a Biopython "compsite" regex: a literal base, '.' (N) or a [..] class
+_SITE_TOKEN = re.compile(r'\[[A-Z]+\]|[A-Z.]')
+_SITE_GROUP = re.compile(r'\(\?P<(\w+)>([^)]*)\)')
+_LETTERS = string.ascii_uppercase
+_POSITION = operator.itemgetter("position")
+
+# The compiled automaton, saved so that a cold start neither imports Bio.Restriction
+# (whose enzyme database is slow to load) nor recompiles ~1000 sites
+PRECOMPUTED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "data", "precomputed", "restriction_engine.json")
+TABLE_FORMAT = 1
+
+# Same cleaning as Bio.Restriction.FormattedSeq: letters are upper-cased,
+# whitespace/digits dropped, anything else is an invalid character.
+_CLEAN_TABLE = bytes(c if chr(c) in _LETTERS else (c - 32 if chr(c) in string.ascii_lowercase else 0) for c in range(256))
+_CLEAN_DELETE = (string.whitespace + string.digits).encode()
+
+class RestrictionEngine:
+    """
+    Multi-pattern restriction site automaton.
+    Every recognition site (both strands, IUPAC classes expanded per position)
+    is compiled once into a single bit-parallel Shift-And automaton, so one
+    pass over the sequence finds the sites of all enzymes at the same time.
+    Cut positions follow Bio.Restriction exactly (Analysis(...).full()).
+    Building it needs Bio.Restriction; to_table()/from_table() save and restore
+    the compiled automaton without it.
+    """
+
+    def __init__(self, enzymes=None):
+        from Bio.Restriction import AllEnzymes, RestrictionBatch # Slow import: only when compiling
+
+        self.enzymes = []     # (name, palindromic, fwd_cuts, rev_cuts, ovhg, drop_linear)
+        self.sites = {}       # name -> recognition site (IUPAC)
+        self.max_size = 0
+        self._masks = dict.fromkeys(_LETTERS, 0)
+        self._starts = 0
+        self._ends = 0
+        self._end_bits = {}   # end bit index -> (enzyme index, is_reverse, pattern length)
+
+        offset = 0
+        # RestrictionBatch iteration order == Analysis order, so output order matches too
+        for enzyme in RestrictionBatch(AllEnzymes if enzymes is None else enzymes):
+            idx = len(self.enzymes)
+            name = str(enzyme)
+            self.enzymes.append(self._cut_rules(enzyme))
+            self.sites[name] = str(enzyme.site)
+            self.max_size = max(self.max_size, enzyme.size)
+
+            for group, body in _SITE_GROUP.findall(enzyme.compsite.pattern):
+                tokens = _SITE_TOKEN.findall(body)
+                self._starts |= 1 << offset
+                for k, token in enumerate(tokens):
+                    if token == '.':
+                        allowed = _LETTERS
+                    elif token[0] == '[':
+                        allowed = token[1:-1]
+                    else:
+                        allowed = token
+                    for base in allowed:
+                        self._masks[base] |= 1 << (offset + k)
+                end = offset + len(tokens) - 1
+                self._ends |= 1 << end
+                self._end_bits[end] = (idx, group != name, len(tokens))
+                offset += len(tokens)
+
+        self.pattern_bits = offset
+        self._derive()
+
+    def _derive(self):
+        # Farthest a cut (or its overhang end) can lie from its site start
+        self.reach = max([self.max_size] + [abs(d) for rule in self.enzymes for d in rule[2] + rule[3]]
+                         + [abs(rule[4] or 0) for rule in self.enzymes])
+        self.order = {rule[0]: idx for idx, rule in enumerate(self.enzymes)}
+
+    def to_table(self):
+        """JSON-serializable form of the compiled automaton (bit masks as hex strings)."""
+        return {
+            "enzymes": self.enzymes,
+            "sites": self.sites,
+            "max_size": self.max_size,
+            "pattern_bits": self.pattern_bits,
+            "masks": {base: format(mask, "x") for base, mask in self._masks.items()},
+            "starts": format(self._starts, "x"),
+            "ends": format(self._ends, "x"),
+            "end_bits": [[end, idx, is_reverse, size] for end, (idx, is_reverse, size) in self._end_bits.items()]
+        }
+
+    @classmethod
+    def from_table(cls, table):
+        engine = cls.__new__(cls)
+        engine.enzymes = [(name, palindromic, tuple(fwd), tuple(rev), ovhg, drop_linear)
+                          for name, palindromic, fwd, rev, ovhg, drop_linear in table["enzymes"]]
+        engine.sites = table["sites"]
+        engine.max_size = table["max_size"]
+        engine.pattern_bits = table["pattern_bits"]
+        engine._masks = {base: int(mask, 16) for base, mask in table["masks"].items()}
+        engine._starts = int(table["starts"], 16)
+        engine._ends = int(table["ends"], 16)
+        engine._end_bits = {end: (idx, is_reverse, size) for end, idx, is_reverse, size in table["end_bits"]}
+        engine._derive()
+        return engine
+
+    @staticmethod
+    def _cut_rules(enzyme):
+        """Translates Biopython's _modify/_rev_modify/_drop rules into offsets."""
+        from Bio.Restriction.Restriction import NotDefined
+        if enzyme.cut_twice():
+            fwd, rev = (enzyme.fst5, enzyme.scd5), (-enzyme.fst3, -enzyme.scd3)
+        elif enzyme.cut_once():
+            fwd, rev = (enzyme.fst5,), (-enzyme.fst3,)
+        else:
+            fwd, rev = (0,), (0,)
+        # NotDefined enzymes keep out-of-range cuts on linear sequences
+        return (str(enzyme), enzyme.is_palindromic(), fwd, rev, enzyme.ovhg, not issubclass(enzyme, NotDefined))
+
+    @staticmethod
+    def clean(sequence):
+        """Upper-cases and strips the sequence like FormattedSeq does."""
+        data = sequence.encode("ascii").translate(_CLEAN_TABLE, _CLEAN_DELETE)
+        if 0 in data:
+            raise TypeError(f"Invalid character found in {sequence}")
+        return data.decode("ascii")
+
+    def scan(self, data, limit=None):
+        """
+        Single pass over the (cleaned) sequence.
+        Returns {enzyme index: (forward starts, reverse starts)}, 1-based starts,
+        only for matches starting at or before `limit`.
+        """
+        masks, starts, ends = self._masks, self._starts, self._ends
+        ends_at = [[] for _ in range(self.pattern_bits)]
+        state = 0
+        for i, base in enumerate(data):
+            state = ((state << 1) | starts) & masks[base]
+            matched = state & ends
+            while matched:
+                low = matched & -matched
+                matched ^= low
+                ends_at[low.bit_length() - 1].append(i)
+
+        limit = len(data) if limit is None else limit
+        hits = {}
+        for end, (idx, is_reverse, size) in self._end_bits.items():
+            positions = ends_at[end]
+            if not positions:
+                continue
+            found = [i - size + 2 for i in positions if i - size + 2 <= limit]
+            entry = hits.setdefault(idx, ([], []))
+            entry[is_reverse].extend(found)
+
+        for fwd_starts, rev_starts in hits.values():
+            # Like the regex alternation, a forward hit shadows a reverse hit at the same start
+            if fwd_starts and rev_starts:
+                shadowed = set(fwd_starts)
+                rev_starts[:] = [s for s in rev_starts if s not in shadowed]
+        return hits
+
+    def search(self, sequence, linear=True):
+        """Returns {enzyme name: [cut positions]} for every enzyme that cuts."""
+        data = self.clean(as_text(sequence))
+        length = len(data)
+        if linear:
+            hits = self.scan(data)
+        else:
+            hits = self.scan(data + data[:self.max_size - 1], limit=length)
+        return self._cuts(hits, length, linear)
+
+    def search_region(self, sequence, start, stop):
+        """
+        Cuts (linear sequence) falling in [start, stop] (1-based), scanning only the
+        neighbourhood that can produce them: sites within `reach` bp of the region.
+        """
+        length = len(sequence)
+        lo = max(0, start - 1 - self.reach - self.max_size)
+        hi = min(length, stop + self.reach + self.max_size)
+        hits = self.scan(self.clean(as_text(sequence[lo:hi])))
+        for fwd_starts, rev_starts in hits.values():
+            fwd_starts[:] = [s + lo for s in fwd_starts]
+            rev_starts[:] = [s + lo for s in rev_starts]
+        results = {}
+        for name, cuts in self._cuts(hits, length, True).items():
+            cuts = [c for c in cuts if start <= c <= stop]
+            if cuts:
+                results[name] = cuts
+        return results
+
+    def _cuts(self, hits, length, linear):
+        """Site starts -> cut positions, with Bio.Restriction's linear/circular rules."""
+        results = {}
+        for idx in sorted(hits):
+            name, palindromic, fwd, rev, ovhg, drop_linear = self.enzymes[idx]
+            fwd_starts, rev_starts = hits[idx]
+            cuts = [s + d for s in fwd_starts for d in fwd]
+            if not palindromic:
+                cuts += [s + d for s in rev_starts for d in rev]
+                cuts.sort()
+
+            if linear:
+                if drop_linear:
+                    cuts = [c for c in cuts if 1 < c <= length and 1 < c - ovhg <= length]
+            else:
+                cuts = [c + length if c < 1 else (c - length if c > length else c) for c in cuts]
+
+            if cuts:
+                results[name] = cuts
+        return results
+
+# Compiled (or loaded) once on first use, shared by every request
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """The shared RestrictionEngine over all Biopython enzymes."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = load_engine()
+    return _engine
+
+def load_engine(path=PRECOMPUTED_PATH):
+    """
+    Restores the automaton from the precomputed table (a few ms) when it was built
+    with the installed Biopython; otherwise compiles it from Bio.Restriction and
+    saves the table for the next start.
+    """
+    import Bio
+    try:
+        with open(path) as fh:
+            table = json.load(fh)
+        if table.get("format") == TABLE_FORMAT and table.get("biopython") == Bio.__version__:
+            return RestrictionEngine.from_table(table)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass # Missing, stale or corrupt: rebuild below
+    engine = RestrictionEngine()
+    save_engine(engine, path)
+    return engine
+
+def save_engine(engine, path=PRECOMPUTED_PATH):
+    """Writes the precomputed table atomically; returns False if the location is not writable."""
+    import Bio
+    table = {"format": TABLE_FORMAT, "biopython": Bio.__version__, **engine.to_table()}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as fh:
+            json.dump(table, fh, separators=(",", ":"))
+        os.replace(temporary, path) # Concurrent workers never see a partial file
+        return True
+    except OSError:
+        return False
+
+def enzyme_site(name):
+    """Recognition site of an enzyme by name; raises ValueError for unknown names."""
+    site = get_engine().sites.get(name)
+    if site is None:
+        raise ValueError(f"{name} is not a known restriction enzyme")
+    return site
 
 def find_restriction_sites(sequence):
     """
@@ -8,28 +274,74 @@ def find_restriction_sites(sequence):
     Identifies cuts and classifies enzymes by frequency (Single vs Multi).
     Calculates Virtual Gel migration.
     """
-    if not sequence:
+    if not len(sequence):
         return {"status": "FAIL", "count": 0, "sites": [], "message": "No sequence."}
 
-    seq_obj = Seq(sequence)
-    
-    # We use a standard analysis
-    # Note: For speed in a demo, we might usually filter this list, 
-    # but BioPython handles it reasonably well.
-    rb = Analysis(AllEnzymes, seq_obj)
-    full_result = rb.full()
-    
+    # One pass of the precompiled automaton finds the sites of all enzymes
+    return summarize_sites(get_engine().search(sequence), len(sequence))
+
+def patch_restriction_sites(previous, sequence, edit):
+    """
+    find_restriction_sites() of an edited sequence from the result before the edit.
+    Cuts that a site overlapping the edit could produce (edit +- reach) are dropped
+    and that zone is rescanned; cuts further away come from untouched sites and
+    are kept (shifted by the length change when downstream). Unchanged site
+    records are reused as they are. edit = (start, old_end, new_end), 0-based,
+    see modules/incremental.py.
+    """
+    if not len(sequence) or not previous.get("total_len"):
+        return find_restriction_sites(sequence)
+    engine = get_engine()
+    start, old_end, new_end = edit
+    shift = new_end - old_end
+    margin = engine.reach + engine.max_size + 1
+    zone_lo, old_hi, new_hi = start + 1 - margin, old_end + margin, new_end + margin # 1-based cut positions
+
+    sites = previous["sites"] # Sorted by position
+    first = bisect.bisect_left(sites, zone_lo, key=_POSITION)
+    last = bisect.bisect_right(sites, old_hi, key=_POSITION)
+    found = engine.search_region(sequence, max(1, zone_lo), new_hi)
+
+    # Cut counts only change for the enzymes cutting in the zone
+    old_counts, zone_counts = {}, {}
+    for site in sites[first:last]:
+        old_counts[site["enzyme"]] = site["frequency"]
+        zone_counts[site["enzyme"]] = zone_counts.get(site["enzyme"], 0) + 1
+    for name in found.keys() - old_counts.keys():
+        old_counts[name] = next((site["frequency"] for site in sites if site["enzyme"] == name), 0)
+    counts = {name: count - zone_counts.get(name, 0) + len(found.get(name, ())) for name, count in old_counts.items()}
+    changed = {name: count for name, count in counts.items() if count != old_counts[name]}
+
+    zone = sorted(({"enzyme": name, "position": cut, "frequency": counts[name]} for name, cuts in found.items() for cut in cuts),
+                  key=lambda x: (x["position"], engine.order[x["enzyme"]]))
+    before, after = sites[:first], sites[last:]
+    if changed:
+        before = [dict(site, frequency=changed[site["enzyme"]]) if site["enzyme"] in changed else site for site in before]
+    if shift:
+        after = [dict(site, position=site["position"] + shift, frequency=changed.get(site["enzyme"], site["frequency"])) for site in after]
+    elif changed:
+        after = [dict(site, frequency=changed[site["enzyme"]]) if site["enzyme"] in changed else site for site in after]
+
+    single_cutters, double_cutters = list(previous["single_cutters"]), list(previous["double_cutters"])
+    for name, count in changed.items():
+        for cutters, wanted in ((single_cutters, 1), (double_cutters, 2)):
+            if name in cutters and count != wanted:
+                cutters.remove(name)
+            elif count == wanted and name not in cutters:
+                cutters.append(name)
+    single_cutters.sort(key=engine.order.__getitem__)
+    double_cutters.sort(key=engine.order.__getitem__)
+    return _restriction_result(before + zone + after, single_cutters, double_cutters, len(sequence))
+
+def summarize_sites(full_result, total_len):
+    """Builds the module result from {enzyme name: [cuts]} (in engine order)."""
     sites_data = []
     single_cutters = [] # The "Golden" enzymes
     double_cutters = []
-    
-    for enzyme, cuts in full_result.items():
+
+    for enz_name, cuts in full_result.items():
         count = len(cuts)
-        if count == 0:
-            continue
-            
-        enz_name = str(enzyme)
-        
+
         # Add to main list
         for cut in cuts:
             sites_data.append({
@@ -37,7 +349,7 @@ def find_restriction_sites(sequence):
                 "position": cut,
                 "frequency": count
             })
-            
+
         # Classify
         if count == 1:
             single_cutters.append(enz_name)
@@ -45,35 +357,15 @@ def find_restriction_sites(sequence):
             double_cutters.append(enz_name)
 
     # Sort linear map by position
-    sites_data.sort(key=lambda x: x['position'])
+    sites_data.sort(key=_POSITION)
+    return _restriction_result(sites_data, single_cutters, double_cutters, total_len)
+
+def _restriction_result(sites_data, single_cutters, double_cutters, total_len):
 
     # --- VIRTUAL GEL SIMULATION MATH ---
-    # Calculates where the band appears on a 1% Agarose Gel.
-    # Logic: Smaller DNA moves faster (further down).
-    # We map logarithmic scale to 0-100% UI height.
-    total_len = len(sequence)
-    
-    try:
-        # Standard Ladder reference points: 10kb (top) to 0.5kb (bottom)
-        # Formula: Inverse Logarithmic interpolation
-        # High value (10000) -> Low Y (Top)
-        # Low value (500) -> High Y (Bottom)
-        
-        min_log = math.log(500)   # Bottom of gel
-        max_log = math.log(15000) # Top of gel
-        val_log = math.log(max(total_len, 1))
-        
-        # Normalize to 0-1
-        normalized = (val_log - min_log) / (max_log - min_log)
-        
-        # Invert (Big molecules stay at top/0%)
-        gel_y = (1 - normalized) * 100
-        
-        # Clamp between 5% and 95% to stay inside the div
-        gel_y = max(5, min(95, gel_y))
-        
-    except:
-        gel_y = 50.0
+    # Calculates where the uncut band appears on a 1% Agarose Gel
+    # (inverse logarithmic interpolation, see modules/digest.py)
+    gel_y = gel_position(total_len)
 
     return {
         "status": "CLONING READY" if len(single_cutters) > 0 else "LIMITED",
@@ -84,4 +376,4 @@ def find_restriction_sites(sequence):
         "double_cutters": double_cutters,
         "gel_pos": round(gel_y, 1),
         "total_len": total_len
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+# --- PERSISTENT RESULT STORE ---
+# Second cache tier behind ResultCache: results survive restarts and are shared by
+# every worker (threads, batch processes, gunicorn workers) through one SQLite file
+# in WAL mode. Rows are addressed by the result cache key (sequence hash + module +
+# parameters) and by the version of the code that produced them, so a changed
+# algorithm never serves an old result. Values are pickled and zlib-compressed; the
+# file is a trusted local store written only by this application.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    version TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('bytes', 0);
+"""
+TOUCH_INTERVAL = 60 # Seconds between LRU timestamp updates of a row (saves a write per hit)
+EVICT_TARGET = 0.9 # Eviction frees space down to this fraction of max_bytes
+
+def source_version(paths, *extra):
+    """Fingerprint of source files (and extra strings such as library versions): changes with the code."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            digest.update(fh.read())
+    for item in extra:
+        digest.update(str(item).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class ResultStore:
+    """
+    Size-bounded, least-recently-used persistent store of analysis results.
+    Each thread (and each process after a fork) uses its own connection.
+    """
+
+    def __init__(self, path, max_bytes=1024 * 1024 * 1024, level=6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.level = level
+        self._local = threading.local()
+        self._lock = threading.Lock() # Counters only
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as db:
+            db.executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL") # Durable enough for a cache
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key, version):
+        """Returns (found, value). A row written by another version of the module is a miss."""
+        db = self._connection()
+        row = db.execute("SELECT data, accessed FROM results WHERE key = ? AND version = ?", (key, version)).fetchone()
+        if row is None:
+            self._count("misses")
+            return False, None
+        now = time.time()
+        if now - row[1] > TOUCH_INTERVAL:
+            db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return True, pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key, module, version, value):
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.level)
+        if len(data) > self.max_bytes:
+            return # Would evict everything else; don't store it
+        db = self._connection()
+        with db: # One transaction: the row and the byte total stay consistent across processes
+            db.execute("BEGIN IMMEDIATE")
+            old = db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                       (key, module, version, len(data), time.time(), data))
+            total = self._add_bytes(db, len(data) - (old[0] if old else 0))
+            if total > self.max_bytes:
+                self._evict(db, total - int(self.max_bytes * EVICT_TARGET))
+        self._count("writes")
+
+    def _add_bytes(self, db, delta):
+        db.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, db, excess):
+        # Caller holds the write transaction; least recently used rows go first
+        freed, keys = 0, []
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        db.executemany("DELETE FROM results WHERE key = ?", keys)
+        self._add_bytes(db, -freed)
+        self._count("evictions", len(keys))
+
+    def purge(self, versions):
+        """Deletes the rows of every module whose version is not the current one ({module: version})."""
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            freed, removed = 0, 0
+            for module, version in versions.items():
+                size, count = db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM results WHERE module = ? AND version != ?",
+                                         (module, version)).fetchone()
+                db.execute("DELETE FROM results WHERE module = ? AND version != ?", (module, version))
+                freed, removed = freed + size, removed + count
+            self._add_bytes(db, -freed)
+        return removed
+
+    def clear(self):
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM results")
+            db.execute("UPDATE meta SET value = 0 WHERE name = 'bytes'")
+
+    def stats(self):
+        db = self._connection()
+        entries = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        total = db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,397 @@
+import mmap
+import os
+import string
+
+import numpy as np
+
+from modules.codon_tables import STANDARD_CODE
+from modules.packed import AMBIGUOUS, BASE_CODES
+from modules.payload import extreme_indices
+from modules.prediction import CHI_SITE, CHI_SITE_REVERSE
+from modules.restriction import get_engine
+from modules.synthesis import _COUNTED_TABLE, _GC_TABLE
+
+# --- STREAMING FASTA SCANNER ---
+# Genome-scale FASTA files are memory-mapped and read `chunk_size` bytes at a
+# time; headers and line breaks are skipped and each chunk is upper-cased on the
+# fly, so the sequence is never held as one string. Every check keeps a small
+# state between chunks (the last bases as overlap, the open homopolymer run,
+# cuts waiting for the record end) and reports exact counts; the listed hits
+# are capped at `max_details` per check, so peak memory does not grow with the genome.
+
+CHUNK_SIZE = 1 << 20 # Bytes of file per chunk
+MAX_DETAILS = 1000   # Hits listed per check (counts are always exact)
+# Enzymes scanned when none are requested: the usual cloning panel
+DEFAULT_ENZYMES = ("EcoRI", "BamHI", "HindIII", "XhoI", "NdeI", "NcoI", "XbaI", "SpeI",
+                   "PstI", "SalI", "KpnI", "SacI", "NotI", "BsaI", "BsmBI")
+
+_UPPER = bytes.maketrans(string.ascii_lowercase.encode(), string.ascii_uppercase.encode())
+_WHITESPACE = string.whitespace.encode()
+# A, C, G, T as one bit each; IUPAC site letters as the union of their bases
+_BASE_BITS = np.zeros(256, dtype=np.uint8)
+_BASE_BITS[list(b"ACGT")] = [1, 2, 4, 8]
+_IUPAC_BITS = {"A": 1, "C": 2, "G": 4, "T": 8, "R": 5, "Y": 10, "S": 6, "W": 9,
+               "K": 12, "M": 3, "B": 14, "D": 13, "H": 11, "V": 7, "N": 15}
+_COMPLEMENT = str.maketrans("ACGTRYKMBDHVN", "TGCAYRMKVHDBN")
+_STOP_TABLE = np.array([aa == "*" for aa in STANDARD_CODE] + [False])
+
+def open_fasta(path):
+    """Read-only memory map of a file (None for an empty one)."""
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return None
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, "madvise"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+def fasta_records(mm):
+    """
+    (header, start, end) byte ranges of every record's sequence lines. A file
+    without any '>' line is read as one unnamed sequence.
+    """
+    size = len(mm)
+    pos = 0 if mm[:1] == b">" else mm.find(b"\n>") + 1
+    if pos == 0 and mm[:1] != b">":
+        yield "", 0, size
+        return
+    while pos < size:
+        eol = mm.find(b"\n", pos)
+        eol = size if eol == -1 else eol
+        header = mm[pos + 1:eol].decode("utf-8", "replace").strip()
+        following = mm.find(b"\n>", eol)
+        end = size if following == -1 else following + 1
+        yield header, min(eol + 1, size), end
+        pos = end
+
+def sequence_chunks(mm, start, end, chunk_size=CHUNK_SIZE):
+    """Upper-cased sequence bytes of [start, end), whitespace removed, one chunk at a time."""
+    for pos in range(start, end, chunk_size):
+        data = mm[pos:min(end, pos + chunk_size)].translate(_UPPER, _WHITESPACE)
+        if data:
+            yield data
+
+def sequence_length(mm, start, end, chunk_size=CHUNK_SIZE):
+    """Bases in [start, end) (whitespace excluded): a quick pass before the scan sizes the GC plot."""
+    return sum(len(mm[pos:min(end, pos + chunk_size)].translate(None, _WHITESPACE))
+               for pos in range(start, end, chunk_size))
+
+def _site_matcher(site):
+    """(offsets, allowed bits) of a site's non-N positions, the most selective one first."""
+    checks = [(j, _IUPAC_BITS[base]) for j, base in enumerate(site) if base != "N"]
+    checks.sort(key=lambda check: bin(check[1]).count("1"))
+    return len(site), checks
+
+def _match(bits, matcher, first):
+    """0-based starts >= `first` where the site fits in `bits` and matches (N matches anything)."""
+    size, checks = matcher
+    count = len(bits) - size + 1 - first
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if not checks:
+        return np.arange(first, first + count)
+    (j, allowed), rest = checks[0], checks[1:]
+    starts = np.flatnonzero(bits[first + j:first + j + count] & allowed) + first
+    for j, allowed in rest:
+        starts = starts[(bits[starts + j] & allowed) != 0]
+    return starts
+
+class RecordScan:
+    """
+    State of one record while its chunks stream through: feed() each cleaned
+    chunk in order, then finish() for the result. Restriction cuts follow
+    RestrictionEngine.search() (Bio.Restriction rules) for the chosen enzymes.
+    """
+
+    def __init__(self, header="", length=0, gc_window=50, homopolymer_threshold=6,
+                 enzymes=DEFAULT_ENZYMES, circular=False, max_details=MAX_DETAILS, resolution=200):
+        name, _, description = header.partition(" ")
+        self.id, self.description = name, description
+        self.gc_window, self.threshold, self.circular = gc_window, homopolymer_threshold, circular
+        self.max_details = max_details
+        self.step = max(1, length // resolution) # GC plot sampling (as gc_profile() for `length` bases)
+        self.length = 0
+        self.ambiguous = 0
+        self.carry = b""
+
+        # GC windows: plotted as the lowest and highest window of every `step`; the last
+        # window computed is held back, since the plot stops one window short of the end
+        self.gc_total = self.counted_total = 0
+        self.labels, self.values = [], []
+        self.samples = [] # Every step-th window, for the histogram
+        self.bucket = None # Open plot bucket: [index, min value, min start, max value, max start]
+        self.held = None # (value, window start)
+        self.gc_min = self.gc_max = None # (value, window start)
+        # Homopolymers: the run still open at the end of the last chunk
+        self.runs, self.run_count = [], 0
+        self.run_base, self.run_start = None, 0
+        # Chi sites (both strands) and frame-1 stop codons
+        self.chi_matchers = [("+", _site_matcher(CHI_SITE)), ("-", _site_matcher(CHI_SITE_REVERSE))]
+        self.chi, self.chi_count = [], 0
+        self.stops, self.stop_count, self.last_stop = [], 0, None
+        # Restriction: per enzyme one matcher per strand; cuts past the bases read so far wait in `pending`
+        engine = get_engine()
+        self.rules, self.patterns = {}, []
+        for name in dict.fromkeys(enzymes):
+            idx = engine.order[name]
+            self.rules[idx] = engine.enzymes[idx]
+            site = engine.sites[name]
+            self.patterns.append((idx, False, _site_matcher(site)))
+            if not engine.enzymes[idx][1]: # Non-palindromic: the other strand too
+                self.patterns.append((idx, True, _site_matcher(site.translate(_COMPLEMENT)[::-1])))
+        self.max_size = max([len(CHI_SITE), 3, gc_window] + [matcher[0] for _, _, matcher in self.patterns])
+        self.cut_counts = {idx: 0 for idx in self.rules}
+        self.cuts = {idx: [] for idx in self.rules}
+        self.pending = [] # (enzyme index, cut) past the bases read so far (or before the origin)
+        self.head = b""   # First bases, for sites across the origin of a circular record
+
+    def feed(self, data):
+        offset = self.length # Absolute 0-based position of data[0]
+        if self.circular and len(self.head) < self.max_size - 1:
+            self.head += data[:self.max_size - 1 - len(self.head)]
+        self._homopolymers(data, offset)
+        self.length += len(data)
+        buffer = self.carry + data
+        start = offset - len(self.carry) # Absolute position of buffer[0]
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        self.ambiguous += int(np.count_nonzero(BASE_CODES[raw[len(self.carry):]] == AMBIGUOUS))
+        self._gc(raw, start, len(self.carry))
+        bits = _BASE_BITS[raw]
+        found = [(pos, strand) for strand, matcher in self.chi_matchers
+                 for pos in (_match(bits, matcher, max(0, len(self.carry) - len(CHI_SITE) + 1)) + start).tolist()]
+        for pos, strand in sorted(found):
+            self.chi_count += 1
+            if len(self.chi) < self.max_details:
+                self.chi.append({"start": pos + 1, "end": pos + len(CHI_SITE), "strand": strand})
+        self._stops(raw, start, len(self.carry))
+        self._sites(bits, start, len(self.carry), self.length)
+        self._settle()
+        self.carry = buffer[-(self.max_size - 1):] if self.max_size > 1 else b""
+
+    def _gc(self, raw, start, carried):
+        window = self.gc_window
+        gc_cum = np.concatenate(([0], np.cumsum(_GC_TABLE[raw], dtype=np.int64)))
+        counted_cum = np.concatenate(([0], np.cumsum(_COUNTED_TABLE[raw], dtype=np.int64)))
+        self.gc_total += int(gc_cum[-1] - gc_cum[carried])
+        self.counted_total += int(counted_cum[-1] - counted_cum[carried])
+        first = max(0, carried - window + 1)
+        if len(raw) - window < first:
+            return
+        gc_counts = gc_cum[first + window:] - gc_cum[first:-window]
+        counted = counted_cum[first + window:] - counted_cum[first:-window]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            windows = np.where(counted > 0, gc_counts / counted, 0.0) * 100
+        lo, hi = int(np.argmin(windows)), int(np.argmax(windows))
+        if self.gc_min is None or windows[lo] < self.gc_min[0]: # Earliest extreme wins, like np.argmin
+            self.gc_min = (float(windows[lo]), start + first + lo)
+        if self.gc_max is None or windows[hi] > self.gc_max[0]:
+            self.gc_max = (float(windows[hi]), start + first + hi)
+        origin = start + first
+        if self.held is not None:
+            windows, origin = np.concatenate(([self.held[0]], windows)), self.held[1]
+        self.held = (float(windows[-1]), origin + len(windows) - 1)
+        windows = windows[:-1]
+        if not len(windows):
+            return
+        step = self.step
+        self.samples.extend(windows[-origin % step::step].tolist()) # Window starts that are multiples of step
+        lead = min(len(windows), -origin % step) # Windows that finish the open bucket
+        for pos, value in enumerate(windows[:lead].tolist(), origin):
+            self._extend_bucket(pos, value)
+        body = windows[lead:]
+        full = len(body) // step * step
+        if full:
+            self._close_bucket()
+            for index in extreme_indices([body[:full]], step).tolist():
+                self.labels.append(origin + lead + index + 1)
+                self.values.append(round(float(body[index]), 2))
+        for pos, value in enumerate(body[full:].tolist(), origin + lead + full):
+            self._extend_bucket(pos, value)
+
+    def _extend_bucket(self, pos, value):
+        index = pos // self.step
+        if self.bucket is not None and self.bucket[0] != index:
+            self._close_bucket()
+        if self.bucket is None:
+            self.bucket = [index, value, pos, value, pos]
+        else: # Strict comparisons: ties keep the earliest window, like np.argmin
+            if value < self.bucket[1]:
+                self.bucket[1:3] = value, pos
+            if value > self.bucket[3]:
+                self.bucket[3:5] = value, pos
+
+    def _close_bucket(self):
+        if self.bucket is None:
+            return
+        _, low, low_pos, high, high_pos = self.bucket
+        for pos, value in sorted({low_pos: low, high_pos: high}.items()):
+            self.labels.append(pos + 1)
+            self.values.append(round(value, 2))
+        self.bucket = None
+
+    def _homopolymers(self, data, offset):
+        raw = np.frombuffer(data, dtype=np.uint8)
+        change = np.flatnonzero(raw[1:] != raw[:-1]) + 1
+        firsts = np.concatenate(([0], change))
+        bases = raw[firsts]
+        starts = firsts + offset
+        ends = np.concatenate((change, [len(raw)])) + offset
+        if raw[0] == self.run_base:
+            starts[0] = self.run_start # The open run continues
+        elif self.run_base is not None:
+            self._close_run(self.run_start, offset, self.run_base)
+        long_runs = np.flatnonzero(ends[:-1] - starts[:-1] >= self.threshold)
+        for idx in long_runs.tolist():
+            self._close_run(int(starts[idx]), int(ends[idx]), int(bases[idx]))
+        self.run_base, self.run_start = int(bases[-1]), int(starts[-1])
+
+    def _close_run(self, start, end, base):
+        if end - start < self.threshold:
+            return
+        self.run_count += 1
+        if len(self.runs) < self.max_details:
+            self.runs.append({"start": start + 1, "end": end, "length": end - start, "base": chr(base)})
+
+    def _stops(self, raw, start, carried):
+        first = max(0, carried - 2)
+        first += -(start + first) % 3 # Frame 1
+        count = (len(raw) - first) // 3
+        if count <= 0:
+            return
+        codes = BASE_CODES[raw[first:first + 3 * count]].reshape(count, 3).astype(np.int64)
+        codons = (codes[:, 0] << 4) | (codes[:, 1] << 2) | codes[:, 2]
+        codons[(codes > 3).any(axis=1)] = 64
+        for pos in (np.flatnonzero(_STOP_TABLE[codons]) * 3 + start + first).tolist():
+            self.stop_count += 1
+            self.last_stop = pos
+            if len(self.stops) < self.max_details:
+                self.stops.append({"start": pos + 1, "end": pos + 3})
+
+    def _sites(self, bits, start, carried, known, last=None):
+        """Cuts of the sites starting at or after the overlap (and, for the origin pass, before `last`)."""
+        hits = {}
+        for idx, is_reverse, matcher in self.patterns:
+            found = _match(bits, matcher, max(0, carried - matcher[0] + 1))
+            if last is not None:
+                found = found[found < last]
+            hits.setdefault(idx, ([], []))[is_reverse].extend((found + start + 1).tolist())
+        for idx, (fwd_starts, rev_starts) in hits.items():
+            name, palindromic, fwd, rev, ovhg, drop_linear = self.rules[idx]
+            if fwd_starts and rev_starts:
+                shadowed = set(fwd_starts) # A forward hit shadows a reverse hit at the same start
+                rev_starts = [s for s in rev_starts if s not in shadowed]
+            cuts = [s + d for s in fwd_starts for d in fwd]
+            if not palindromic:
+                cuts += [s + d for s in rev_starts for d in rev]
+            for cut in cuts:
+                if self.circular:
+                    if 1 <= cut <= known:
+                        self._add_cut(idx, cut)
+                    else:
+                        self.pending.append((idx, cut)) # Wraps around the origin
+                elif not drop_linear:
+                    self._add_cut(idx, cut)
+                elif 1 < cut and 1 < cut - (ovhg or 0):
+                    if cut <= known and cut - (ovhg or 0) <= known:
+                        self._add_cut(idx, cut)
+                    else:
+                        self.pending.append((idx, cut)) # Kept only if inside the final length
+
+    def _settle(self):
+        """Adds the waiting cuts the scan has now read past; cuts before the origin wait for finish()."""
+        known, waiting = self.length, []
+        for idx, cut in self.pending:
+            if 1 <= cut <= known and (self.circular or cut - (self.rules[idx][4] or 0) <= known):
+                self._add_cut(idx, cut)
+            else:
+                waiting.append((idx, cut))
+        self.pending = waiting
+
+    def _add_cut(self, idx, cut):
+        self.cut_counts[idx] += 1
+        if len(self.cuts[idx]) < self.max_details:
+            self.cuts[idx].append(cut)
+
+    def finish(self):
+        length = self.length
+        if self.run_base is not None:
+            self._close_run(self.run_start, length, self.run_base)
+        if self.last_stop is not None and self.last_stop // 3 == length // 3 - 1:
+            # The final codon is the expected stop
+            self.stop_count -= 1
+            if self.stops and self.stops[-1]["start"] == self.last_stop + 1:
+                self.stops.pop()
+        if self.circular and length:
+            # Sites starting in the last bases and running across the origin
+            tail = self.carry + self.head
+            self._sites(_BASE_BITS[np.frombuffer(tail, dtype=np.uint8)], length - len(self.carry),
+                        len(self.carry), length, last=len(self.carry))
+        for idx, cut in self.pending:
+            if self.circular:
+                self._add_cut(idx, cut + length if cut < 1 else (cut - length if cut > length else cut))
+            elif cut <= length and cut - (self.rules[idx][4] or 0) <= length:
+                self._add_cut(idx, cut)
+        self.pending = []
+        return {
+            "id": self.id,
+            "description": self.description,
+            "length": length,
+            "ambiguous": self.ambiguous,
+            "gc": self._gc_result(),
+            "homopolymers": self._listed(self.run_count, self.runs),
+            "chi": self._listed(self.chi_count, self.chi),
+            "stops": self._listed(self.stop_count, self.stops),
+            "restriction": self._restriction_result()
+        }
+
+    def _listed(self, count, details):
+        return {"status": "FAIL" if count else "PASS", "count": count, "details": details,
+                "truncated": count > len(details)}
+
+    def _gc_result(self):
+        length, window = self.length, self.gc_window
+        global_gc = round(self.gc_total / self.counted_total * 100, 2) if self.counted_total else 0.0
+        if length < window:
+            return {"plot": {"labels": [1], "values": [global_gc], "step": self.step}, "hist": [0] * 10, "gc": global_gc,
+                    "min": None, "max": None, "window": window}
+        self._close_bucket()
+        samples = np.array(self.samples, dtype=np.float64)
+        bins = np.bincount(np.minimum(np.floor(samples).astype(np.int64) // 10, 9), minlength=10)
+
+        def extreme(found):
+            value, start = found
+            return {"start": start + 1, "end": start + window, "value": round(value, 2)}
+        return {"plot": {"labels": self.labels, "values": self.values, "step": self.step}, "hist": bins.tolist(), "gc": global_gc,
+                "min": extreme(self.gc_min), "max": extreme(self.gc_max), "window": window}
+
+    def _restriction_result(self):
+        cutters = {}
+        for idx in sorted(self.rules):
+            if self.cut_counts[idx]:
+                cutters[self.rules[idx][0]] = {"count": self.cut_counts[idx], "cuts": sorted(self.cuts[idx]),
+                                               "truncated": self.cut_counts[idx] > len(self.cuts[idx])}
+        return {
+            "enzymes": [self.rules[idx][0] for idx in sorted(self.rules)],
+            "topology": "circular" if self.circular else "linear",
+            "cutters": cutters,
+            "single_cutters": [name for name, hit in cutters.items() if hit["count"] == 1],
+            "double_cutters": [name for name, hit in cutters.items() if hit["count"] == 2]
+        }
+
+def scan_fasta(path, chunk_size=CHUNK_SIZE, **options):
+    """
+    Streams every record of a FASTA file through RecordScan (options: gc_window,
+    homopolymer_threshold, enzymes, circular, max_details, resolution) and yields
+    one result per record.
+    """
+    mm = open_fasta(path)
+    if mm is None:
+        return
+    try:
+        for header, start, end in fasta_records(mm):
+            scan = RecordScan(header, sequence_length(mm, start, end, chunk_size), **options)
+            for data in sequence_chunks(mm, start, end, chunk_size):
+                scan.feed(data)
+            yield scan.finish()
+    finally:
+        mm.close()
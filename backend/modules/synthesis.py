@@ -1,5 +1,16 @@
-from Bio.SeqUtils import gc_fraction
 import collections
+import numpy as np
+
+from modules.complexity import (COMPLEXITY_WINDOW, MAX_DUST, MIN_ENTROPY, STR_MIN_LENGTH, STR_MIN_UNITS,
+                                 homopolymer_runs, merge_intervals, tandem_repeats, window_complexity)
+from modules.packed import as_packed, as_text
+from modules.payload import extreme_indices
+
+def gc_fraction(sequence):
+    """Bio.SeqUtils.gc_fraction (ambiguous="remove") computed on the packed bases."""
+    seq = as_packed(sequence)
+    counted = int(np.count_nonzero(seq.map_bytes(_COUNTED_TABLE)))
+    return int(np.count_nonzero(seq.map_bytes(_GC_TABLE))) / counted if counted else 0
 
 def check_gc_content(sequence):
     """Check 1.2: GC Content Analysis"""
@@ -20,34 +31,92 @@ def check_gc_content(sequence):
     return {"value": round(gc_percent, 2), "status": status, "risk": risk, "message": message}
 
 def check_homopolymers(sequence, threshold=6):
-    """Check 1.3: Find runs of 6+ identical nucleotides."""
-    homopolymers = []
-    current_char = ""
-    current_count = 0
-    start_pos = 0
-
-    for i, char in enumerate(sequence):
-        if char == current_char:
-            current_count += 1
-        else:
-            if current_count >= threshold:
-                homopolymers.append({
-                    "start": start_pos + 1, "end": i, "length": current_count, "base": current_char
-                })
-            current_char = char
-            current_count = 1
-            start_pos = i
-            
-    if current_count >= threshold:
-        homopolymers.append({
-            "start": start_pos + 1, "end": len(sequence), "length": current_count, "base": current_char
-        })
+    """Check 1.3: Find runs of 6+ identical nucleotides (run-length encoding of the characters)."""
+    starts, ends, letters = homopolymer_runs(as_packed(sequence).ascii(), threshold)
+    homopolymers = [{"start": start + 1, "end": end, "length": end - start, "base": chr(letter)}
+                    for start, end, letter in zip(starts.tolist(), ends.tolist(), letters.tolist())]
+    return _homopolymer_result(homopolymers)
+
+def patch_homopolymers(previous, sequence, edit, threshold=6):
+    """
+    check_homopolymers() of an edited sequence from the result before the edit.
+    Only the runs touching the edit are rescanned; the others are kept (shifted
+    when downstream). edit = (start, old_end, new_end), 0-based, see modules/incremental.py.
+    """
+    start, old_end, new_end = edit
+    text = as_text(sequence)
+    if not text:
+        return check_homopolymers(text, threshold)
+    # Widen to whole runs: from the run holding the base before the edit to the one after it
+    lo = max(0, start - 1)
+    while lo > 0 and text[lo - 1] == text[lo]:
+        lo -= 1
+    hi = min(len(text), new_end + 1)
+    while hi < len(text) and text[hi] == text[hi - 1]:
+        hi += 1
+    shift = new_end - old_end
 
+    before = [run for run in previous["details"] if run["end"] <= lo]
+    rescanned = [dict(run, start=run["start"] + lo, end=run["end"] + lo)
+                 for run in check_homopolymers(text[lo:hi], threshold)["details"]]
+    after = [dict(run, start=run["start"] + shift, end=run["end"] + shift)
+             for run in previous["details"] if run["start"] > hi - shift]
+    return _homopolymer_result(before + rescanned + after)
+
+def _homopolymer_result(homopolymers):
     status = "FAIL" if homopolymers else "PASS"
     risk = "HIGH" if homopolymers else "LOW"
     
     return {"status": status, "risk": risk, "count": len(homopolymers), "details": homopolymers, "message": "Detected" if homopolymers else "None"}
 
+def check_tandem_repeats(sequence, min_length=STR_MIN_LENGTH, min_units=STR_MIN_UNITS):
+    """
+    Check 1.5: Short tandem repeats (microsatellites, units of 2-6 bases), merged
+    into intervals; each interval names the unit of its longest repeat.
+    """
+    seq = as_packed(sequence)
+    found = tandem_repeats(seq.codes(), min_length=min_length, min_units=min_units)
+    starts, ends, group = merge_intervals([f[0] for f in found], [f[1] for f in found])
+    longest = {} # interval -> its longest repeat (groups are contiguous, found is sorted by start)
+    for (start, end, period), i in zip(found, group.tolist()):
+        if i not in longest or end - start > longest[i][1] - longest[i][0]:
+            longest[i] = (start, end, period)
+    details = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        first, last, period = longest[i]
+        details.append({"start": start + 1, "end": end, "length": end - start, "period": period,
+                        "unit": seq.text(first, first + period), "copies": round((last - first) / period, 1)})
+    return _complexity_result(details, len(seq), min_length=min_length, min_units=min_units)
+
+def check_low_complexity(sequence, window=COMPLEXITY_WINDOW, min_entropy=MIN_ENTROPY, max_dust=MAX_DUST):
+    """
+    Check 1.6: Low-complexity regions: windows whose base composition entropy is
+    below `min_entropy` bits or whose DUST triplet score exceeds `max_dust`,
+    merged into intervals with their lowest entropy and highest DUST score.
+    """
+    seq = as_packed(sequence)
+    starts, entropy, dust, counted = window_complexity(seq.codes(), window)
+    flagged = np.flatnonzero((counted >= window // 2) & ((entropy < min_entropy) | (dust > max_dust)))
+    merged_starts, merged_ends, group = merge_intervals(starts[flagged], np.minimum(starts[flagged] + window, len(seq)))
+    details = []
+    if len(flagged):
+        firsts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+        lowest = np.minimum.reduceat(entropy[flagged], firsts)
+        highest = np.maximum.reduceat(dust[flagged], firsts)
+        for start, end, low, high in zip(merged_starts.tolist(), merged_ends.tolist(), lowest.tolist(), highest.tolist()):
+            details.append({"start": start + 1, "end": end, "length": end - start,
+                            "entropy": round(low, 2), "dust": round(high, 1)})
+    return _complexity_result(details, len(seq), window=window, min_entropy=min_entropy, max_dust=max_dust)
+
+def _complexity_result(details, length, **settings):
+    covered = sum(item["length"] for item in details)
+    return {
+        "status": "WARNING" if details else "PASS", "risk": "MODERATE" if details else "LOW",
+        "count": len(details), "details": details,
+        "coverage": round(covered / length * 100, 1) if length else 0.0, **settings,
+        "message": "Detected" if details else "None"
+    }
+
 def check_length(sequence):
     """
     Check 1.1: Length Validation
@@ -69,60 +138,196 @@ def check_length(sequence):
     
     return {"value": length, "status": status, "risk": risk, "message": message}
 
-def check_repeats(sequence):
-    """Check 1.4: Repetitive Region Scanner"""
-    length = len(sequence)
+def _diagonal_runs(positions, partners, step):
+    """
+    Groups consecutive positions whose partner moves in lock-step
+    (+1 for direct repeats, -1 for inverted ones) into (first, last, partner of first) runs.
+    """
+    if len(positions) == 0:
+        return []
+    diagonal = partners - step * positions
+    breaks = np.flatnonzero((np.diff(positions) != 1) | (np.diff(diagonal) != 0)) + 1
+    firsts = np.concatenate(([0], breaks))
+    lasts = np.concatenate((breaks - 1, [len(positions) - 1]))
+    return list(zip(positions[firsts].tolist(), positions[lasts].tolist(), partners[firsts].tolist()))
+
+def _repeat_label(seq, start, length):
+    chunk = seq.text(start, start + length)
+    return chunk if length <= 60 else chunk[:57] + "..."
+
+def find_repeats(sequence, min_length=20, inverted=True):
+    """
+    Maximal repeat engine.
+    Every k-mer is encoded as an exact 2-bit integer, each occurrence is linked to
+    the next occurrence of the same k-mer (or of its reverse complement) and runs
+    along a diagonal are merged into one maximal repeat with its copy count.
+    """
+    seq = as_packed(sequence)
+    k = min(min_length, 32)
+    if k < 1 or len(seq) < min_length:
+        return []
+    forward, reverse, valid = seq.kmer_codes(k, inverted)
+    positions = np.flatnonzero(valid).astype(np.int32 if len(seq) < 2**31 else np.int64)
+    codes = forward[positions]
+    del forward, valid
+
+    # Sorting once by (code, position) serves both the direct and inverted lookups
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_positions = positions[order]
+    del order, codes
     repeats = []
-    window_size = 20
-    seen_chunks = {}
-
-    for i in range(length - window_size + 1):
-        chunk = sequence[i : i + window_size]
-        if chunk in seen_chunks:
-            repeats.append({
-                "start": seen_chunks[chunk] + 1,
-                "end": seen_chunks[chunk] + window_size,
-                "sequence": chunk
-            })
-            repeats.append({
-                "start": i + 1,
-                "end": i + window_size,
-                "sequence": chunk
-            })
-        else:
-            seen_chunks[chunk] = i
+
+    # --- DIRECT REPEATS: link each k-mer to its next occurrence ---
+    same = np.flatnonzero(sorted_codes[1:] == sorted_codes[:-1])
+    firsts = sorted_positions[same]
+    by_position = np.argsort(firsts)
+    runs = _diagonal_runs(firsts[by_position], sorted_positions[same + 1][by_position], 1)
+    del same, firsts, by_position
+
+    families = {} # (copy start, length) -> positions of every copy
+    for first, last, partner in runs:
+        length = last - first + k
+        if length < min_length:
+            continue
+        copies = families.get((first, length))
+        if copies is None:
+            copies = [first]
+            repeats.append({"type": "direct", "length": length, "positions": copies})
+        copies.append(partner)
+        families[(partner, length)] = copies
+
+    # --- INVERTED REPEATS: link each k-mer to the next reverse-complement occurrence ---
+    if inverted and len(sorted_codes):
+        span = len(seq) + 1
+        # Key = (index of the code's group, position): ascending, so one searchsorted finds
+        # the first occurrence of a code after a given position
+        group = np.searchsorted(sorted_codes, sorted_codes, side="left")
+        keys = group.astype(np.int64) * span + sorted_positions
+        del group
+
+        rc_codes = reverse[positions]
+        del reverse
+        rc_group = np.searchsorted(sorted_codes, rc_codes, side="left")
+        hit = np.searchsorted(keys, rc_group.astype(np.int64) * span + positions + 1)
+        hit = np.minimum(hit, len(keys) - 1)
+        linked = (sorted_codes[hit] == rc_codes) & (keys[hit] // span == rc_group)
+        del keys, rc_codes, rc_group
+
+        for first, last, mate in _diagonal_runs(positions[linked], sorted_positions[hit[linked]], -1):
+            arm_start, arm_end = first, last + k - 1
+            mate_end = mate + k - 1
+            # Arms that run into each other form one palindrome: split it in the middle
+            length = min(arm_end - arm_start + 1, (mate_end - arm_start + 1) // 2)
+            if length < min_length:
+                continue
+            repeats.append({"type": "inverted", "length": length, "positions": [arm_start, mate_end - length + 1]})
+
+    details = []
+    for rep in repeats:
+        starts = rep["positions"]
+        details.append({
+            "type": rep["type"],
+            "start": starts[0] + 1,
+            "end": starts[-1] + rep["length"],
+            "length": rep["length"],
+            "copies": len(starts),
+            "positions": [pos + 1 for pos in starts],
+            "sequence": _repeat_label(seq, starts[0], rep["length"])
+        })
+    details.sort(key=lambda x: (x['start'], x['type']))
+    return details
+
+def check_repeats(sequence, min_length=20, inverted=True):
+    """Check 1.4: Repetitive Region Scanner (maximal direct + inverted repeats)"""
+    repeats = find_repeats(sequence, min_length, inverted)
+
+    # Share of the sequence covered by repeat copies
+    covered = np.zeros(len(sequence) + 1, dtype=np.int32)
+    for rep in repeats:
+        for pos in rep["positions"]:
+            covered[pos - 1] += 1
+            covered[pos - 1 + rep["length"]] -= 1
+    coverage = round(float(np.count_nonzero(np.cumsum(covered[:-1]))) / len(sequence) * 100, 1) if len(sequence) else 0.0
 
     status = "WARNING" if repeats else "PASS"
     risk = "MODERATE" if repeats else "LOW"
 
-    return {"status": status, "risk": risk, "count": len(repeats), "details": repeats, "message": "Detected" if repeats else "None"}
+    return {
+        "status": status, "risk": risk, "count": len(repeats), "details": repeats,
+        "direct": sum(1 for rep in repeats if rep["type"] == "direct"),
+        "inverted": sum(1 for rep in repeats if rep["type"] == "inverted"),
+        "coverage": coverage, "min_length": min_length,
+        "message": "Detected" if repeats else "None"
+    }
+
+# Byte lookup tables matching gc_fraction(ambiguous="remove"):
+# G/C/S count as GC, and only ACGTSWU count towards the length.
+_GC_TABLE = np.zeros(256, dtype=np.int8)
+_GC_TABLE[list(b"GCSgcs")] = 1
+_COUNTED_TABLE = np.zeros(256, dtype=np.int8)
+_COUNTED_TABLE[list(b"ACGTSWUacgtswu")] = 1
+
+def gc_profile(sequence, window_size=50, step=None, resolution=200):
+    """
+    Single-pass GC landscape backed by prefix sums.
+    Returns the line-plot points, the histogram bins, the global GC value and the
+    min/max windows. The plot keeps the lowest and highest window of every `step`
+    windows (at most 2 * `resolution` points, peaks included); the histogram
+    samples every `step`-th window. `step=1` gives full per-base resolution.
+    """
+    seq = as_packed(sequence)
+    length = len(seq)
+    if step is None:
+        step = max(1, length // resolution)
+
+    gc_cum = np.zeros(length + 1, dtype=np.int64)
+    np.cumsum(seq.map_bytes(_GC_TABLE), out=gc_cum[1:])
+    counted_cum = np.zeros(length + 1, dtype=np.int64)
+    np.cumsum(seq.map_bytes(_COUNTED_TABLE), out=counted_cum[1:])
+
+    total_counted = int(counted_cum[-1])
+    global_gc = round(int(gc_cum[-1]) / total_counted * 100, 2) if total_counted else 0.0
+
+    if length < window_size:
+        return {
+            "plot": {"labels": [1], "values": [global_gc], "step": step},
+            "hist": [0] * 10,
+            "gc": global_gc,
+            "min": None,
+            "max": None
+        }
+
+    # GC % of every window (per-base resolution), O(n) from the prefix sums
+    gc_counts = gc_cum[window_size:] - gc_cum[:-window_size]
+    counted = counted_cum[window_size:] - counted_cum[:-window_size]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gc_windows = np.where(counted > 0, gc_counts / counted, 0.0) * 100
+
+    # The original sampling stops one window short of the end
+    plotted = gc_windows[:length - window_size]
+    sampled = plotted[::step]
+    points = extreme_indices([plotted], step)
+
+    bins = np.bincount(np.minimum(np.floor(sampled).astype(np.int64) // 10, 9), minlength=10)
+
+    # Extreme windows are taken over every position, not just the sampled ones
+    lo, hi = int(np.argmin(gc_windows)), int(np.argmax(gc_windows))
+    min_window = {"start": lo + 1, "end": lo + window_size, "value": round(float(gc_windows[lo]), 2)}
+    max_window = {"start": hi + 1, "end": hi + window_size, "value": round(float(gc_windows[hi]), 2)}
+
+    return {
+        "plot": {"labels": (points + 1).tolist(), "values": [round(v, 2) for v in plotted[points].tolist()], "step": step},
+        "hist": bins.tolist(),
+        "gc": global_gc,
+        "min": min_window,
+        "max": max_window
+    }
 
 def get_gc_plot_data(sequence, window_size=50):
     """Generates Line Graph Data"""
-    if len(sequence) < window_size:
-        return {"labels": [1], "values": [round(gc_fraction(sequence) * 100, 2)]}
-
-    data_points = []
-    labels = []
-    step = max(1, len(sequence) // 200) # Increased resolution for smoother graph
-    
-    for i in range(0, len(sequence) - window_size, step):
-        subseq = sequence[i : i + window_size]
-        gc = gc_fraction(subseq) * 100
-        data_points.append(round(gc, 2))
-        labels.append(i + 1)
-        
-    return {"labels": labels, "values": data_points}
+    return gc_profile(sequence, window_size)["plot"]
 
 def get_gc_histogram_data(sequence, window_size=50):
     """Generates Histogram Data"""
-    bins = [0] * 10 
-    step = max(1, len(sequence) // 200)
-    
-    for i in range(0, len(sequence) - window_size, step):
-        subseq = sequence[i : i + window_size]
-        gc = int(gc_fraction(subseq) * 100)
-        bin_idx = min(gc // 10, 9)
-        bins[bin_idx] += 1
-        
-    return bins
\ No newline at end of file
+    return gc_profile(sequence, window_size)["hist"]
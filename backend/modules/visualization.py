@@ -1,4 +1,10 @@
+import io
 import math
+import operator
+
+import numpy as np
+
+from modules.optimization import codon_diff
 
 def generate_dna_pdb(sequence):
     """
@@ -49,61 +55,102 @@ def generate_dna_pdb(sequence):
         
     return "\n".join(pdb)
 
+# --- PLASMID MAP (level of detail) ---
+# Cuts are aggregated into MAP_BINS angular bins: one density tick per non-empty
+# bin (longer and darker with more cuts, green when it holds a single cutter) with
+# a tooltip. At most MAP_LABELS enzyme names are drawn, single cutters first, then
+# double cutters, each only where it does not collide with a placed label. The SVG
+# therefore has at most MAP_MAX_ELEMENTS elements whatever the length or cut count.
+MAP_BINS = 120
+MAP_LABELS = 30
+MAP_MAX_ELEMENTS = 3 + 2 * MAP_BINS + MAP_LABELS # Inside <svg>: circle, 2 center texts, ticks (with tooltips), labels
+_MAP_VIEW = (-40, 0, 380, 300) # x, y, width, height: room for labels left and right of the circle
+_MAP_CX, _MAP_CY, _MAP_R = 150, 150, 100
+_LABEL_R, _LABEL_FONT = 132, 9
+_BIN_NAMES = 4 # Enzymes named in a tick tooltip
+_POSITION, _FREQUENCY = operator.itemgetter("position"), operator.itemgetter("frequency")
+
 def generate_plasmid_map(sequence, sites):
     """
     Generates a Circular SVG Map for Module 2.
     """
-    cx, cy, r = 150, 150, 100
-    svg = [f'<svg viewBox="0 0 300 300" class="w-full h-full">']
-    
-    # Draw Circle
-    svg.append(f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="none" stroke="#cbd5e1" stroke-width="10" />')
-    
-    # Map Restriction Sites
+    cx, cy, r = _MAP_CX, _MAP_CY, _MAP_R
     seq_len = len(sequence)
-    if seq_len > 0:
-        for site in sites:
-            # Calculate angle: (position / length) * 360
-            angle_deg = (site['position'] / seq_len) * 360 - 90 # -90 to start at top
-            angle_rad = math.radians(angle_deg)
-            
-            # Line coordinates (sticking out)
-            x1 = cx + (r * math.cos(angle_rad))
-            y1 = cy + (r * math.sin(angle_rad))
-            x2 = cx + ((r + 20) * math.cos(angle_rad))
-            y2 = cy + ((r + 20) * math.sin(angle_rad))
-            
-            # Draw Tick
-            color = "#9333ea" # Purple
-            svg.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}" stroke-width="2" />')
-            
-            # Draw Label (if space permits)
-            # Only label first few to avoid clustering in simple view
-            if site['position'] % 2 == 0 or len(sites) < 10:
-                text_x = cx + ((r + 35) * math.cos(angle_rad))
-                text_y = cy + ((r + 35) * math.sin(angle_rad))
-                svg.append(f'<text x="{text_x}" y="{text_y}" font-size="10" text-anchor="middle" fill="#333">{site["enzyme"]}</text>')
+    svg = io.StringIO()
+    svg.write(f'<svg viewBox="{" ".join(map(str, _MAP_VIEW))}" class="w-full h-full">')
+    svg.write(f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="none" stroke="#cbd5e1" stroke-width="10" />')
+    svg.write(f'<text x="{cx}" y="{cy - 4}" font-size="12" font-weight="bold" text-anchor="middle" fill="#334155">{seq_len:,} bp</text>')
+    svg.write(f'<text x="{cx}" y="{cy + 12}" font-size="9" text-anchor="middle" fill="#64748b">{len(sites):,} cuts</text>')
+
+    if seq_len > 0 and sites:
+        # Angular binning: one tick per occupied bin
+        positions = np.fromiter(map(_POSITION, sites), dtype=np.int64, count=len(sites))
+        frequencies = np.fromiter(map(_FREQUENCY, sites), dtype=np.int64, count=len(sites))
+        bins = np.clip((positions - 1) * MAP_BINS // seq_len, 0, MAP_BINS - 1)
+        counts = np.bincount(bins, minlength=MAP_BINS)
+        best = np.full(MAP_BINS, 3)
+        np.minimum.at(best, bins, np.minimum(frequencies, 3))
+        order = np.argsort(bins, kind="stable")
+        group_starts = np.concatenate(([0], np.cumsum(counts)))
+        scale = math.log(int(counts.max()) + 1)
+        bin_bp = seq_len / MAP_BINS
+        for b in np.flatnonzero(counts).tolist():
+            count = int(counts[b])
+            angle = math.radians((b + 0.5) / MAP_BINS * 360 - 90) # -90 to start at top
+            length = 6 + 14 * math.log(count + 1) / scale
+            color = "#16a34a" if best[b] == 1 else "#9333ea"
+            opacity = 1 if best[b] <= 2 else round(0.35 + 0.65 * math.log(count + 1) / scale, 2)
+            x1, y1 = cx + (r + 5) * math.cos(angle), cy + (r + 5) * math.sin(angle)
+            x2, y2 = cx + (r + 5 + length) * math.cos(angle), cy + (r + 5 + length) * math.sin(angle)
+            names = []
+            for idx in order[group_starts[b]:min(group_starts[b + 1], group_starts[b] + 8 * _BIN_NAMES)].tolist():
+                if len(names) < _BIN_NAMES and sites[idx]["enzyme"] not in names:
+                    names.append(sites[idx]["enzyme"])
+            listed = ", ".join(names) + (", ..." if count > len(names) else "")
+            svg.write(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{color}" stroke-width="2" opacity="{opacity}">'
+                      f'<title>{int(b * bin_bp) + 1}-{int((b + 1) * bin_bp)} bp: {count} cut{"s" if count > 1 else ""} ({listed})</title></line>')
 
-    svg.append('</svg>')
-    return "".join(svg)
+        # Labels: single then double cutters, greedy placement without overlaps
+        labelled = np.flatnonzero(frequencies <= 2)
+        candidates = [sites[idx] for idx in labelled[np.lexsort((positions[labelled], frequencies[labelled]))].tolist()]
+        placed = []
+        for site in candidates:
+            if len(placed) >= MAP_LABELS:
+                break
+            angle = math.radians((site["position"] - 1) / seq_len * 360 - 90)
+            label = f'{site["enzyme"]} ({site["position"]})'
+            box = _label_box(label, angle)
+            if box is None or any(_overlaps(box, other) for other, _ in placed):
+                continue
+            placed.append((box, (label, angle, site["frequency"])))
+        for box, (label, angle, frequency) in placed:
+            x, y = cx + _LABEL_R * math.cos(angle), cy + _LABEL_R * math.sin(angle)
+            anchor = "middle" if abs(math.cos(angle)) < 0.2 else ("start" if math.cos(angle) > 0 else "end")
+            fill = "#15803d" if frequency == 1 else "#333"
+            svg.write(f'<text x="{x:.1f}" y="{y + _LABEL_FONT * 0.35:.1f}" font-size="{_LABEL_FONT}" text-anchor="{anchor}" fill="{fill}">{label}</text>')
+
+    svg.write('</svg>')
+    return svg.getvalue()
+
+def _label_box(label, angle):
+    """Approximate bounding box (x0, y0, x1, y1) of a map label, None if it leaves the map."""
+    width, height = len(label) * _LABEL_FONT * 0.58, _LABEL_FONT * 1.2
+    x, y = _MAP_CX + _LABEL_R * math.cos(angle), _MAP_CY + _LABEL_R * math.sin(angle)
+    if abs(math.cos(angle)) < 0.2:
+        x0 = x - width / 2
+    else:
+        x0 = x if math.cos(angle) > 0 else x - width
+    box = (x0, y - height / 2, x0 + width, y + height / 2)
+    left, top, width, height = _MAP_VIEW
+    return box if box[0] >= left and box[1] >= top and box[2] <= left + width and box[3] <= top + height else None
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
 
 def generate_codon_heatmap(original_seq, optimized_seq):
     """
     Generates data for Module 3 Heatmap.
     Returns array of 0 (Bad/Changed) vs 1 (Good/Same) for visualization.
     """
-    heatmap_data = []
-    # Compare by chunks of 3 (codons)
     # Limit to 100 codons for the graph to prevent overcrowding
-    limit = 100 
-    
-    orig_codons = [original_seq[i:i+3] for i in range(0, len(original_seq), 3)]
-    opt_codons = [optimized_seq[i:i+3] for i in range(0, len(optimized_seq), 3)]
-    
-    for i in range(min(len(orig_codons), limit)):
-        if i < len(opt_codons) and orig_codons[i] == opt_codons[i]:
-            heatmap_data.append(1) # Good/Unchanged
-        else:
-            heatmap_data.append(0.2) # Bad/Changed (Low score for visualization)
-            
-    return heatmap_data
\ No newline at end of file
+    return codon_diff(original_seq, optimized_seq, limit=100)
@@ -0,0 +1,4 @@
+import os
+
+# The app is imported by the tests: keep results in memory only (no SQLite store)
+os.environ["BIOVALIDATOR_STORE"] = ""
@@ -0,0 +1,31 @@
+"""
+Dashboard rendering: a failed module shows its error card and the other
+modules still render. Run from the backend directory: python -m pytest tests
+"""
+import pytest
+
+import app
+
+SEQUENCE = ("ATGGCTAGCAAAGGAGAAGAACTTTTCACTGGAGTTGTCCCAATTCTTGTTGAATTAGATGGTGATGTTAATGGG"
+            "CACAAATTTTCTGTCAGTGGAGAGGGTGAAGGTGATGCAACATACGGAAAACTTACCCTTAAATTTATTTGCACTACTGGAAAACTACCTGTTCCATGGCCAACACTTGTCACTACTTTCTCTTATGGTGTTCAATGCTTTTCAAGATACCCAGATCATATGAAACAGCATGACTTTTTCAAGAGTGCCATGCCCGAAGGTTATGTACAGGAAAGAACTATATTTTAA")
+
+def _failing(*args, **kwargs):
+    raise RuntimeError("forced failure")
+
+@pytest.fixture
+def client():
+    app.result_cache.clear()
+    yield app.app.test_client()
+    app.result_cache.clear()
+
+@pytest.mark.parametrize("failed", sorted(app.ANALYSIS_MODULES))
+def test_renders_with_failed_module(client, monkeypatch, failed):
+    monkeypatch.setitem(app.ANALYSIS_MODULES, failed, _failing)
+    response = client.post("/", data={"sequence": SEQUENCE})
+    assert response.status_code == 200
+    assert "forced failure" in response.get_data(as_text=True)
+
+def test_renders_with_every_module_failed(client, monkeypatch):
+    for name in app.ANALYSIS_MODULES:
+        monkeypatch.setitem(app.ANALYSIS_MODULES, name, _failing)
+    assert client.post("/", data={"sequence": SEQUENCE}).status_code == 200
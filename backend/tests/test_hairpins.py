@@ -0,0 +1,61 @@
+"""
+Hairpin scanner checks: planted stems and a brute-force enumeration.
+Run from the backend directory: python -m pytest tests
+"""
+import random
+
+import pytest
+
+from modules.prediction import find_hairpins
+
+COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+def reverse_complement(seq):
+    return seq.translate(COMPLEMENT)[::-1]
+
+def brute_force(seq, min_stem, min_loop, max_loop):
+    """Maximal stems of paired bases (i, j), (i+1, j-1), ... whose innermost loop is in range."""
+    pairs = {("A", "T"), ("T", "A"), ("C", "G"), ("G", "C")}
+    found = []
+    for diagonal in range(len(seq) * 2):
+        run = []
+        for i in range(max(0, diagonal - len(seq) + 1), diagonal // 2 + 1):
+            j = diagonal - i
+            if j - i - 1 >= min_loop and (seq[i], seq[j]) in pairs:
+                run.append(i)
+                continue
+            found += _stem(run, diagonal, min_stem, max_loop)
+            run = []
+        found += _stem(run, diagonal, min_stem, max_loop)
+    return sorted(found)
+
+def _stem(run, diagonal, min_stem, max_loop):
+    if len(run) < min_stem:
+        return []
+    loop = diagonal - 2 * run[-1] - 1
+    return [(run[0] + 1, diagonal - run[0] + 1, len(run), loop)] if loop <= max_loop else []
+
+def _random(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+@pytest.mark.parametrize("stem, loop", [(30, 20), (12, 30), (50, 5), (10, 30)])
+def test_planted_long_stem(stem, loop):
+    rng = random.Random(stem * 100 + loop)
+    arm = _random(rng, stem)
+    # Flanks that cannot extend the stem: the base before the arm pairs with none after it
+    seq = "A" * 50 + "C" + arm + "T" * loop + reverse_complement(arm) + "C" + "A" * 50
+    hits = [hp for hp in find_hairpins(seq, min_stem=10, max_loop=30) if hp["stem"] == stem]
+    assert [(hp["start"], hp["end"], hp["loop"]) for hp in hits] == [(52, 52 + 2 * stem + loop - 1, loop)]
+    assert hits[0]["dg"] < 0
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    parts = []
+    while sum(map(len, parts)) < 400:
+        arm = _random(rng, rng.randint(4, 40))
+        parts += [_random(rng, rng.randint(0, 30)), arm, _random(rng, rng.randint(0, 40)), reverse_complement(arm)]
+    seq = "".join(parts)
+    min_stem, min_loop, max_loop = rng.choice([(6, 3, 30), (10, 5, 30), (8, 0, 12)])
+    hits = find_hairpins(seq, min_stem=min_stem, min_loop=min_loop, max_loop=max_loop, stability=False)
+    assert [(hp["start"], hp["end"], hp["stem"], hp["loop"]) for hp in hits] == brute_force(seq, min_stem, min_loop, max_loop)
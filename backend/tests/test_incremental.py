@@ -0,0 +1,74 @@
+"""
+Incremental re-analysis: results patched around an edit must equal a full
+analysis of the edited sequence. Run from the backend directory: python -m pytest tests
+"""
+import json
+import random
+
+import pytest
+
+import app
+from benchmarks.generators import GENERATORS
+
+PATCHED = sorted(app.INCREMENTAL_MODULES)
+PARAMS = [{}, {"prediction": {"min_stem": 8, "max_stem": 15}}, {"restriction": {"visuals": False}}]
+INSERTS = ["TAA", "GCTGGTGG", "CCACCAGC", "GAATTC", "AAAAAAAA"] # Stop, Chi (both strands), EcoRI, homopolymer
+
+def _bases(rng, count):
+    return "".join(rng.choice("ACGT") for _ in range(count))
+
+def random_edit(rng, seq):
+    """An insertion, deletion, substitution or motif at a random place (ends included) that changes `seq`."""
+    edited = seq
+    while edited == seq:
+        edited = _edit(rng, seq)
+    return edited
+
+def _edit(rng, seq):
+    at = rng.randrange(len(seq))
+    kind = rng.choice(["substitute", "insert", "delete", "motif", "end", "start"])
+    if kind == "substitute":
+        return seq[:at] + rng.choice("ACGT") + seq[at + 1:]
+    if kind == "insert":
+        return seq[:at] + _bases(rng, rng.randint(1, 12)) + seq[at:]
+    if kind == "delete":
+        return seq[:at] + seq[at + rng.randint(1, 12):]
+    if kind == "motif":
+        return seq[:at] + rng.choice(INSERTS) + seq[at + 3:]
+    if kind == "end":
+        return seq[:-rng.randint(1, 9)] + _bases(rng, rng.randint(0, 9))
+    return _bases(rng, rng.randint(0, 9)) + seq[rng.randint(1, 9):]
+
+def _same(a, b):
+    return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    app.result_cache.clear()
+    yield
+    app.result_cache.clear()
+
+@pytest.mark.parametrize("params", PARAMS, ids=["defaults", "hairpins", "no-visuals"])
+@pytest.mark.parametrize("profile", sorted(GENERATORS))
+def test_patched_results_equal_full_analysis(profile, params):
+    rng = random.Random(f"{profile}-{sorted(params)}")
+    seq = GENERATORS[profile](3000, rng.randrange(100))
+    app.run_analysis(seq, params=params, modules=PATCHED, parallel=False) # Cached: the base of the first patch
+    for _ in range(5):
+        edited = random_edit(rng, seq)
+        results, edit, how = app.run_reanalysis(seq, edited, params=params, modules=PATCHED)
+        assert set(how.values()) == {"patched"}, (edit, how)
+        full = app.run_analysis(edited, params=params, modules=PATCHED, parallel=False, use_cache=False)
+        for name in PATCHED:
+            assert _same(results[name], full[name]), (name, edit)
+        seq = edited # Patched results are cached: the next edit patches them again
+
+def test_long_hairpin_insert():
+    rng = random.Random(7)
+    seq = GENERATORS["uniform"](4000, 3)
+    app.run_analysis(seq, modules=PATCHED, parallel=False)
+    arm = seq[1000:1300]
+    edited = seq[:1300] + "TTTTT" + arm[::-1].translate(str.maketrans("ACGT", "TGCA")) + seq[1300:]
+    results, _, how = app.run_reanalysis(seq, edited, modules=PATCHED)
+    full = app.run_analysis(edited, modules=PATCHED, parallel=False, use_cache=False)
+    assert all(_same(results[name], full[name]) for name in PATCHED), how
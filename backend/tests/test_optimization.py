@@ -0,0 +1,33 @@
+"""
+Constrained codon optimization: a sequence that meets the design rules must
+also pass the safety scan. Run from the backend directory: python -m pytest tests
+"""
+import random
+
+import pytest
+
+from modules.codon_engine import make_rules
+from modules.codon_tables import STANDARD_CODE, CODONS
+from modules.optimization import optimize_sequence
+from modules.prediction import CHI_SITE, CHI_SITE_REVERSE, predict_problems
+
+SENSE = [codon for codon, aa in zip(CODONS, STANDARD_CODE) if aa != "*"]
+
+def _random_orf(rng, codons):
+    return "ATG" + "".join(rng.choice(SENSE) for _ in range(codons)) + "TAA"
+
+def test_rules_forbid_chi_on_both_strands():
+    patterns = [pattern for _, pattern in make_rules()["motifs"]]
+    assert any(pattern.fullmatch(CHI_SITE) for pattern in patterns)
+    assert any(pattern.fullmatch(CHI_SITE_REVERSE) for pattern in patterns)
+    assert not any(pattern.fullmatch(CHI_SITE_REVERSE) for _, pattern in make_rules(avoid_chi=False)["motifs"])
+
+# Seeds 65-163 gave CCACCAGC (Chi, antisense) when only the forward site was avoided
+@pytest.mark.parametrize("seed", list(range(10)) + [65, 80, 145, 153, 163])
+def test_satisfied_design_has_no_chi_site(seed):
+    rng = random.Random(seed)
+    result = optimize_sequence(_random_orf(rng, rng.randint(100, 400)), avoid_sites=["EcoRI", "BamHI", "BsaI"])
+    dna = result["optimized_dna"]
+    if result["constraints"]["satisfied"]:
+        assert CHI_SITE not in dna and CHI_SITE_REVERSE not in dna
+        assert not [issue for issue in predict_problems(dna, stability=False)["issues"] if issue["type"] == "Chi Site"]
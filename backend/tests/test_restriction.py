@@ -0,0 +1,60 @@
+"""
+Restriction map: the automaton (loaded from data/precomputed/restriction_engine.json)
+must give the cuts of Bio.Restriction.Analysis. Run from the backend directory:
+python -m pytest tests
+"""
+import random
+
+import pytest
+from Bio.Restriction import AllEnzymes, Analysis
+from Bio.Seq import Seq
+
+from modules.restriction import find_restriction_sites, get_engine
+
+def biopython_cuts(sequence, linear=True):
+    full = Analysis(AllEnzymes, Seq(sequence), linear=linear).full()
+    return sorted((str(enzyme), cut) for enzyme, cuts in full.items() for cut in cuts)
+
+def engine_cuts(sequence, linear=True):
+    return sorted((name, cut) for name, cuts in get_engine().search(sequence, linear=linear).items() for cut in cuts)
+
+def _random(rng, length, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+def _with_n(rng, length):
+    seq = list(_random(rng, length))
+    for _ in range(length // 50):
+        at = rng.randrange(length)
+        seq[at:at + rng.randint(1, 4)] = "N" * rng.randint(1, 4)
+    return "".join(seq)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_linear_map_matches_biopython(seed):
+    rng = random.Random(seed)
+    sequence = _random(rng, rng.choice([20, 300, 3000]))
+    result = find_restriction_sites(sequence)
+    assert sorted((site["enzyme"], site["position"]) for site in result["sites"]) == biopython_cuts(sequence)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_ambiguous_bases_match_biopython(seed):
+    rng = random.Random(100 + seed)
+    sequence = _with_n(rng, 2000)
+    for linear in (True, False):
+        assert engine_cuts(sequence, linear) == biopython_cuts(sequence, linear)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_circular_matches_biopython(seed):
+    rng = random.Random(200 + seed)
+    sequence = _random(rng, rng.choice([50, 500, 3000]))
+    assert engine_cuts(sequence, linear=False) == biopython_cuts(sequence, linear=False)
+
+@pytest.mark.parametrize("site", ["GAATTC", "GGTCTC", "GCGGCCGC", "GAAGAC", "GCCNNNNNGGC"])
+@pytest.mark.parametrize("split", [1, 3, 5])
+def test_sites_across_the_origin(site, split):
+    rng = random.Random(split)
+    site = site.replace("N", "A")
+    split = min(split, len(site) - 1)
+    sequence = site[split:] + _random(rng, 200) + site[:split] # The site runs over the end of the record
+    for linear in (True, False):
+        assert engine_cuts(sequence, linear) == biopython_cuts(sequence, linear)
+    assert set(engine_cuts(sequence, linear=False)) > set(engine_cuts(sequence)) # Only the circular map has the spanning site
@@ -0,0 +1,76 @@
+"""
+Streaming FASTA scanner: every record scanned chunk by chunk must give the
+results of the in-memory checks on the joined sequence. Run from the backend
+directory: python -m pytest tests
+"""
+import random
+
+import pytest
+
+from benchmarks.generators import GENERATORS
+from modules.prediction import predict_problems
+from modules.restriction import get_engine
+from modules.streaming import DEFAULT_ENZYMES, scan_fasta
+from modules.synthesis import check_homopolymers, gc_profile
+
+PANEL = list(DEFAULT_ENZYMES) + ["MboII", "BglI", "AcuI", "BaeI", "Sau3AI", "AluI"] # Type IIS, N sites, two-sided cutters
+LINE = 61 # Bases per FASTA line: the byte size of a record is not its length
+
+def _records():
+    rng = random.Random(3)
+    records = [GENERATORS[name](length, rng.randrange(100))
+               for name in sorted(GENERATORS) for length in (7, 60, 777, 5000)]
+    records.append(GENERATORS["uniform"](20_000, 1)) # The GC plot step differs from the byte size / 200
+    with_n = list(GENERATORS["uniform"](3000, 2))
+    with_n[100:105] = "NNNNN"
+    with_n[2000:2001] = "N"
+    records.append("".join(with_n))
+    # Sites at the very ends (across the origin when circular)
+    records += ["GAATTC" + "A" * 40 + "GAATT", "ATTC" + "A" * 50 + "GAATTCGA" + "GAATTCG", "TCTCA" + "C" * 50 + "GAGACGGT"]
+    return records
+
+RECORDS = _records()
+
+def write_fasta(path, records):
+    with open(path, "w") as fh:
+        for i, seq in enumerate(records):
+            fh.write(f">r{i} record {i}\n")
+            text = seq.lower() if i % 3 == 0 else (seq[:len(seq) // 2].lower() + seq[len(seq) // 2:] if i % 3 == 1 else seq)
+            for start in range(0, len(text), LINE):
+                fh.write(text[start:start + LINE] + "\n")
+
+@pytest.mark.parametrize("circular", [False, True], ids=["linear", "circular"])
+@pytest.mark.parametrize("chunk_size", [7, 97, 4096, 1 << 20])
+def test_scan_matches_in_memory_checks(tmp_path, chunk_size, circular):
+    path = tmp_path / "records.fa"
+    write_fasta(path, RECORDS)
+    results = list(scan_fasta(str(path), chunk_size=chunk_size, enzymes=PANEL, circular=circular, max_details=10**9))
+    assert [r["id"] for r in results] == [f"r{i}" for i in range(len(RECORDS))]
+    engine = get_engine()
+    for seq, result in zip(RECORDS, results):
+        assert result["length"] == len(seq)
+        assert result["ambiguous"] == seq.count("N")
+        if len(seq) >= 50:
+            gc = dict(result["gc"])
+            assert gc.pop("window") == 50
+            assert gc == gc_profile(seq, 50)
+        assert result["homopolymers"]["details"] == check_homopolymers(seq)["details"]
+
+        issues = predict_problems(seq, stability=False)["issues"]
+        assert result["chi"]["details"] == [{"start": i["start"], "end": i["end"], "strand": i["strand"]}
+                                            for i in issues if i["type"] == "Chi Site"]
+        assert result["stops"]["details"] == [{"start": i["start"], "end": i["end"]}
+                                              for i in issues if i["type"] == "Premature Stop"]
+
+        expected = {name: cuts for name, cuts in engine.search(seq, linear=not circular).items() if name in PANEL}
+        assert {name: hit["cuts"] for name, hit in result["restriction"]["cutters"].items()} == expected
+
+def test_counts_are_exact_when_details_are_capped(tmp_path):
+    path = tmp_path / "capped.fa"
+    seq = RECORDS[-4] # 20 kb
+    write_fasta(path, [seq])
+    result, = scan_fasta(str(path), chunk_size=97, enzymes=PANEL, max_details=3)
+    full = {name: cuts for name, cuts in get_engine().search(seq).items() if name in PANEL}
+    for name, hit in result["restriction"]["cutters"].items():
+        assert hit["count"] == len(full[name]) and len(hit["cuts"]) == min(3, hit["count"])
+        assert hit["truncated"] == (hit["count"] > 3)